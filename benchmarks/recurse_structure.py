@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2014 Danny Goodall
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Compare the stack based recurse_structure() with the recursive version it replaced, and with a compiled
+ConversionPlan, on a chart and on a synthetic document of 10,000 chart entries. The plain copy rows convert nothing,
+for comparison. Reading every entry's title through a json_view() is compared with copying into Munch and reading it.
+
+Run from the root of the repository, with codefurther installed or on the path::
+
+    PYTHONPATH=. python benchmarks/recurse_structure.py
+
+"""
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+import copy
+import io
+import json
+import timeit
+
+from munch import Munch
+from six import iteritems
+
+from codefurther.utils import ConversionPlan, json_view, recurse_structure
+
+__author__ = 'Danny Goodall'
+
+CHART = "tests/resources/singles.json"
+CONVERT = {"position": int, "previousPosition": int, "numWeeks": int}
+PATHS = ["entries[].position", "entries[].previousPosition", "entries[].numWeeks"]
+REPEATS = 5
+
+
+def recursive_recurse_structure(thing, use_munch=True, convert=None):
+    """The recursive version of recurse_structure(), without its error handling"""
+    if convert is None:
+        convert = {}
+
+    if isinstance(thing, list):
+        new_thing = []
+        for x in thing:
+            new_thing.append(recursive_recurse_structure(x, use_munch=use_munch, convert=convert))
+        return new_thing
+    elif isinstance(thing, dict):
+        new_thing = {} if not use_munch else Munch()
+        for k, v in iteritems(thing):
+            if k in convert:
+                v = convert[k](v)
+            new_thing[k] = recursive_recurse_structure(v, use_munch=use_munch, convert=convert)
+        return new_thing
+    else:
+        return thing
+
+
+with io.open(CHART, encoding="utf-8") as chart_file:
+    chart = json.load(chart_file)
+
+entries = chart['entries']
+synthetic = dict(chart, entries=[copy.deepcopy(entries[count % len(entries)]) for count in range(10000)])
+
+# The new version must give exactly the same result as the old one
+assert recurse_structure(chart, convert=CONVERT) == recursive_recurse_structure(chart, convert=CONVERT)
+munch_plan = ConversionPlan(CONVERT, PATHS)
+dict_plan = ConversionPlan(CONVERT, PATHS, use_munch=False)
+assert munch_plan(chart) == recurse_structure(chart, convert=CONVERT)
+
+
+def run(name, function, document, rounds, copies=None):
+    """Time ``function`` on ``document``, best of REPEATS, handing it a fresh copy each round if ``copies`` is True"""
+    timings = []
+    for _ in range(REPEATS):
+        documents = [copy.deepcopy(document) if copies else document for _ in range(rounds)]
+        timings.append(timeit.timeit(lambda: function(documents.pop()), number=rounds))
+    return name, min(timings) / rounds * 1000
+
+
+for title, document, rounds in [("Chart ({} entries)".format(len(entries)), chart, 2000),
+                                ("Synthetic (10,000 entries)", synthetic, 10)]:
+    print(title)
+    baseline = None
+    for name, milliseconds in [
+        run("recursive, Munch", lambda thing: recursive_recurse_structure(thing, True, CONVERT), document, rounds),
+        run("stack, Munch", lambda thing: recurse_structure(thing, True, CONVERT), document, rounds),
+        run("plan, Munch", munch_plan, document, rounds),
+        run("plain copy, Munch", lambda thing: recurse_structure(thing, True), document, rounds),
+        run("recursive, dict", lambda thing: recursive_recurse_structure(thing, False, CONVERT), document, rounds),
+        run("stack, dict", lambda thing: recurse_structure(thing, False, CONVERT), document, rounds),
+        run("plan, dict", dict_plan, document, rounds),
+        run("plain copy, dict", lambda thing: recurse_structure(thing, False), document, rounds),
+        run("stack, dict, in place", lambda thing: recurse_structure(thing, False, CONVERT, in_place=True), document,
+            rounds, copies=True),
+    ]:
+        if name.startswith("recursive"):
+            baseline = milliseconds
+        print("    {:24} {:9.3f} ms {:6.2f}x".format(name, milliseconds, baseline / milliseconds))
+
+    baseline = None
+    for name, milliseconds in [
+        run("Munch copy, read titles", lambda thing: [entry.title for entry in recurse_structure(thing).entries],
+            document, rounds),
+        run("json_view, read titles", lambda thing: [entry.title for entry in json_view(thing).entries], document,
+            rounds),
+    ]:
+        baseline = baseline or milliseconds
+        print("    {:24} {:9.3f} ms {:6.2f}x".format(name, milliseconds, baseline / milliseconds))
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2014 Danny Goodall
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Compare strip_instruction() with Markup().striptags() on the step instructions of a real route.
+
+Run from the root of the repository, with codefurther installed or on the path::
+
+    PYTHONPATH=. python benchmarks/strip_instructions.py
+
+"""
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+import io
+import json
+import timeit
+
+from markupsafe import Markup
+
+from codefurther.directions import instructions
+
+__author__ = 'Danny Goodall'
+
+ROUTE = "tests/resources/directions/json.json"
+ROUNDS = 200
+
+with io.open(ROUTE, encoding="utf-8") as route_file:
+    steps = json.load(route_file)['routes'][0]['legs'][0]['steps']
+html = [step['html_instructions'] for step in steps]
+
+# The new path must give exactly the same text as the old one
+assert [instructions.strip_instruction(text) for text in html] == [Markup(text).striptags() for text in html]
+
+
+def markup():
+    for text in html:
+        Markup(text).striptags()
+
+
+def no_memo():
+    for text in html:
+        instructions._strip(text)
+
+
+def memo():
+    for text in html:
+        instructions.strip_instruction(text)
+
+
+print("{} instructions, {} rounds".format(len(html), ROUNDS))
+baseline = None
+for name, function in [("Markup().striptags()", markup), ("strip_instruction, no memo", no_memo),
+                       ("strip_instruction", memo)]:
+    seconds = min(timeit.repeat(function, number=ROUNDS, repeat=5))
+    baseline = baseline or seconds
+    print("{:28} {:8.2f} us/instruction {:6.1f}x".format(
+        name,
+        seconds / (ROUNDS * len(html)) * 1e6,
+        baseline / seconds
+    ))
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2014 Danny Goodall
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""The :mod:`async_transport` module contains the :py:class:`AsyncTransport` class, the asyncio counterpart of
+:py:class:`~transport.Transport` that is used by :py:class:`~async_top40.AsyncTop40` and
+:py:class:`~async_lyrics.AsyncLyrics`.
+
+It needs the optional `aiohttp <https://docs.aiohttp.org/>`_ package, which can be installed with::
+
+    pip install codefurther[async]
+
+.. moduleauthor:: Danny Goodall <danny@onebloke.com>
+
+"""
+import asyncio
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from codefurther.errors import CodeFurtherConnectionError, CodeFurtherError, CodeFurtherHTTPError, \
+    CodeFurtherReadTimeoutError
+
+__author__ = 'Danny Goodall'
+
+__all__ = ['AsyncTransport']
+
+
+class AsyncTransport(object):
+    """Owns the :py:class:`aiohttp.ClientSession` and pool of keep-alive connections used by the asyncio clients.
+
+    The session is created the first time a request is made, so that it belongs to the event loop that is running
+    at the time. An :py:class:`AsyncTransport` should therefore only be used from one event loop.
+
+    Args:
+        pool_maxsize (:py:class:`int`): The maximum number of connections open at once, across all hosts.
+        pool_maxsize_per_host (:py:class:`int`): The maximum number of connections open at once to any one host.
+        timeout (:py:class:`float` or :py:class:`tuple`): The timeout in seconds for each request. A
+            ``(connect, read)`` tuple sets the two timeouts separately. ``None`` waits forever.
+        keep_alive (:py:class:`bool`): If ``False`` each connection is closed after use.
+    Attributes:
+        timeout (:py:class:`float` or :py:class:`tuple`): The timeout applied to each request.
+        keep_alive (:py:class:`bool`): Whether connections are kept open between requests.
+    Returns:
+        AsyncTransport (:py:class:`AsyncTransport`): The AsyncTransport instance.
+    Raises:
+        ImportError: If the aiohttp package is not installed.
+    """
+
+    def __init__(self, pool_maxsize=100, pool_maxsize_per_host=10, timeout=(5, 30), keep_alive=True):
+        if aiohttp is None:
+            raise ImportError("The asyncio clients need the aiohttp package. Install it with "
+                              "'pip install codefurther[async]'.")
+        self.pool_maxsize = pool_maxsize
+        self.pool_maxsize_per_host = pool_maxsize_per_host
+        self.timeout = timeout
+        self.keep_alive = keep_alive
+        self._session = None
+
+    def _client_timeout(self):
+        """Internal method to turn the ``timeout`` argument into an :py:class:`aiohttp.ClientTimeout`"""
+        if isinstance(self.timeout, tuple):
+            connect, read = self.timeout
+            return aiohttp.ClientTimeout(connect=connect, sock_read=read)
+        return aiohttp.ClientTimeout(total=self.timeout)
+
+    @property
+    def session(self):
+        """A ``property`` that returns the transport's session, creating it on first use.
+
+        Returns:
+            session (:py:class:`aiohttp.ClientSession`): The session.
+        """
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_maxsize,
+                limit_per_host=self.pool_maxsize_per_host,
+                force_close=not self.keep_alive
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self._client_timeout())
+        return self._session
+
+    async def get_json(self, url, params=None, error_format="{} {}", service_url=None):
+        """Read ``url`` and return the JSON document in the response converted to Python equivalent classes.
+
+        Args:
+            url (:py:class:`str`): The url to read.
+            params (:py:class:`dict`): Parameters to be passed as query variables ?key=value.
+            error_format (:py:class:`str`): The format string used for the message of a raised
+                :py:class:`~errors.CodeFurtherHTTPError`. It is passed the ``service_url`` and the status code.
+            service_url (:py:class:`str`): The url to name in error messages. Defaults to ``url``.
+        Returns:
+            response (JSON): A JSON document converted to Python equivalent classes.
+        Raises:
+            CodeFurtherHTTPError (:py:class:`~errors.CodeFurtherHTTPError`): If a status code that is not 200 is
+                returned
+            CodeFurtherConnectionError (:py:class:`~errors.CodeFurtherConnectionError`): If a connection could not be
+                established to the remote server
+            CodeFurtherReadTimeoutError (:py:class:`~errors.CodeFurtherReadTimeoutError`): If the remote server took
+                too long to respond
+            CodeFurtherError (:py:class:`~errors.CodeFurtherError`): If any other error occurred whilst reading the
+                response, such as an invalid url or a response that was cut short
+        """
+        service_url = service_url if service_url is not None else url
+        try:
+            async with self.session.get(url, params=params) as response:
+                if response.status != 200:
+                    message = error_format.format(
+                        service_url,
+                        response.status
+                    )
+                    raise CodeFurtherHTTPError(message, response.status)
+
+                # Don't insist on an application/json content type, the lyrics server doesn't send one
+                return await response.json(content_type=None)
+        except asyncio.TimeoutError:
+            raise CodeFurtherReadTimeoutError("The remote server at " + service_url + " took longer than expected "
+                                              "to reply.")
+        except aiohttp.ClientConnectionError:
+            raise CodeFurtherConnectionError("Could not connect to remote server.")
+        except aiohttp.ClientError as e:
+            raise CodeFurtherError("An unknown error occurred when trying to access " + service_url, e) from e
+
+    async def close(self):
+        """Close the session and every connection held in its pool."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2014 Danny Goodall
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""The :mod:`cache` module contains the caches that keep decoded responses from the remote APIs, so that a request
+that has already been answered doesn't go back to the remote server.
+
+* :py:class:`LRUCache` is an in-memory cache that holds at most ``max_size`` characters of responses, throwing away
+  the least recently used responses to make room for new ones.
+* :py:class:`DiskCache` is a persistent cache held in a sqlite database, which lasts between runs of a program.
+* :py:class:`TieredCache` puts an :py:class:`LRUCache` in front of an optional :py:class:`DiskCache`, and counts its
+  hits and misses.
+
+Every entry is stored with its own time to live, in seconds. Values are stored as JSON, so they must be the kind of
+document that the remote APIs return. Both tiers of a :py:class:`TieredCache` keep the JSON text rather than the decoded
+document, and decode it again for each read, so every caller is given its own copy that it is free to change.
+
+.. moduleauthor:: Danny Goodall <danny@onebloke.com>
+
+"""
+from collections import namedtuple, OrderedDict
+import json
+import sqlite3
+import threading
+import time
+
+from six import string_types
+
+__author__ = 'Danny Goodall'
+
+__all__ = ['LRUCache', 'DiskCache', 'TieredCache', 'CacheStats']
+
+#: The counters of a :py:class:`TieredCache`. ``hits`` is ``memory_hits`` plus ``disk_hits``.
+CacheStats = namedtuple('CacheStats', ['hits', 'memory_hits', 'disk_hits', 'misses', 'evictions', 'size'])
+
+
+class _Entry(object):
+    """Internal record of a value held by :py:class:`LRUCache`"""
+    __slots__ = ('value', 'size', 'expires_at')
+
+    def __init__(self, value, size, expires_at):
+        self.value = value
+        self.size = size
+        self.expires_at = expires_at
+
+
+class LRUCache(object):
+    """An in-memory cache whose total size is bounded, and which evicts the least recently used values first.
+
+    Args:
+        max_size (:py:class:`int`): The most that the cached values can add up to, measured by the ``size`` given to
+            :py:meth:`LRUCache.set`.
+    Attributes:
+        max_size (:py:class:`int`): The most that the cached values can add up to.
+        size (:py:class:`int`): What the cached values add up to now.
+        evictions (:py:class:`int`): The number of values that have been thrown away to make room for others.
+    Returns:
+        LRUCache (:py:class:`LRUCache`): The LRUCache instance.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.size = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, now=None):
+        """Return the value cached for ``key``, or ``None`` if there isn't one or it has expired.
+
+        Args:
+            key (:py:class:`str`): The key the value was cached with.
+            now (:py:class:`float`): The current time as a timestamp. Defaults to :py:func:`time.time`.
+        Returns:
+            The cached value, or ``None``.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at is not None and now >= entry.expires_at:
+                self._remove(key)
+                return None
+            # Move the key to the most recently used end
+            del self._entries[key]
+            self._entries[key] = entry
+            return entry.value
+
+    def set(self, key, value, size, ttl=None, now=None):
+        """Cache ``value`` for ``key``, evicting the least recently used values if there isn't room for it.
+
+        A value that is bigger than ``max_size`` on its own isn't cached.
+
+        Args:
+            key (:py:class:`str`): The key to cache the value with.
+            value: The value to cache.
+            size (:py:class:`int`): The size of the value.
+            ttl (:py:class:`float`): The number of seconds to cache the value for. If None, it doesn't expire.
+            now (:py:class:`float`): The current time as a timestamp. Defaults to :py:func:`time.time`.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if size > self.max_size:
+                return
+            while self._entries and self.size + size > self.max_size:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+            self._entries[key] = _Entry(value, size, now + ttl if ttl is not None else None)
+            self.size += size
+
+    def delete(self, key):
+        """Remove ``key`` from the cache, if it is there."""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        """Remove everything from the cache."""
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def _remove(self, key):
+        """Internal routine to remove ``key``, called with the lock held"""
+        self.size -= self._entries.pop(key).size
+
+
+class DiskCache(object):
+    """A persistent cache held in a sqlite database.
+
+    Args:
+        path (:py:class:`str`): The file that holds the database.
+    Attributes:
+        path (:py:class:`str`): The file that holds the database.
+    Returns:
+        DiskCache (:py:class:`DiskCache`): The DiskCache instance.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+            )
+
+    def get(self, key, now=None):
+        """Return the JSON text cached for ``key`` and the time it expires, or ``None`` if there isn't any.
+
+        Args:
+            key (:py:class:`str`): The key the text was cached with.
+            now (:py:class:`float`): The current time as a timestamp. Defaults to :py:func:`time.time`.
+        Returns:
+            (:py:class:`tuple`): The ``(text, expires_at)`` pair, or ``None``.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] is not None and now >= row[1]:
+                with self._connection:
+                    self._connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            return row
+
+    def set(self, key, text, expires_at=None):
+        """Cache the JSON ``text`` for ``key`` until ``expires_at``.
+
+        Args:
+            key (:py:class:`str`): The key to cache the text with.
+            text (:py:class:`str`): The JSON text.
+            expires_at (:py:class:`float`): The time the text expires, as a timestamp. If None, it doesn't expire.
+        """
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, text, expires_at)
+            )
+
+    def delete(self, key):
+        """Remove ``key`` from the cache, if it is there."""
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    def clear(self):
+        """Remove everything from the cache."""
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM responses")
+
+    def close(self):
+        """Close the database."""
+        with self._lock:
+            self._connection.close()
+
+
+class TieredCache(object):
+    """A two tier cache - an in-memory :py:class:`LRUCache`, in front of an optional persistent :py:class:`DiskCache`.
+
+    A value is looked for in memory first, and then on disk. A value found on disk is copied into memory, so that the
+    next read of it is quicker. Values are JSON documents, and both tiers hold their JSON text, whose length is their
+    size in memory. Each read decodes the text again, so a value that is returned never shares anything with the cache,
+    or with the value returned by another read.
+
+    Args:
+        max_size (:py:class:`int`): The most characters of JSON that the memory tier holds. 0 turns the memory tier
+            off.
+        disk (:py:class:`DiskCache` or :py:class:`str`): The persistent tier, or the path of the file to keep it in.
+            If None, there is no persistent tier.
+    Attributes:
+        memory (:py:class:`LRUCache`): The memory tier.
+        disk (:py:class:`DiskCache`): The persistent tier, or ``None``.
+        memory_hits (:py:class:`int`): The number of reads answered by the memory tier.
+        disk_hits (:py:class:`int`): The number of reads answered by the persistent tier.
+        misses (:py:class:`int`): The number of reads that neither tier could answer.
+    Returns:
+        TieredCache (:py:class:`TieredCache`): The TieredCache instance.
+    """
+
+    def __init__(self, max_size=4 * 1024 * 1024, disk=None):
+        self.memory = LRUCache(max_size)
+        self.disk = DiskCache(disk) if isinstance(disk, string_types) else disk
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def stats(self):
+        """Return the cache's hit and miss counters.
+
+        Returns:
+            (:py:class:`CacheStats`): The counters, the number of evictions from memory and the size of the memory tier.
+        """
+        with self._lock:
+            return CacheStats(
+                self.memory_hits + self.disk_hits,
+                self.memory_hits,
+                self.disk_hits,
+                self.misses,
+                self.memory.evictions,
+                self.memory.size
+            )
+
+    def get(self, key):
+        """Return the value cached for ``key``, or ``None`` if neither tier has an unexpired copy of it.
+
+        Args:
+            key (:py:class:`str`): The key the value was cached with.
+        Returns:
+            A newly decoded copy of the cached value, or ``None``.
+        """
+        now = time.time()
+        text = self.memory.get(key, now)
+        if text is not None:
+            self._count('memory_hits')
+            return json.loads(text)
+
+        if self.disk is not None:
+            row = self.disk.get(key, now)
+            if row is not None:
+                text, expires_at = row
+                self.memory.set(key, text, len(text), expires_at - now if expires_at is not None else None, now)
+                self._count('disk_hits')
+                return json.loads(text)
+
+        self._count('misses')
+        return None
+
+    def set(self, key, value, ttl=None):
+        """Cache ``value`` for ``key`` in both tiers.
+
+        Args:
+            key (:py:class:`str`): The key to cache the value with.
+            value: The JSON document to cache.
+            ttl (:py:class:`float`): The number of seconds to cache the value for. If None, it doesn't expire.
+        """
+        now = time.time()
+        text = json.dumps(value)
+        self.memory.set(key, text, len(text), ttl, now)
+        if self.disk is not None:
+            self.disk.set(key, text, now + ttl if ttl is not None else None)
+
+    def clear(self, disk=True):
+        """Remove everything from the cache.
+
+        Args:
+            disk (:py:class:`bool`): If ``False``, only the memory tier is cleared.
+        """
+        self.memory.clear()
+        if disk and self.disk is not None:
+            self.disk.clear()
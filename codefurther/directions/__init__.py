@@ -22,6 +22,8 @@
 __author__ = 'Danny Goodall'
 
 
-__all__= ["GetDirections"]
+__all__= ["GetDirections", "Step", "RouteCache", "directions_matrix", "RouteMatrix", "RouteResult", "RateLimiter"]
 
-from codefurther.directions.directions import GetDirections
\ No newline at end of file
+from codefurther.directions.directions import GetDirections, Step
+from codefurther.directions.routes import RouteCache
+from codefurther.directions.batch import directions_matrix, RouteMatrix, RouteResult, RateLimiter
@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2014 Danny Goodall
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""The :mod:`batch` module finds the routes between many starting points and many end points at once.
+
+:py:func:`directions_matrix` asks Google for every combination of starting point, end point and mode of travel, a few
+at a time, and returns a :py:class:`RouteMatrix` of the results::
+
+    from codefurther.directions import directions_matrix
+
+    matrix = directions_matrix(["Eastleigh", "Romsey"], ["Winchester", "Southampton"], modes=["walking", "driving"])
+    for result in matrix:
+        if result.found:
+            print(result.origin, result.destination, result.mode, result.distance, result.duration)
+
+Requests are paced by a :py:class:`RateLimiter`, and a request that Google turns away because of its rate limit is
+tried again after a pause.
+
+.. moduleauthor:: Danny Goodall <danny@onebloke.com>
+
+"""
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+from gmaps.errors import RateLimitExceeded
+
+from codefurther.directions.directions import GetDirections, _TransportDirections, _format_steps, _structured_steps
+from codefurther.transport import default_transport
+
+__author__ = 'Danny Goodall'
+
+__all__ = ['directions_matrix', 'RouteMatrix', 'RouteResult', 'RateLimiter']
+
+#: The route of one cell of a :py:class:`RouteMatrix`. ``distance`` is in metres, ``duration`` is in seconds and
+#: ``steps`` is the :py:class:`list` of steps formatted as :py:attr:`~directions.GetDirections.steps` formats them, or
+#: ``None`` if the steps weren't asked for. If the route couldn't be found, ``found`` is ``False``, the other fields are
+#: ``None`` and ``error`` holds the exception.
+RouteResult = namedtuple(
+    'RouteResult', ['origin', 'destination', 'mode', 'found', 'distance', 'duration', 'steps', 'error']
+)
+
+
+class RateLimiter(object):
+    """A token bucket that paces requests to no more than ``rate`` a second, with bursts of up to ``burst``.
+
+    One limiter can be shared between threads, and between several batches that use the same API key.
+
+    Args:
+        rate (:py:class:`float`): The number of requests allowed each second, on average.
+        burst (:py:class:`int`): The number of requests that can be made at once after a quiet spell. Defaults to
+            ``rate``.
+    Attributes:
+        rate (:py:class:`float`): The number of requests allowed each second.
+        burst (:py:class:`int`): The number of requests that can be made at once.
+    Returns:
+        RateLimiter (:py:class:`RateLimiter`): The RateLimiter instance.
+    """
+
+    def __init__(self, rate=10, burst=None):
+        if rate <= 0:
+            raise ValueError("The RateLimiter needs a rate that is greater than 0.")
+        self.rate = float(rate)
+        self.burst = burst if burst is not None else max(1, int(rate))
+        self._tokens = float(self.burst)
+        self._updated = time.time()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Wait until a request is allowed, and take its token."""
+        while True:
+            with self._lock:
+                now = time.time()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if now >= self._paused_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = max(self._paused_until - now, (1 - self._tokens) / self.rate)
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Stop every request for ``seconds``, because the server has said that it is getting too many.
+
+        Args:
+            seconds (:py:class:`float`): How long to stop for.
+        """
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.time() + seconds)
+            self._tokens = 0.0
+
+
+class RouteMatrix(object):
+    """The routes found by :py:func:`directions_matrix`, one for each mode, starting point and end point.
+
+    Iterating over the matrix yields every :py:class:`RouteResult`, mode by mode, then row by row.
+
+    Args:
+        origins (:py:class:`list`): The starting points.
+        destinations (:py:class:`list`): The end points.
+        modes (:py:class:`list`): The modes of travel.
+        results (:py:class:`list`): The results, indexed by ``[mode][origin][destination]``.
+    Attributes:
+        origins (:py:class:`list`): The starting points, in the order of the rows.
+        destinations (:py:class:`list`): The end points, in the order of the columns.
+        modes (:py:class:`list`): The modes of travel.
+    Returns:
+        RouteMatrix (:py:class:`RouteMatrix`): The RouteMatrix instance.
+    """
+
+    def __init__(self, origins, destinations, modes, results):
+        self.origins = origins
+        self.destinations = destinations
+        self.modes = modes
+        self._results = results
+
+    def __iter__(self):
+        for rows in self._results:
+            for row in rows:
+                for result in row:
+                    yield result
+
+    def __len__(self):
+        return len(self.modes) * len(self.origins) * len(self.destinations)
+
+    def rows(self, mode=None):
+        """Return the results for one mode of travel as a :py:class:`list` of rows, one for each starting point.
+
+        Args:
+            mode (:py:class:`str`): The mode of travel. Defaults to the first mode.
+        Returns:
+            (:py:class:`list`): A :py:class:`list` of :py:class:`list` of :py:class:`RouteResult`.
+        """
+        return self._results[self.modes.index(mode) if mode is not None else 0]
+
+    def cell(self, origin, destination, mode=None):
+        """Return the result for one starting point, end point and mode of travel.
+
+        Args:
+            origin (:py:class:`str`): The starting point.
+            destination (:py:class:`str`): The end point.
+            mode (:py:class:`str`): The mode of travel. Defaults to the first mode.
+        Returns:
+            (:py:class:`RouteResult`): The result.
+        """
+        return self.rows(mode)[self.origins.index(origin)][self.destinations.index(destination)]
+
+    @property
+    def failures(self):
+        """The results whose route couldn't be found, or whose request failed.
+
+        Returns:
+            (:py:class:`list`): A :py:class:`list` of :py:class:`RouteResult`.
+        """
+        return [result for result in self if not result.found]
+
+
+def _route_result(origin, destination, mode, route, render_steps):
+    """Internal routine to make the :py:class:`RouteResult` of a route picked out by :py:class:`GetDirections`"""
+    legs = route['raw'][0]['legs']
+    return RouteResult(
+        origin,
+        destination,
+        mode,
+        True,
+        sum(leg['distance']['value'] for leg in legs),
+        sum(leg['duration']['value'] for leg in legs),
+        route['steps'] if render_steps else None,
+        None
+    )
+
+
+def _find_route(origin, destination, mode, transport, rate_limiter, retries, backoff, route_cache, render_steps):
+    """Internal routine to find the route of one cell of the matrix, retrying when Google's rate limit is hit"""
+    if mode.lower() not in GetDirections.valid_modes:
+        return RouteResult(origin, destination, mode, False, None, None, None, ValueError(
+            "The mode of travel must be one of {}.".format(", ".join(GetDirections.valid_modes))
+        ))
+
+    route = route_cache.get(origin, destination, mode) if route_cache is not None else None
+    if route is None:
+        attempt = 0
+        while True:
+            rate_limiter.acquire()
+            try:
+                directions = _TransportDirections(transport).directions(origin, destination, mode)
+            except RateLimitExceeded as e:
+                if attempt >= retries:
+                    return RouteResult(origin, destination, mode, False, None, None, None, e)
+                # Everyone waits, not just this request, otherwise the other workers keep hitting the limit
+                rate_limiter.pause(backoff * 2 ** attempt)
+                attempt += 1
+            except Exception as e:
+                return RouteResult(origin, destination, mode, False, None, None, None, e)
+            else:
+                break
+
+        if not directions:
+            return RouteResult(origin, destination, mode, False, None, None, None, None)
+
+        route = GetDirections._render(directions)
+        if render_steps:
+            route['steps'] = _format_steps(_structured_steps(directions))
+        if route_cache is not None:
+            route_cache.set(origin, destination, mode, route)
+    elif render_steps and 'steps' not in route:
+        # The route was cached without its steps. They are formatted for this result only, as caching the route again
+        # would extend its time to live
+        route['steps'] = _format_steps(_structured_steps(route['raw']))
+
+    return _route_result(origin, destination, mode, route, render_steps)
+
+
+def directions_matrix(origins, destinations, modes=("walking",), max_workers=4, rate_limiter=None, retries=3,
+                      backoff=1.0, transport=None, route_cache=None, render_steps=True):
+    """Find the route from every starting point to every end point, for every mode of travel.
+
+    Up to ``max_workers`` routes are asked for at the same time, and no faster than ``rate_limiter`` allows. When Google
+    says that its rate limit has been reached, every request is paused for ``backoff`` seconds, doubling each time the
+    same route is turned away, and the route is tried again up to ``retries`` times. An error finding one route is kept
+    in that route's :py:class:`RouteResult` rather than being raised, so the rest of the matrix carries on.
+
+    Args:
+        origins (iterable): The starting points.
+        destinations (iterable): The end points.
+        modes (iterable): The modes of travel - each of "walking", "driving", "bicycling" or "transit".
+        max_workers (:py:class:`int`): The most routes to ask for at the same time.
+        rate_limiter (:py:class:`RateLimiter`): The limiter that paces the requests. Defaults to 10 a second.
+        retries (:py:class:`int`): How many times to try a route again after it has been rate limited.
+        backoff (:py:class:`float`): The number of seconds to pause for, the first time that a route is rate limited.
+        transport (:py:class:`~transport.Transport`): The transport used to reach Google Maps. If None, the transport
+            shared by all instances is used.
+        route_cache (:py:class:`~routes.RouteCache`): If not None, routes are looked for in this cache before Google is
+            asked, and the routes that are found are added to it.
+        render_steps (:py:class:`bool`): If ``False`` only the distance and duration of each route are worked out, and
+            the steps are left unformatted, which is quicker when only the totals are needed.
+    Returns:
+        (:py:class:`RouteMatrix`): The results.
+    Raises:
+        ValueError: If ``max_workers`` is less than 1.
+    """
+    if max_workers < 1:
+        raise ValueError("The directions_matrix function needs max_workers to be at least 1.")
+
+    origins, destinations, modes = list(origins), list(destinations), list(modes)
+    rate_limiter = rate_limiter if rate_limiter is not None else RateLimiter()
+    transport = transport if transport is not None else default_transport()
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        futures = [
+            [
+                [
+                    executor.submit(
+                        _find_route, origin, destination, mode, transport, rate_limiter, retries, backoff, route_cache,
+                        render_steps
+                    ) for destination in destinations
+                ] for origin in origins
+            ] for mode in modes
+        ]
+        results = [[[future.result() for future in row] for row in rows] for rows in futures]
+    finally:
+        executor.shutdown(wait=True)
+
+    return RouteMatrix(origins, destinations, modes, results)
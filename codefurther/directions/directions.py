@@ -20,9 +20,80 @@
 """
 __author__ = 'Danny Goodall'
 
-from gmaps import Directions
+from collections import namedtuple
+
+from gmaps import Directions, errors, status
+from gmaps.compat import urlparse
 from gmaps.errors import NoResults, InvalidRequest, RateLimitExceeded, RequestDenied, GmapException
-from markupsafe import Markup
+from codefurther.directions.instructions import strip_instruction
+from codefurther.transport import default_transport
+
+#: One step of a route, as returned by :py:attr:`GetDirections.structured_steps`. ``instruction`` is the plain text of
+#: the step, ``distance`` is in metres and ``duration`` is in seconds. ``distance_text`` and ``duration_text`` are the
+#: same measurements as Google writes them, such as "0.2 km" and "3 mins".
+Step = namedtuple('Step', ['instruction', 'distance', 'duration', 'distance_text', 'duration_text'])
+
+
+def _structured_steps(directions):
+    """Internal routine to build the :py:class:`Step` list of the first leg of some raw directions"""
+    return [
+        Step(
+            strip_instruction(step['html_instructions']),
+            step['distance']['value'],
+            step['duration']['value'],
+            step['distance']['text'],
+            step['duration']['text']
+        ) for step in directions[0]['legs'][0]['steps']
+    ]
+
+
+def _format_steps(structured_steps):
+    """Internal routine to format a :py:class:`Step` list as the text returned by :py:attr:`GetDirections.steps`"""
+    return [
+        "{:3}. {} ({} / {})".format(
+            counter + 1,
+            step.instruction,
+            step.distance_text,
+            step.duration_text
+        ) for counter, step in enumerate(structured_steps)
+    ]
+
+
+class _TransportDirections(Directions):
+    """A :py:class:`gmaps.Directions` that sends its requests through a :py:class:`~transport.Transport`
+
+    The gmaps client calls the module level ``requests.get`` for every request, so this overrides
+    ``_make_request`` to do the same work using the transport's pooled connections instead.
+    """
+    def __init__(self, transport, **kwargs):
+        super(_TransportDirections, self).__init__(**kwargs)
+        self.transport = transport
+
+    def _make_request(self, url, parameters, result_key):
+        url = urlparse.urljoin(urlparse.urljoin(self.base, url), "json")
+
+        # drop all None values and use defaults if not set
+        parameters = dict((key, value) for key, value in parameters.items() if value is not None)
+        parameters.setdefault("sensor", self.sensor)
+        parameters = self._serialize_parameters(parameters)
+        if self.api_key:
+            parameters["key"] = self.api_key
+
+        raw_response = self.transport.get(url, params=parameters)
+        response = raw_response.json()
+
+        if response["status"] == status.OK and result_key is not None:
+            return response[result_key]
+        elif response["status"] == status.OK:
+            del response["status"]
+            return response
+        else:
+            response["url"] = raw_response.url
+            raise errors.EXCEPTION_MAPPING.get(
+                response["status"],
+                errors.GmapException
+            )(response)
+
 
 class GetDirections:
     """A wrapper for the gmaps Direction class to make it simpler to deal with in the classroom
@@ -72,11 +143,17 @@ class GetDirections:
     new routes without the need to create a brand new :py:meth:`GetDirections` object.
 
     >>> new_directions = directions.new_journey("winchester, uk", "southampton, uk", "driving")
+
+    Journeys that are asked for again and again can be remembered in a :py:class:`~routes.RouteCache`, which can be
+    shared between instances and kept in a file.
+
+    >>> routes = RouteCache(disk="routes.sqlite")
+    >>> directions = GetDirections("southampton, UK","winchester, UK", route_cache=routes)
     """
 
     valid_modes = ['walking', 'driving', 'bicycling', 'transit']
 
-    def __init__(self, starting_point, end_point, mode="walking"):
+    def __init__(self, starting_point, end_point, mode="walking", transport=None, route_cache=None):
         """Create a new :py:class:`GetDirections` instance that can be interrogated for route details
         between `starting_point` and `end_point`.
 
@@ -85,6 +162,10 @@ class GetDirections:
             end_point (:py:class:`str`) : The text string that describes the end point for the route
             mode (:py:class:`str`) : Text string either "walking", "driving", "bicycling" or "transit"
                 Note that transit doesn't seem to be widely supported outside of the US.
+            transport (:py:class:`~transport.Transport`, optional) : The transport whose pooled connections are used
+                to reach Google Maps. If None, the transport shared by all instances is used.
+            route_cache (:py:class:`~routes.RouteCache`, optional) : The cache of routes that have already been found.
+                If None, every journey is asked for from Google Maps.
 
         Attributes:
             starting_point (:py:class:`str`) : The text string that describes the starting point for the route
@@ -93,15 +174,21 @@ class GetDirections:
                 Note that transit doesn't seem to be widely supported outside of the US.
             default_mode (:py:class:`str`, optional) : The mode that was specified the first time the object instance
                 was created.
+            transport (:py:class:`~transport.Transport`) : The transport used to reach Google Maps.
+            route_cache (:py:class:`~routes.RouteCache`) : The cache of routes that have already been found, or None.
         """
         self.starting_point = None
         self.end_point = None
         self.mode = None
         self.default_mode = mode
+        self.transport = transport if transport is not None else default_transport()
+        self.route_cache = route_cache
         self._found = None
         self._heading = None
         self._footer = None
         self._steps = None
+        self._structured_steps = None
+        self._route = None
         self._directions = None
         self.new_journey(starting_point, end_point, mode)
 
@@ -112,7 +199,11 @@ class GetDirections:
 
         If the journey appears valid to Google Maps, then this method sets appropriate values for the
         :py:attr:`GetDirections.heading` method, the :py:attr:`GetDirections.footer` and the
-        :py:attr:`GetDirections.steps` methods.
+        :py:attr:`GetDirections.steps` methods. If the journey is in the :py:attr:`GetDirections.route_cache`, those
+        values are taken from the cache instead of from Google Maps. Without a cache the steps aren't formatted until they
+        are first asked for, so checking :py:attr:`GetDirections.found` or :py:attr:`GetDirections.heading` stays quick.
+        A route found by Google is cached with its steps already formatted, and a cached route is never written again,
+        so reading it doesn't extend its time to live.
 
         Args:
             starting_point (:py:class:`str`) : The text string that describes the starting point for the route
@@ -137,6 +228,8 @@ class GetDirections:
         self._heading = ""
         self._footer = ""
         self._steps = []
+        self._structured_steps = []
+        self._route = None
         self._found = False
 
         # Let's make sure that mode is valid
@@ -146,38 +239,68 @@ class GetDirections:
             )
             return self
 
-        # Grab the directions, check for an error
-        try:
-            self._directions = Directions().directions(self.starting_point, self.end_point, self.mode)
-        except (NoResults, InvalidRequest, GmapException) as e:
-            self._heading = "We couldn't find ({}) directions from: {}, to {}.".format(
-                self.mode,
-                self.starting_point,
-                self.end_point
-            )
-        except (RateLimitExceeded, RequestDenied) as e:
-            self._heading = "Google is a little busy at the moment, or for some reason our request has been " \
-                            "denied. Wait a while, and then try again."
-        else:
-            if self._directions:
-                self._found = True
-                self._heading = "These are the steps for the ({}) journey from {} to {}.".format(
+        route = self.route_cache.get(
+            self.starting_point, self.end_point, self.mode
+        ) if self.route_cache is not None else None
+
+        if route is None:
+            # Grab the directions, check for an error
+            try:
+                directions = _TransportDirections(self.transport).directions(
+                    self.starting_point,
+                    self.end_point,
+                    self.mode
+                )
+            except (NoResults, InvalidRequest, GmapException) as e:
+                self._heading = "We couldn't find ({}) directions from: {}, to {}.".format(
                     self.mode,
-                    self._directions[0]['legs'][0]['start_address'],
-                    self._directions[0]['legs'][0]['end_address'],
+                    self.starting_point,
+                    self.end_point
                 )
-                self._steps = [
-                    "{:3}. {} ({} / {})".format(
-                        counter + 1,
-                        Markup(step['html_instructions']).striptags(),
-                        step['distance']['text'],
-                        step['duration']['text']
-                    ) for counter, step in enumerate(self._directions[0]['legs'][0]['steps'])
-                ]
-                self._footer = self._directions[0]['copyrights']
+                return self
+            except (RateLimitExceeded, RequestDenied) as e:
+                self._heading = "Google is a little busy at the moment, or for some reason our request has been " \
+                                "denied. Wait a while, and then try again."
+                return self
+
+            self._directions = directions
+            if not directions:
+                return self
+
+            route = self._render(directions)
+            if self.route_cache is not None:
+                # Format the steps now, so they are cached with the route and the route is only written once
+                route['steps'] = _format_steps(_structured_steps(directions))
+                self.route_cache.set(self.starting_point, self.end_point, self.mode, route)
+
+        self._found = True
+        self._route = route
+        self._directions = route['raw']
+        self._heading = "These are the steps for the ({}) journey from {} to {}.".format(
+            self.mode,
+            route['start_address'],
+            route['end_address'],
+        )
+        self._steps = route.get('steps')
+        self._structured_steps = None
+        self._footer = route['footer']
 
         return self
 
+    @staticmethod
+    def _render(directions):
+        """Internal method to pick out the parts of a route that are kept in a :py:class:`~routes.RouteCache`
+
+        The formatted steps are added to the route just before it is cached.
+        """
+        leg = directions[0]['legs'][0]
+        return {
+            'start_address': leg['start_address'],
+            'end_address': leg['end_address'],
+            'footer': directions[0]['copyrights'],
+            'raw': directions,
+        }
+
     @property
     def heading(self):
         """Returns the text heading for this route.
@@ -214,9 +337,48 @@ class GetDirections:
         Yields:
             (:py:class:`str`) : A generator of list of strings that describe the steps for this route, or an empty list if the route is not valid.
         """
+        if self._steps is None:
+            self._steps = _format_steps(self.structured_steps)
+
         for step in self._steps:
             yield step
 
+    @property
+    def structured_steps(self):
+        """Returns the steps of this route as measurements rather than text.
+
+        The steps are built from the raw route the first time they are asked for, and kept for the rest of the journey.
+
+        Returns:
+            _structured_steps (:py:class:`list`) : A :py:class:`list` of :py:class:`Step`, or an empty list if the
+            route is not valid.
+        """
+        if self._structured_steps is None:
+            self._structured_steps = _structured_steps(self._directions)
+        return self._structured_steps
+
+    @property
+    def distance(self):
+        """Returns the length of this route.
+
+        Returns:
+            (:py:class:`int`) : The length of the route in metres, or None if the route is not valid.
+        """
+        if not self._found:
+            return None
+        return sum(leg['distance']['value'] for leg in self._directions[0]['legs'])
+
+    @property
+    def duration(self):
+        """Returns how long this route takes.
+
+        Returns:
+            (:py:class:`int`) : The time the route takes in seconds, or None if the route is not valid.
+        """
+        if not self._found:
+            return None
+        return sum(leg['duration']['value'] for leg in self._directions[0]['legs'])
+
     @property
     def found(self):
         """Reveals if the route specified was found.
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2014 Danny Goodall
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""The :mod:`routes` module contains :py:class:`RouteCache`, which remembers the routes that
+:py:class:`~directions.GetDirections` has found, so that asking for the same journey again doesn't go back to Google.
+
+A classroom or a kiosk usually asks for the same few journeys over and over again, so one cache can be shared by all of
+the :py:class:`~directions.GetDirections` instances in a program, and kept in a file between runs::
+
+    from codefurther.directions import GetDirections, RouteCache
+
+    routes = RouteCache(disk="routes.sqlite")
+    directions = GetDirections("southampton, uk", "winchester, uk", route_cache=routes)
+
+.. moduleauthor:: Danny Goodall <danny@onebloke.com>
+
+"""
+import re
+
+from codefurther.cache import TieredCache
+
+__author__ = 'Danny Goodall'
+
+__all__ = ['RouteCache']
+
+_SPACES = re.compile(r"\s+", re.UNICODE)
+
+
+def _normalise(place):
+    """Internal routine to reduce a place name to lower case words separated by single spaces"""
+    return _SPACES.sub(" ", place.lower()).strip(" ,")
+
+
+class RouteCache(object):
+    """A cache of routes, keyed by their starting point, end point and mode of travel.
+
+    Place names are compared ignoring case and spacing, so "Southampton,  UK" and "southampton, uk" are the same
+    journey. Each route is kept with its footer, the addresses that its heading names and, once they have been formatted,
+    its steps, so a cached journey skips both the request to Google and the formatting of its steps. Only routes that
+    were found are cached - an error, including Google's rate limit, is never remembered.
+
+    The routes are held in a :py:class:`~cache.TieredCache` - memory that is bounded in size and evicts the least
+    recently used routes first, in front of an optional sqlite file.
+
+    Args:
+        ttl (:py:class:`float`): The number of seconds to keep a route for. If None, routes don't expire.
+        max_size (:py:class:`int`): The most characters of routes, measured as JSON, to hold in memory.
+        disk (:py:class:`~cache.DiskCache` or :py:class:`str`): The persistent cache, or the path of the file to keep
+            it in. If None, routes are only held in memory.
+    Attributes:
+        ttl (:py:class:`float`): The number of seconds to keep a route for.
+        cache (:py:class:`~cache.TieredCache`): The cache that holds the routes.
+    Returns:
+        RouteCache (:py:class:`RouteCache`): The RouteCache instance.
+    """
+
+    def __init__(self, ttl=24 * 60 * 60, max_size=4 * 1024 * 1024, disk=None):
+        self.ttl = ttl
+        self.cache = TieredCache(max_size, disk)
+
+    @staticmethod
+    def key(starting_point, end_point, mode):
+        """Return the key that a journey is cached with.
+
+        Args:
+            starting_point (:py:class:`str`): The starting point of the journey.
+            end_point (:py:class:`str`): The end point of the journey.
+            mode (:py:class:`str`): The mode of travel.
+        Returns:
+            (:py:class:`str`): The key.
+        """
+        return "route:{}|{}|{}".format(_normalise(starting_point), _normalise(end_point), _normalise(mode))
+
+    def get(self, starting_point, end_point, mode):
+        """Return the route cached for a journey, or ``None`` if there isn't one.
+
+        Args:
+            starting_point (:py:class:`str`): The starting point of the journey.
+            end_point (:py:class:`str`): The end point of the journey.
+            mode (:py:class:`str`): The mode of travel.
+        Returns:
+            (:py:class:`dict`): The route's ``start_address``, ``end_address``, ``footer``, ``raw`` directions and,
+                if they have been formatted, ``steps``, or ``None``.
+        """
+        return self.cache.get(self.key(starting_point, end_point, mode))
+
+    def set(self, starting_point, end_point, mode, route):
+        """Cache the route of a journey.
+
+        Args:
+            starting_point (:py:class:`str`): The starting point of the journey.
+            end_point (:py:class:`str`): The end point of the journey.
+            mode (:py:class:`str`): The mode of travel.
+            route (:py:class:`dict`): The route, as returned by :py:meth:`RouteCache.get`.
+        """
+        self.cache.set(self.key(starting_point, end_point, mode), route, self.ttl)
+
+    def stats(self):
+        """Return the cache's hit and miss counters.
+
+        Returns:
+            (:py:class:`~cache.CacheStats`): The counters.
+        """
+        return self.cache.stats()
+
+    def clear(self, disk=True):
+        """Forget every route.
+
+        Args:
+            disk (:py:class:`bool`): If ``False``, only the routes held in memory are forgotten.
+        """
+        self.cache.clear(disk)
@@ -23,9 +23,12 @@ from builtins import *
 from future.standard_library import hooks
 with hooks():
     from urllib.parse import unquote
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
 import os
 import re
 import codecs
+import threading
 
 # This code from here: http://stackoverflow.com/a/24519338/1300916
 ESCAPE_SEQUENCE_RE = re.compile(r'''
@@ -116,3 +119,79 @@ class FileSpoofer:
         file_contents = self.get_file_contents_as_text(filename)
         return 200 if 'status' not in headers else headers['status'], headers, file_contents
 
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class StubServer:
+    """A real HTTP server, on a free local port, that serves the same files as :py:class:`FileSpoofer`.
+
+    httpretty can only patch the blocking socket calls made by ``requests``, so clients built on other HTTP libraries
+    (the asyncio clients for example) are tested against a :py:class:`StubServer` instead::
+
+        with StubServer("/lyricsapi", "tests/resources/lyricsapi") as server:
+            lyrics_machine = AsyncLyrics(base_url=server.url)
+
+    Args:
+        prefix (:py:class:`str`): The path that the files are served under, e.g. "/lyricsapi".
+        base_folder (:py:class:`str`): The folder that the files are read from.
+        extension (:py:class:`str`): The extension added to the requested path to make the filename.
+        delay (:py:class:`float`): The number of seconds to wait before answering each request.
+    Attributes:
+        url (:py:class:`str`): The base url of the server, including the prefix and a trailing slash.
+        requests_seen (:py:class:`list`): The path of every request that has been received.
+    """
+    def __init__(self, prefix="", base_folder="tests/resources", extension=".json", delay=0):
+        self.prefix = prefix.rstrip("/")
+        self.base_folder = base_folder
+        self.extension = extension
+        self.delay = delay
+        self.url = None
+        self.requests_seen = []
+        self.file_spoofer = None
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests_seen.append(self.path)
+                if stub.delay:
+                    threading.Event().wait(stub.delay)
+                try:
+                    status, headers, body = stub.file_spoofer.request_send_file(None, stub.host + self.path, {})
+                except Exception:
+                    status, body = 404, ""
+                body = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "text/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = _ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.host = "http://127.0.0.1:{}".format(self._server.server_address[1])
+        self.url = self.host + self.prefix + "/"
+        self.file_spoofer = FileSpoofer(self.host + self.prefix, self.base_folder, self.extension)
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,))
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
@@ -22,6 +22,15 @@
 __author__ = 'Danny Goodall'
 
 
-__all__= ["Lyrics"]
+__all__= ["Lyrics", "LyricsIndex", "MappedLyricsIndex", "IndexResult", "ArtistMatcher",
+         "ArtistMatch"]
 
-from codefurther.lyrics.lyrics import Lyrics
\ No newline at end of file
+from six import PY3
+from codefurther.lyrics.lyrics import Lyrics
+from codefurther.lyrics.fuzzy import ArtistMatcher, ArtistMatch
+from codefurther.lyrics.index import LyricsIndex, MappedLyricsIndex, IndexResult
+
+# The asyncio client uses Python 3 only syntax
+if PY3:
+    __all__.append("AsyncLyrics")
+    from codefurther.lyrics.async_lyrics import AsyncLyrics
\ No newline at end of file
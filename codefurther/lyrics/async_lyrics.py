@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2014 Danny Goodall
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""The ``async_lyrics`` module contains :py:class:`AsyncLyrics`, an asyncio version of :py:class:`~lyrics.Lyrics`.
+
+Every method of :py:class:`~lyrics.Lyrics` is a coroutine here, so it is called and awaited::
+
+    from codefurther.lyrics import AsyncLyrics
+
+    async def show_lyrics():
+        async with AsyncLyrics() as lyrics_machine:
+            for lyric_line in await lyrics_machine.song_lyrics("billy bragg", "days like these"):
+                print(lyric_line)
+
+The same ``ValueError`` and :py:mod:`~codefurther.errors` exceptions are raised as by :py:class:`~lyrics.Lyrics`.
+
+.. moduleauthor:: Danny Goodall <danny@onebloke.com>
+
+"""
+from urllib.parse import urljoin
+
+from codefurther.async_transport import AsyncTransport
+from codefurther.lyrics.lyrics import _LyricsAPI
+
+__author__ = 'Danny Goodall'
+
+
+class AsyncLyrics(_LyricsAPI):
+    """Provides the programmer with coroutines that return lyrics from the Wikia site.
+
+    Args:
+        base_url (str): The base url of the remote API before the specific service details are appended.
+        transport (:py:class:`~async_transport.AsyncTransport`): The transport used to reach the remote API. If None,
+            the instance creates its own, and closes it when :py:meth:`AsyncLyrics.close` is called.
+    Attributes:
+        error_format (:py:class:`str`): The format string to be used when creating error messages.
+        bad_response (:py:class:`str`): The text to be used in the raised error if the server response is unexpected.
+    Returns:
+        AsyncLyrics (:py:class:`AsyncLyrics`): The AsyncLyrics instance.
+    """
+
+    def __init__(self, base_url="http://cflyricsserver.herokuapp.com/lyricsapi/", transport=None):
+        self.base_url = base_url
+        self._owns_transport = transport is None
+        self.transport = transport if transport is not None else AsyncTransport()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self):
+        """Close the transport, if it was created by this instance."""
+        if self._owns_transport:
+            await self.transport.close()
+
+    async def _get_json_response(self, service_url):
+        full_url = urljoin(
+            self.base_url,
+            service_url
+        )
+
+        return await self.transport.get_json(
+            full_url,
+            error_format=self.error_format,
+            service_url=service_url
+        )
+
+    async def song_lyrics(self, artist, title):
+        """Return a list of string lyrics for the given artist and song title.
+
+        Args:
+            artist: (:py:class:`str`) The name of the artist for the song being looked up.
+            title: (:py:class:`str`) The name of the song being looked up.
+        Returns:
+            (:py:class:`list`) of (:py:class:`str`) one for each lyric line in the song.
+        """
+        service_url = self._song_lyrics_url(artist, title)
+
+        json_response = await self._get_json_response(service_url)
+
+        return self._unpack(json_response, 'lyrics')
+
+    async def artist_songs(self, artist):
+        """Return the song titles for the given artist.
+
+        Args:
+            artist: (:py:class:`str`) The name of the artist for the song being looked up.
+        Returns:
+            song_list: (:py:class:`list`): A :py:class:`list` of :py:class:`str` representing each song of the artist.
+        """
+        service_url = self._artist_songs_url(artist)
+
+        json_response = await self._get_json_response(service_url)
+
+        return self._unpack(json_response, 'songs')
+
+    async def _artist_search(self, artist):
+        """Internal coroutine to return all details from artist search as a dict"""
+        service_url = self._artist_search_url(artist)
+
+        json_response = await self._get_json_response(service_url)
+
+        return self._unpack(json_response, 'artist')
+
+    async def artist_search(self, artist):
+        """Return the first result of a search for the given artist on Lyrics Wikia.
+
+        Args:
+            artist: (:py:class:`str`) The name of the artist being searched for.
+        Returns:
+            result: (:py:class:`str`): The result of the search.
+        """
+        json_response = await self._artist_search(artist)
+
+        return json_response['artist']
+
+    async def artist_exists(self, artist):
+        """Determine whether an artist exists in Lyrics Wikia USING THE SPELLING and puntuation provided.
+
+        Args:
+            artist: (:py:class:`str`) The name of the artist being searched for.
+        Returns:
+            result: (:py:class:`bool`): ``True`` if the artist was found exactly as named in the search results.
+        """
+        artist_search_result = await self.artist_search(artist)
+        return self._is_exact_artist(artist, artist_search_result)
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2014 Danny Goodall
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""The :mod:`fuzzy` module contains :py:class:`ArtistMatcher`, which finds the known artist whose name is most like
+a misspelt one, without contacting the lyrics server.
+
+Names are compared by the three letter sequences (trigrams) that they contain, so "bily brag" is matched to
+"Billy Bragg"::
+
+    from codefurther.lyrics import ArtistMatcher, Lyrics
+    from codefurther.top40 import Top40
+
+    matcher = ArtistMatcher()
+    matcher.add_many(entry.artist for entry in Top40().singles)
+
+    lyrics_machine = Lyrics(artist_matcher=matcher)
+    print(lyrics_machine.canonical_artist("ed sheran"))
+
+.. moduleauthor:: Danny Goodall <danny@onebloke.com>
+
+"""
+from collections import namedtuple
+import re
+import threading
+
+__author__ = 'Danny Goodall'
+
+__all__ = ['ArtistMatcher', 'ArtistMatch', 'similarity']
+
+#: The result of :py:meth:`ArtistMatcher.match`. ``score`` runs from 0, nothing in common, to 1, the same name.
+ArtistMatch = namedtuple('ArtistMatch', ['name', 'score'])
+
+_PUNCTUATION = re.compile(r"[^\w\s]", re.UNICODE)
+_SPACES = re.compile(r"\s+", re.UNICODE)
+
+
+def _normalise(name):
+    """Internal routine to reduce a name to lower case words separated by single spaces, with no punctuation"""
+    return _SPACES.sub(" ", _PUNCTUATION.sub("", name.lower().replace("&", " and "))).strip()
+
+
+def _trigrams(normalised):
+    """Internal routine to return the set of trigrams in a normalised name, padded so short names have some"""
+    padded = "  {} ".format(normalised)
+    return set(padded[start:start + 3] for start in range(len(padded) - 2))
+
+
+def similarity(first, second):
+    """Return how alike two artists' names are, scored in the same way as :py:meth:`ArtistMatcher.match`.
+
+    Args:
+        first (:py:class:`str`): One name.
+        second (:py:class:`str`): The other name.
+    Returns:
+        (:py:class:`float`): The score, from 0 for nothing in common to 1 for the same name.
+    """
+    first, second = _normalise(first), _normalise(second)
+    if not first or not second:
+        return 0.0
+    if first == second:
+        return 1.0
+    first_trigrams, second_trigrams = _trigrams(first), _trigrams(second)
+    return 2.0 * len(first_trigrams & second_trigrams) / (len(first_trigrams) + len(second_trigrams))
+
+
+class ArtistMatcher(object):
+    """Matches misspelt artist names to known artist names, using an index of the trigrams in each name.
+
+    The score of a match is the Dice coefficient of the two names' trigrams - twice the number they share, divided by
+    the number in both names - after case, punctuation and spacing have been ignored. Only the names that share a
+    trigram with the name being matched are scored, so a match takes well under a millisecond for thousands of names.
+    ``name in matcher`` is stricter - it is only ``True`` for a spelling that was added, ignoring case. One matcher can
+    be shared between threads.
+
+    Args:
+        threshold (:py:class:`float`): The lowest score that counts as a confident match.
+        names (iterable): Artist names to start with.
+    Attributes:
+        threshold (:py:class:`float`): The lowest score that counts as a confident match.
+    Returns:
+        ArtistMatcher (:py:class:`ArtistMatcher`): The ArtistMatcher instance.
+    """
+
+    def __init__(self, threshold=0.7, names=()):
+        self.threshold = threshold
+        self._names = {}
+        self._spellings = set()
+        self._trigram_counts = {}
+        self._index = {}
+        self._lock = threading.Lock()
+        self.add_many(names)
+
+    def __len__(self):
+        return len(self._names)
+
+    def __contains__(self, name):
+        # Only case is ignored - "Simon and Garfunkel" is not "Simon & Garfunkel", even though they match
+        return name.lower() in self._spellings
+
+    def add(self, name):
+        """Add an artist's name. The first spelling added of a name is the one that is returned by matches.
+
+        Args:
+            name (:py:class:`str`): The artist's name, spelt as it should be returned.
+        """
+        normalised = _normalise(name)
+        if not normalised:
+            return
+        with self._lock:
+            self._spellings.add(name.lower())
+            if normalised in self._names:
+                return
+            self._names[normalised] = name
+            trigrams = _trigrams(normalised)
+            self._trigram_counts[normalised] = len(trigrams)
+            for trigram in trigrams:
+                self._index.setdefault(trigram, []).append(normalised)
+
+    def add_many(self, names):
+        """Add several artists' names.
+
+        Args:
+            names (iterable): The artists' names.
+        """
+        for name in names:
+            self.add(name)
+
+    def match(self, name):
+        """Return the known artist whose name is most like ``name``.
+
+        Args:
+            name (:py:class:`str`): The name to match.
+        Returns:
+            (:py:class:`ArtistMatch`): The known name and its score, or ``None`` if no known name shares anything with
+                ``name``.
+        """
+        normalised = _normalise(name)
+        if not normalised:
+            return None
+
+        with self._lock:
+            known = self._names.get(normalised)
+            if known is not None:
+                return ArtistMatch(known, 1.0)
+
+            trigrams = _trigrams(normalised)
+            shared = {}
+            for trigram in trigrams:
+                for candidate in self._index.get(trigram, ()):
+                    shared[candidate] = shared.get(candidate, 0) + 1
+
+            if not shared:
+                return None
+
+            best_score, best = max(
+                (2.0 * count / (len(trigrams) + self._trigram_counts[candidate]), candidate)
+                for candidate, count in shared.items()
+            )
+            return ArtistMatch(self._names[best], best_score)
+
+    def confident_match(self, name):
+        """Return the known artist's name that ``name`` matches with a score of at least ``threshold``.
+
+        Args:
+            name (:py:class:`str`): The name to match.
+        Returns:
+            (:py:class:`str`): The known artist's name, or ``None`` if there isn't a confident match.
+        """
+        match = self.match(name)
+        if match is None or match.score < self.threshold:
+            return None
+        return match.name
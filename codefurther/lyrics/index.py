@@ -0,0 +1,450 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2014 Danny Goodall
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""The :mod:`index` module contains :py:class:`LyricsIndex`, a local full text index of song lyrics that can be
+searched without contacting the lyrics server.
+
+A :py:class:`~lyrics.Lyrics` instance that is given an index adds every song and song list that it reads to it::
+
+    from codefurther.lyrics import Lyrics, LyricsIndex
+
+    index = LyricsIndex()
+    lyrics_machine = Lyrics(index=index)
+    lyrics_machine.song_lyrics("billy bragg", "days like these")
+
+    for result in index.search("promises win votes"):
+        print(result.artist, result.title, result.line)
+
+    index.save("lyrics.index")
+
+A saved index is opened with :py:meth:`LyricsIndex.load`, which returns a read-only :py:class:`MappedLyricsIndex`. The
+file is memory-mapped and only its table of contents is read when it is opened, so even a large index opens quickly;
+the rest is read from the file as it is searched.
+
+.. moduleauthor:: Danny Goodall <danny@onebloke.com>
+
+"""
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+import json
+import math
+import mmap
+import re
+import struct
+import sys
+import threading
+
+__author__ = 'Danny Goodall'
+
+__all__ = ['LyricsIndex', 'MappedLyricsIndex', 'IndexResult']
+
+#: A song found by :py:meth:`LyricsIndex.search`. ``line`` is the first line of the song that contains the phrase.
+IndexResult = namedtuple('IndexResult', ['artist', 'title', 'score', 'line'])
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+_MAGIC = b'CFLYRICSINDEX1\n'
+_HEADER = struct.Struct('<QQ')
+
+# Postings are stored as (song, line, word) triples of unsigned 32 bit integers
+_TYPECODE = 'I' if array('I').itemsize == 4 else 'L'
+
+
+def _words(text):
+    """Internal routine to split ``text`` into the lower case words that are indexed"""
+    return _WORD.findall(text.lower())
+
+
+def _to_bytes(numbers):
+    return numbers.tobytes() if hasattr(numbers, 'tobytes') else numbers.tostring()
+
+
+def _from_bytes(data):
+    numbers = array(_TYPECODE)
+    if hasattr(numbers, 'frombytes'):
+        numbers.frombytes(data)
+    else:
+        numbers.fromstring(data)
+    return numbers
+
+
+def _sort_artists(songs):
+    """Internal routine to return the ``(lower case name, name)`` of each artist of ``songs``, sorted"""
+    return sorted(set((artist.lower(), artist) for artist, title, words in songs))
+
+
+def _sort_titles(songs):
+    """Internal routine to return the ``(lower case title, lower case artist, artist, title)`` of ``songs``, sorted"""
+    return sorted((title.lower(), artist.lower(), artist, title) for artist, title, words in songs)
+
+
+def _matching_artists(names, prefix):
+    """Internal routine to return the artists in ``names``, sorted by :py:func:`_sort_artists`, that start with
+    ``prefix``"""
+    prefix = prefix.lower()
+    artists = []
+    for lower, artist in names[bisect_left(names, (prefix,)):]:
+        if not lower.startswith(prefix):
+            break
+        artists.append(artist)
+    return artists
+
+
+def _matching_titles(names, prefix, artist):
+    """Internal routine to return the songs in ``names``, sorted by :py:func:`_sort_titles`, whose titles start with
+    ``prefix``"""
+    prefix = prefix.lower()
+    artist = artist.lower() if artist is not None else None
+    titles = []
+    for lower, lower_artist, song_artist, title in names[bisect_left(names, (prefix,)):]:
+        if not lower.startswith(prefix):
+            break
+        if artist is None or lower_artist == artist:
+            titles.append((song_artist, title))
+    return titles
+
+
+def _search(phrase, limit, songs, postings_of, lines_of, song_frequency):
+    """Internal routine to search an index for :py:meth:`LyricsIndex.search` and :py:meth:`MappedLyricsIndex.search`.
+
+    ``songs`` is the index's list of ``(artist, title, number of words)``, and ``postings_of``, ``lines_of`` and
+    ``song_frequency`` return a word's postings, a song's lines and the number of songs that contain a word.
+    """
+    words = _words(phrase)
+    if not words:
+        return []
+
+    # Start from the rarest word, and check that each of the others is in the right place
+    postings = [postings_of(word) for word in words]
+    if any(len(word_postings) == 0 for word_postings in postings):
+        return []
+    rarest = min(range(len(words)), key=lambda offset: len(postings[offset]))
+    others = [
+        (offset - rarest, set(zip(postings[offset][0::3], postings[offset][1::3], postings[offset][2::3])))
+        for offset in range(len(words)) if offset != rarest
+    ]
+
+    matches = {}
+    rarest_postings = postings[rarest]
+    for start in range(0, len(rarest_postings), 3):
+        song, line, word = rarest_postings[start:start + 3]
+        if all((song, line, word + shift) in positions for shift, positions in others):
+            first_line, count = matches.get(song, (line, 0))
+            matches[song] = (min(first_line, line), count + 1)
+
+    weight = sum(math.log(1.0 + float(len(songs)) / song_frequency(word)) for word in set(words))
+    ranked = sorted(
+        (
+            (count * weight / math.sqrt(max(songs[song][2], 1)), song, line)
+            for song, (line, count) in matches.items()
+        ),
+        key=lambda match: (-match[0], match[1])
+    )
+    if limit is not None:
+        ranked = ranked[:limit]
+
+    return [
+        IndexResult(songs[song][0], songs[song][1], score, lines_of(song)[line])
+        for score, song, line in ranked
+    ]
+
+
+class LyricsIndex(object):
+    """An in-memory full text index of song lyrics, which can be saved to a file.
+
+    Songs are identified by their artist and title, ignoring case. A song can be added with its lyrics, or just by its
+    title - as :py:meth:`~lyrics.Lyrics.artist_songs` returns - so that it can be found by
+    :py:meth:`LyricsIndex.titles`. One index can be shared between threads.
+
+    Returns:
+        LyricsIndex (:py:class:`LyricsIndex`): The LyricsIndex instance.
+    """
+
+    def __init__(self):
+        # Each song is (artist, title, number of words), with its lines kept separately
+        self._songs = []
+        self._song_lines = []
+        self._keys = {}
+        self._index = {}
+        # The number of songs that contain each word, kept up to date as songs are added so searches needn't count
+        self._song_counts = {}
+        self._sorted_artists = None
+        self._sorted_titles = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._songs)
+
+    @staticmethod
+    def load(path):
+        """Open an index that was saved with :py:meth:`LyricsIndex.save`.
+
+        Args:
+            path (:py:class:`str`): The index file.
+        Returns:
+            (:py:class:`MappedLyricsIndex`): The read-only index.
+        """
+        return MappedLyricsIndex(path)
+
+    def _postings(self, word):
+        return self._index.get(word, ())
+
+    def _song_frequency(self, word):
+        return self._song_counts[word]
+
+    def _song(self, artist, title):
+        """Internal routine to return the number of the song, adding it if it is new. Called with the lock held"""
+        key = (artist.lower(), title.lower())
+        song = self._keys.get(key)
+        if song is None:
+            song = self._keys[key] = len(self._songs)
+            self._songs.append((artist, title, 0))
+            self._song_lines.append(None)
+            self._sorted_artists = self._sorted_titles = None
+        return song
+
+    def add_song(self, artist, title, lines):
+        """Add the lyrics of a song to the index. A song whose lyrics are already indexed is left as it is.
+
+        Args:
+            artist (:py:class:`str`): The name of the artist.
+            title (:py:class:`str`): The title of the song.
+            lines (:py:class:`list` of :py:class:`str`): The lines of the song.
+        Returns:
+            (:py:class:`bool`): ``True`` if the lyrics were added.
+        """
+        with self._lock:
+            song = self._song(artist, title)
+            if self._song_lines[song] is not None:
+                return False
+
+            word_count = 0
+            song_words = set()
+            for line_number, line in enumerate(lines):
+                for position, word in enumerate(_words(line)):
+                    self._index.setdefault(word, array(_TYPECODE)).extend((song, line_number, position))
+                    song_words.add(word)
+                    word_count += 1
+
+            for word in song_words:
+                self._song_counts[word] = self._song_counts.get(word, 0) + 1
+
+            self._songs[song] = (artist, title, word_count)
+            self._song_lines[song] = list(lines)
+            return True
+
+    def add_titles(self, artist, titles):
+        """Add songs to the index by title alone, as returned by :py:meth:`~lyrics.Lyrics.artist_songs`.
+
+        Args:
+            artist (:py:class:`str`): The name of the artist.
+            titles (:py:class:`list` of :py:class:`str`): The titles of the artist's songs.
+        """
+        with self._lock:
+            for title in titles:
+                self._song(artist, title)
+
+    def artists(self, prefix=""):
+        """Return the artists in the index whose names start with ``prefix``, ignoring case.
+
+        Args:
+            prefix (:py:class:`str`): The start of the artist's name.
+        Returns:
+            (:py:class:`list` of :py:class:`str`): The artists' names, in alphabetical order.
+        """
+        with self._lock:
+            if self._sorted_artists is None:
+                self._sorted_artists = _sort_artists(self._songs)
+            names = self._sorted_artists
+        return _matching_artists(names, prefix)
+
+    def titles(self, prefix="", artist=None):
+        """Return the songs in the index whose titles start with ``prefix``, ignoring case.
+
+        Args:
+            prefix (:py:class:`str`): The start of the title.
+            artist (:py:class:`str`): If not None, only this artist's songs are returned.
+        Returns:
+            (:py:class:`list` of :py:class:`tuple`): The ``(artist, title)`` of each song, in title order.
+        """
+        with self._lock:
+            if self._sorted_titles is None:
+                self._sorted_titles = _sort_titles(self._songs)
+            names = self._sorted_titles
+        return _matching_titles(names, prefix, artist)
+
+    def lyrics(self, artist, title):
+        """Return the lines of a song in the index, ignoring case.
+
+        Args:
+            artist (:py:class:`str`): The name of the artist.
+            title (:py:class:`str`): The title of the song.
+        Returns:
+            (:py:class:`list` of :py:class:`str`): The lines of the song, or ``None`` if its lyrics aren't indexed.
+        """
+        with self._lock:
+            song = self._keys.get((artist.lower(), title.lower()))
+            return self._song_lines[song] if song is not None else None
+
+    def search(self, phrase, limit=10):
+        """Return the songs whose lyrics contain ``phrase``, best match first.
+
+        The words of the phrase must appear next to each other, in order, in one line of the song. Case and
+        punctuation are ignored. Songs are ranked by how many times they contain the phrase, weighted by how rare its
+        words are across the index and divided by the square root of the number of words in the song.
+
+        Args:
+            phrase (:py:class:`str`): The words to look for, such as a remembered line of the song.
+            limit (:py:class:`int`): The most results to return. If None, every match is returned.
+        Returns:
+            (:py:class:`list` of :py:class:`IndexResult`): The matching songs.
+        """
+        with self._lock:
+            return _search(phrase, limit, self._songs, self._postings, self._song_lines.__getitem__,
+                           self._song_frequency)
+
+    def save(self, path):
+        """Save the index to ``path``, so that it can be opened with :py:meth:`LyricsIndex.load`.
+
+        Args:
+            path (:py:class:`str`): The file to write.
+        """
+        with self._lock:
+            with open(path, 'wb') as index_file:
+                index_file.write(_MAGIC)
+                index_file.write(_HEADER.pack(0, 0))
+                offset = len(_MAGIC) + _HEADER.size
+
+                words = {}
+                for word in sorted(self._index):
+                    postings = _to_bytes(self._index[word])
+                    words[word] = (offset, len(postings), self._song_frequency(word))
+                    index_file.write(postings)
+                    offset += len(postings)
+
+                songs = []
+                for (artist, title, word_count), lines in zip(self._songs, self._song_lines):
+                    text = json.dumps(lines).encode('utf-8') if lines is not None else b''
+                    songs.append((artist, title, word_count, offset, len(text)))
+                    index_file.write(text)
+                    offset += len(text)
+
+                contents = json.dumps({
+                    'byteorder': sys.byteorder,
+                    'songs': songs,
+                    'words': words
+                }).encode('utf-8')
+                index_file.write(contents)
+
+                index_file.seek(len(_MAGIC))
+                index_file.write(_HEADER.pack(offset, len(contents)))
+
+
+class MappedLyricsIndex(object):
+    """A read-only index that is memory-mapped from a file written by :py:meth:`LyricsIndex.save`.
+
+    Args:
+        path (:py:class:`str`): The index file.
+    Attributes:
+        path (:py:class:`str`): The index file.
+    Returns:
+        MappedLyricsIndex (:py:class:`MappedLyricsIndex`): The MappedLyricsIndex instance.
+    Raises:
+        ValueError: If the file isn't a lyrics index.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError("{} is not a lyrics index.".format(path))
+
+        if self._map[:len(_MAGIC)] != _MAGIC:
+            self.close()
+            raise ValueError("{} is not a lyrics index.".format(path))
+
+        offset, length = _HEADER.unpack_from(self._map, len(_MAGIC))
+        contents = json.loads(self._map[offset:offset + length].decode('utf-8'))
+        self._swap = contents['byteorder'] != sys.byteorder
+        self._words = contents['words']
+        self._song_offsets = [(text_offset, text_length) for _, _, _, text_offset, text_length in contents['songs']]
+        self._songs = [(artist, title, word_count) for artist, title, word_count, _, _ in contents['songs']]
+        self._keys = dict(((artist.lower(), title.lower()), song) for song, (artist, title, _) in enumerate(self._songs))
+        # The names are sorted the first time they are searched, so that opening the index stays quick
+        self._sorted_artists = None
+        self._sorted_titles = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._songs)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Close the index file."""
+        self._map.close()
+        self._file.close()
+
+    def _postings(self, word):
+        location = self._words.get(word)
+        if location is None:
+            return ()
+        offset, length, _ = location
+        postings = _from_bytes(self._map[offset:offset + length])
+        if self._swap:
+            postings.byteswap()
+        return postings
+
+    def _lines(self, song):
+        offset, length = self._song_offsets[song]
+        if length == 0:
+            return None
+        return json.loads(self._map[offset:offset + length].decode('utf-8'))
+
+    def _song_frequency(self, word):
+        return self._words[word][2]
+
+    def artists(self, prefix=""):
+        with self._lock:
+            if self._sorted_artists is None:
+                self._sorted_artists = _sort_artists(self._songs)
+        return _matching_artists(self._sorted_artists, prefix)
+
+    def titles(self, prefix="", artist=None):
+        with self._lock:
+            if self._sorted_titles is None:
+                self._sorted_titles = _sort_titles(self._songs)
+        return _matching_titles(self._sorted_titles, prefix, artist)
+
+    def lyrics(self, artist, title):
+        song = self._keys.get((artist.lower(), title.lower()))
+        return self._lines(song) if song is not None else None
+
+    def search(self, phrase, limit=10):
+        return _search(phrase, limit, self._songs, self._postings, self._lines, self._song_frequency)
+
+    artists.__doc__ = LyricsIndex.artists.__doc__
+    titles.__doc__ = LyricsIndex.titles.__doc__
+    lyrics.__doc__ = LyricsIndex.lyrics.__doc__
+    search.__doc__ = LyricsIndex.search.__doc__
@@ -31,9 +31,16 @@ In addition the :py:class:`CFLyrics` class provides the main external interface
 
 __author__ = 'Danny Goodall'
 
+import codecs
+from collections import deque, namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
 import requests
 import requests.exceptions
 from nap.url import Url
+from codefurther.cache import LRUCache, TieredCache
+from codefurther.lyrics.fuzzy import similarity
+from codefurther.transport import default_transport
+from codefurther.utils import SingleFlight, iter_json_array
 from codefurther.errors import CodeFurtherConnectionError, CodeFurtherConversionError, CodeFurtherHTTPError, \
     CodeFurtherReadTimeoutError, CodeFurtherError
 
@@ -41,11 +48,22 @@ from codefurther.errors import CodeFurtherConnectionError, CodeFurtherConversion
 with hooks():
     from urllib.parse import urljoin
 
-class Lyrics(object):
-    """ Provides the programmer with properties that return lyrics from the Wikia site.
 
-    The programmer creates an instance of this object, and then uses the exposed properties to access the data about
-    the lyrics.
+#: The result of one song in a :py:meth:`Lyrics.song_lyrics_many` batch. ``lyrics`` is the :py:class:`list` of lyric
+#: lines if the song was found, otherwise it is ``None`` and ``error`` holds the exception that was raised.
+LyricsResult = namedtuple('LyricsResult', ['artist', 'title', 'lyrics', 'error'])
+
+#: The outcome of :py:meth:`Lyrics.prefetch_chart_lyrics`. ``artists`` and ``songs`` are the numbers of distinct
+#: discographies and songs that were read, and ``failures`` is the :py:class:`list` of :py:class:`LyricsResult` that
+#: ended in an error.
+PrefetchReport = namedtuple('PrefetchReport', ['artists', 'songs', 'failures'])
+
+
+class _LyricsAPI(object):
+    """The parts of the lyrics API that don't depend on how the remote server is reached.
+
+    Building the service urls, checking the arguments and unpacking the responses is the same whether the request is
+    made by :py:class:`Lyrics` or by :py:class:`~async_lyrics.AsyncLyrics`, so it lives here.
 
     Attributes:
         error_format (:py:class:`str`): The format string to be used when creating error messages.
@@ -54,17 +72,140 @@ class Lyrics(object):
     error_format = "Received an error whist reading from {}: Returned code: {}"
     bad_response = "The server returned a badly assembled response."
 
-    def __init__(self, base_url="http://cflyricsserver.herokuapp.com/lyricsapi/"):
+    def _song_lyrics_url(self, artist, title):
+        """Internal method to check the arguments for a song lyrics request and return its service url"""
+        if artist is None or not artist or title is None or not title:
+            raise ValueError("The get_song_lyrics method needs both the artist and the title of the song you are "
+                             "looking for to be specified.")
+
+        return 'lyrics/{}/{}'.format(
+            artist,
+            title
+        )
+
+    def _artist_songs_url(self, artist):
+        """Internal method to check the arguments for an artist's songs request and return its service url"""
+        if artist is None or not artist:
+            raise ValueError("The artist_songs method was expecting an artist to be supplied, but none was found.")
+
+        return "songs/{}".format(
+            artist
+        )
+
+    def _artist_search_url(self, artist):
+        """Internal method to check the arguments for an artist search request and return its service url"""
+        if artist is None or not artist:
+            raise ValueError("The artist_search method was expecting an artist to be supplied, but none was found.")
+
+        return 'search/{}'.format(
+            artist
+        )
+
+    def _unpack(self, json_response, key):
+        """Internal method to return the ``key`` item of the server's response, or raise ValueError if it is missing"""
+        if key not in json_response:
+            raise ValueError(self.bad_response)
+
+        return json_response[key]
+
+    @staticmethod
+    def _is_exact_artist(artist, artist_search_result):
+        """Internal method to decide if an artist search result is the artist that was searched for"""
+        if ":" in artist_search_result or not artist_search_result.lower().startswith(artist.lower()):
+            return False
+        else:
+            return True
+
+
+class Lyrics(_LyricsAPI):
+    """ Provides the programmer with properties that return lyrics from the Wikia site.
+
+    The programmer creates an instance of this object, and then uses the exposed properties to access the data about
+    the lyrics.
+
+    Attributes:
+        error_format (:py:class:`str`): The format string to be used when creating error messages.
+        bad_response (:py:class:`str`): The text to be used in the raised error if the server response is unexpected.
+        cache_ttls (:py:class:`dict`): The number of seconds that the responses from each endpoint are kept in the
+            response cache, keyed on the endpoint - "lyrics/", "songs/" or "search/".
+        response_cache (:py:class:`~cache.TieredCache`): The cache of decoded responses. Its
+            :py:meth:`~cache.TieredCache.stats` method returns its hit and miss counters.
+        negative_cache_ttl (:py:class:`int`): The number of seconds that a not found response is remembered for, or
+            ``None`` if they aren't remembered.
+        negative_cache_statuses (:py:class:`tuple`): The HTTP status codes that are remembered as not found.
+        index (:py:class:`~index.LyricsIndex`): The local index that songs are added to, if any.
+        artist_matcher (:py:class:`~fuzzy.ArtistMatcher`): The matcher of misspelt artist names, if any.
+    """
+    cache_ttls = {
+        'lyrics/': 30 * 24 * 60 * 60,
+        'songs/': 24 * 60 * 60,
+        'search/': 60 * 60,
+    }
+    negative_cache_statuses = (404,)
+
+    def __init__(self, base_url="http://cflyricsserver.herokuapp.com/lyricsapi/", transport=None,
+                 memory_cache_size=4 * 1024 * 1024, disk_cache=None, cache_ttls=None,
+                 negative_cache_ttl=60, negative_cache_size=1024, index=None,
+                 artist_matcher=None):
         """Creates and returns the object instance.
 
         Args:
             base_url (str): The base url of the remote API before the specific service details are appended.
                 For example, the base url might be "a.site.com/api/", and the service "/songs/", when appended to the
                 base url, creates the total url required to access the album data.
+            transport (:py:class:`~transport.Transport`): The transport whose pooled connections are used to reach
+                the remote API. If None, the transport shared by all instances is used.
+            memory_cache_size (:py:class:`int`): The most characters of decoded JSON responses that are kept in
+                memory. The least recently used responses are thrown away first. 0 keeps nothing in memory.
+            disk_cache (:py:class:`str` or :py:class:`~cache.DiskCache`): If not None, decoded responses are also
+                kept in this sqlite file (or :py:class:`~cache.DiskCache`), so they last between runs of the program.
+                This is the only persistent cache that :py:class:`Lyrics` uses.
+            cache_ttls (:py:class:`dict`): Replaces the number of seconds that the responses from the endpoints it
+                names are cached for - ``{'search/': 600}``, say. An endpoint whose time is ``None`` isn't cached.
+            negative_cache_ttl (:py:class:`int`): The number of seconds to remember that a song or artist wasn't
+                found, or that :py:meth:`Lyrics.artist_exists` returned ``False``. Asking again within that time
+                gives the same answer, or raises the same :py:class:`~errors.CodeFurtherHTTPError`, without
+                contacting the server. If None, not found results are not remembered.
+            negative_cache_size (:py:class:`int`): The most not found results that are remembered at once.
+            index (:py:class:`~index.LyricsIndex`): If not None, the lyrics returned by :py:meth:`Lyrics.song_lyrics`
+                and the titles returned by :py:meth:`Lyrics.artist_songs` are added to this local index, so that they
+                can be searched without contacting the server.
+            artist_matcher (:py:class:`~fuzzy.ArtistMatcher`): If not None, the artists that the server knows are
+                added to this matcher. :py:meth:`Lyrics.canonical_artist` answers from it, without contacting the
+                server, whenever it has a confident match, and :py:meth:`Lyrics.artist_exists` whenever it knows the
+                artist's name exactly.
         Returns:
             Lyrics (:py:class:`Lyrics`): The Lyrics model instance.
         """
         self.base_url = base_url
+        self.transport = transport if transport is not None else default_transport()
+
+        # Concurrent requests for the same url share one request to the remote server
+        self._single_flight = SingleFlight()
+
+        # Decoded responses are kept in memory, and on disk if asked for, for as long as their endpoint's ttl
+        self.cache_ttls = dict(self.cache_ttls, **(cache_ttls or {}))
+        self.response_cache = TieredCache(memory_cache_size, disk_cache)
+
+        # Not found results are remembered for a short time, each counting as 1 towards the size of the cache
+        self.negative_cache_ttl = negative_cache_ttl
+        self._not_found = LRUCache(negative_cache_size)
+
+        self.index = index
+        self.artist_matcher = artist_matcher
+
+    def reset_cache(self):
+        """Throw away the responses held in the memory tier of :py:attr:`Lyrics.response_cache`, and the not found
+        results that have been remembered, so that the next request for them reads them again.
+
+        The responses kept in the ``disk_cache`` file are left alone - use ``response_cache.clear()`` to remove them too.
+        """
+        self.response_cache.clear(disk=False)
+        self._not_found.clear()
+
+    def _cache_ttl(self, service_url):
+        """Internal method to return the number of seconds to cache the response from ``service_url`` for"""
+        return self.cache_ttls.get(service_url.split('/', 1)[0] + '/')
 
     def _get_json_response(self, service_url):
 
@@ -73,8 +214,44 @@ class Lyrics(object):
             service_url
         )
 
+        not_found = self._not_found.get(full_url)
+        if not_found is not None:
+            message, status_code = not_found
+            raise CodeFurtherHTTPError(message, status_code)
+
+        json_response = self.response_cache.get(full_url)
+        if json_response is not None:
+            return json_response
+
+        # If the same url is already being read by another thread, wait for its response rather than reading it again
+        return self._single_flight.do(full_url, self._fetch, service_url, full_url)
+
+    def _fetch(self, service_url, full_url):
+        """Internal method to read ``full_url`` from the remote server and put the response in the cache"""
         try:
-            response = requests.get(full_url)
+            json_response = self._send_request(service_url, full_url)
+        except CodeFurtherHTTPError as e:
+            self._remember_not_found(full_url, e)
+            raise
+
+        ttl = self._cache_ttl(service_url)
+        if ttl is not None:
+            self.response_cache.set(full_url, json_response, ttl)
+        return json_response
+
+    def _remember_not_found(self, full_url, error):
+        """Internal method to put ``error`` in the negative cache, if its status code is one that is remembered"""
+        if self.negative_cache_ttl is not None and error.error_code in self.negative_cache_statuses:
+            self._not_found.set(full_url, (error.message, error.error_code), 1, self.negative_cache_ttl)
+
+    def _send_request(self, service_url, full_url):
+        """Internal method to send the request for :py:meth:`Lyrics._get_json_response` and decode the response"""
+        return self._open(service_url, full_url).json()
+
+    def _open(self, service_url, full_url, stream=False):
+        """Internal method to send a request to the remote server and return the response, once its headers arrive"""
+        try:
+            response = self.transport.get(full_url, stream=stream)
             response.raise_for_status()
         except requests.exceptions.HTTPError as e:
             status_code = response.status_code
@@ -89,7 +266,7 @@ class Lyrics(object):
             raise CodeFurtherReadTimeoutError("The remote server at "+service_url+" took longer than expected to reply.",e)
         except Exception as e:
             raise CodeFurtherError("An unknown error occurred when trying to access "+service_url, e)
-        return response.json()
+        return response
 
     def song_lyrics(self, artist, title):
         """Return a list of string lyrics for the given artist and song title.
@@ -101,22 +278,206 @@ class Lyrics(object):
             (:py:class:`list`) of (:py:class:`str`) one for each lyric line in the song. Blank lines can
                 be returned to space verses from the chorus, etc.
         """
-        if artist is None or not artist or title is None or not title:
-            raise ValueError("The get_song_lyrics method needs both the artist and the title of the song you are "
-                             "looking for to be specified.")
+        service_url = self._song_lyrics_url(artist, title)
 
-        service_url = 'lyrics/{}/{}'.format(
-            artist,
-            title
+        json_response = self._get_json_response(service_url)
+
+        # Return the :py:class:`list` of lyric strings
+        lyric_lines = self._unpack(json_response, 'lyrics')
+        if self.index is not None:
+            self.index.add_song(artist, title, lyric_lines)
+        return lyric_lines
+
+    def song_lyrics_iter(self, artist, title, chunk_size=512):
+        """Yield the lyric lines for the given artist and song title, as they arrive from the remote server.
+
+        The response is read ``chunk_size`` bytes at a time, and each line is yielded as soon as it has been read, so
+        the first line can be shown before the rest of the song has arrived, and a long song is never held in memory
+        all at once::
+
+            for lyric_line in lyrics_machine.song_lyrics_iter("billy bragg", "days like these"):
+                print(lyric_line)
+
+        A song that is already in :py:attr:`Lyrics.response_cache` is yielded from there, but a streamed song isn't
+        added to it.
+
+        Args:
+            artist: (:py:class:`str`) The name of the artist for the song being looked up.
+            title: (:py:class:`str`) The name of the song being looked up.
+            chunk_size: (:py:class:`int`) The number of bytes to read from the response at a time.
+        Returns:
+            (generator) of (:py:class:`str`) one for each lyric line in the song.
+        Raises:
+            ValueError: If artist or title is :py:class:`None` or ``""`` (empty). This is raised straight away; every
+                other error is raised whilst the lines are being read.
+            ValueError: If the response from the server is not in the correct format.
+        """
+        service_url = self._song_lyrics_url(artist, title)
+
+        return self._iter_lyrics(service_url, chunk_size)
+
+    def _iter_lyrics(self, service_url, chunk_size):
+        """Internal generator for :py:meth:`Lyrics.song_lyrics_iter`"""
+        full_url = urljoin(
+            self.base_url,
+            service_url
         )
 
-        json_response = self._get_json_response(service_url)
+        not_found = self._not_found.get(full_url)
+        if not_found is not None:
+            message, status_code = not_found
+            raise CodeFurtherHTTPError(message, status_code)
+
+        json_response = self.response_cache.get(full_url)
+        if json_response is not None:
+            for lyric_line in self._unpack(json_response, 'lyrics'):
+                yield lyric_line
+            return
 
-        if "lyrics" not in json_response:
+        try:
+            response = self._open(service_url, full_url, stream=True)
+        except CodeFurtherHTTPError as e:
+            self._remember_not_found(full_url, e)
+            raise
+
+        # Decode the bytes ourselves, as the lyrics server doesn't say which encoding it uses
+        decoder = codecs.getincrementaldecoder(response.encoding or 'utf-8')(errors='replace')
+        chunks = (decoder.decode(chunk) for chunk in response.iter_content(chunk_size))
+        try:
+            for lyric_line in iter_json_array(chunks, 'lyrics'):
+                yield lyric_line
+        except KeyError:
             raise ValueError(self.bad_response)
+        except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError) as e:
+            raise CodeFurtherConnectionError("The connection to the remote server was lost.", e)
+        finally:
+            # Give the connection back to the pool, even if the caller stopped reading early
+            response.close()
+
+    def _song_lyrics_result(self, artist, title):
+        """Internal method to read one song for :py:meth:`Lyrics.song_lyrics_many`, capturing any error"""
+        try:
+            return LyricsResult(artist, title, self.song_lyrics(artist, title), None)
+        except Exception as e:
+            return LyricsResult(artist, title, None, e)
 
-        # Return the :py:class:`list` of lyric strings
-        return json_response['lyrics']
+    def song_lyrics_many(self, pairs, max_workers=4, ordered=True):
+        """Read the lyrics of many songs at once, yielding a result for each song as soon as it is available.
+
+        Up to ``max_workers`` songs are read from the remote server at the same time. An error reading one song is
+        returned in that song's result rather than being raised, so the rest of the batch carries on::
+
+            songs = [(single.artist, single.title) for single in Top40().singles]
+            for result in lyrics_machine.song_lyrics_many(songs, max_workers=8):
+                if result.error is None:
+                    print(result.title, len(result.lyrics))
+
+        Args:
+            pairs: (iterable) of (``artist``, ``title``) pairs, one for each song to be read.
+            max_workers: (:py:class:`int`) The maximum number of songs to read at the same time.
+            ordered: (:py:class:`bool`) If ``True`` the results are yielded in the same order as ``pairs``, otherwise
+                each result is yielded as soon as its song has been read.
+        Yields:
+            (:py:class:`LyricsResult`): The ``artist``, ``title``, ``lyrics`` and ``error`` for each song.
+        Raises:
+            ValueError: If ``max_workers`` is less than 1.
+        """
+        if max_workers < 1:
+            raise ValueError("The song_lyrics_many method needs max_workers to be at least 1.")
+
+        pairs = iter(pairs)
+
+        # Only take a few more songs from pairs than there are workers, so a long (or endless) iterable of songs
+        # doesn't turn into a long queue of waiting futures
+        window = max_workers * 2
+        pending = deque()
+
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            while True:
+                for artist, title in pairs:
+                    pending.append(executor.submit(self._song_lyrics_result, artist, title))
+                    if len(pending) >= window:
+                        break
+
+                if not pending:
+                    break
+
+                if ordered:
+                    yield pending.popleft().result()
+                else:
+                    done, not_done = wait(pending, return_when=FIRST_COMPLETED)
+                    pending = deque(future for future in pending if future in not_done)
+                    for future in done:
+                        yield future.result()
+        finally:
+            # If the caller stops early there is no point reading the songs that haven't been started
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=True)
+
+    def _artist_songs_result(self, artist):
+        """Internal method to read one discography for :py:meth:`Lyrics.prefetch_chart_lyrics`, capturing any error"""
+        try:
+            return LyricsResult(artist, None, self.artist_songs(artist), None)
+        except Exception as e:
+            return LyricsResult(artist, None, None, e)
+
+    def prefetch_chart_lyrics(self, chart, max_workers=4, discographies=True, progress=None):
+        """Read the lyrics of every song in a chart, and the discography of every artist in it, so that they are cached.
+
+        Each artist and each song is read only once, however many times it appears in the chart, and up to
+        ``max_workers`` of them are read from the remote server at the same time. Errors don't stop the prefetch -
+        they are collected in the report that is returned::
+
+            report = lyrics_machine.prefetch_chart_lyrics(Top40().singles_chart, max_workers=8)
+            for failure in report.failures:
+                print(failure.artist, failure.title, failure.error)
+
+        Args:
+            chart: (:py:class:`~top40.Chart`) The chart, or any iterable of entries that have ``artist`` and ``title``
+                attributes.
+            max_workers: (:py:class:`int`) The maximum number of requests to make at the same time.
+            discographies: (:py:class:`bool`) If ``True`` the list of songs of each artist is read as well as the
+                lyrics of their songs in the chart.
+            progress: (callable) If not None, called as ``progress(done, total, result)`` as each read finishes, where
+                ``result`` is a :py:class:`LyricsResult`. A discography's result has a ``title`` of ``None`` and the
+                artist's songs in ``lyrics``.
+        Returns:
+            (:py:class:`PrefetchReport`): The number of artists and songs read, and the reads that failed.
+        Raises:
+            ValueError: If ``max_workers`` is less than 1.
+        """
+        if max_workers < 1:
+            raise ValueError("The prefetch_chart_lyrics method needs max_workers to be at least 1.")
+
+        artists = {}
+        songs = {}
+        for entry in getattr(chart, 'entries', chart):
+            artist_key = entry.artist.strip().lower()
+            artists.setdefault(artist_key, entry.artist)
+            songs.setdefault((artist_key, entry.title.strip().lower()), (entry.artist, entry.title))
+
+        failures = []
+        futures = []
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            futures.extend(executor.submit(self._song_lyrics_result, artist, title) for artist, title in songs.values())
+            if discographies:
+                futures.extend(executor.submit(self._artist_songs_result, artist) for artist in artists.values())
+
+            for done, future in enumerate(as_completed(futures), 1):
+                result = future.result()
+                if result.error is not None:
+                    failures.append(result)
+                if progress is not None:
+                    progress(done, len(futures), result)
+        finally:
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=True)
+
+        return PrefetchReport(len(artists) if discographies else 0, len(songs), failures)
 
     def artist_songs(self, artist):
         """Returns a generator that yields song titles for the given artist.
@@ -131,38 +492,25 @@ class Lyrics(object):
             ValueError: If artist is :py:class:`None` or ``""`` (empty).
             ValueError: If the response from the server is not in the correct format.
         """
-        if artist is None or not artist:
-            raise ValueError("The artist_songs method was expecting an artist to be supplied, but none was found.")
-
-        service_url = "songs/{}".format(
-            artist
-        )
+        service_url = self._artist_songs_url(artist)
 
         json_response = self._get_json_response(service_url)
 
-        if 'songs' not in json_response:
-            raise ValueError(self.bad_response)
-
-        return json_response['songs']
+        song_list = self._unpack(json_response, 'songs')
+        if self.index is not None:
+            self.index.add_titles(artist, song_list)
+        return song_list
 
     def _artist_search(self, artist):
         """Internal method to return all details from artist search as a dict
 
         This method returns a dict and is wrapped by artist_search to return just the string of the artist name
         """
-        if artist is None or not artist:
-            raise ValueError("The artist_search method was expecting an artist to be supplied, but none was found.")
-
-        service_url = 'search/{}'.format(
-            artist
-        )
+        service_url = self._artist_search_url(artist)
 
         json_response = self._get_json_response(service_url)
 
-        if 'artist' not in json_response:
-            raise ValueError(self.bad_response)
-
-        return json_response['artist']
+        return self._unpack(json_response, 'artist')
 
 
     def artist_search(self, artist):
@@ -195,7 +543,9 @@ class Lyrics(object):
         **Proceed with a little caution as I'm not completely sure that these results are accurate**.
 
         Returns True if the artist specified is found exactly. It may be that the artist is known by another, similar
-        name.
+        name. If an :py:class:`~fuzzy.ArtistMatcher` was given to this instance and it already knows the artist with
+        this spelling and punctuation, ignoring only case, the server isn't contacted. A name that is merely close to a known artist,
+        such as "The Kills" to "The Killers", is still looked up - :py:meth:`Lyrics.canonical_artist` corrects spellings.
 
         Args:
             artist: (:py:class:`str`) The name of the artist being searched for.
@@ -203,8 +553,52 @@ class Lyrics(object):
             result: (:py:class:`bool`): If the artist was found exactly as named in the search results, then ``True``
                 is returned, otherwise False is returned.
         """
-        artist_search_result = self.artist_search(artist)
-        if ":" in artist_search_result or not artist_search_result.lower().startswith(artist.lower()):
+        if self.artist_matcher is not None and artist in self.artist_matcher:
+            return True
+
+        key = "artist_exists:{}".format(artist)
+        if self._not_found.get(key) is not None:
             return False
-        else:
-            return True
\ No newline at end of file
+
+        artist_search_result = self.artist_search(artist)
+        exists = self._is_exact_artist(artist, artist_search_result)
+        if not exists and self.negative_cache_ttl is not None:
+            self._not_found.set(key, True, 1, self.negative_cache_ttl)
+        if exists and self.artist_matcher is not None:
+            self.artist_matcher.add(artist_search_result)
+        return exists
+
+    def canonical_artist(self, artist):
+        """Return the usual spelling of an artist's name, correcting small mistakes such as "bily brag".
+
+        If an :py:class:`~fuzzy.ArtistMatcher` was given to this instance and it has a confident match, the
+        name is returned from it without contacting the server. Otherwise the server's artist search is used, and the
+        name it returns is accepted if it is the artist that was searched for, or close enough to it to be a confident
+        match. Names found by the search are added to the matcher.
+
+        Args:
+            artist: (:py:class:`str`) The name of the artist, as it was typed.
+        Returns:
+            result: (:py:class:`str`): The artist's name, or ``None`` if the artist couldn't be found.
+        """
+        if self.artist_matcher is not None:
+            canonical = self.artist_matcher.confident_match(artist)
+            if canonical is not None:
+                return canonical
+
+        try:
+            artist_search_result = self.artist_search(artist)
+        except CodeFurtherHTTPError:
+            return None
+
+        if ":" in artist_search_result:
+            return None
+        if not self._is_exact_artist(artist, artist_search_result):
+            if self.artist_matcher is None:
+                return None
+            if similarity(artist, artist_search_result) < self.artist_matcher.threshold:
+                return None
+
+        if self.artist_matcher is not None:
+            self.artist_matcher.add(artist_search_result)
+        return artist_search_result
\ No newline at end of file
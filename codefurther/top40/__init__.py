@@ -21,6 +21,17 @@
 
 __author__ = 'Danny Goodall'
 
-__all__= ['Top40', 'Entry', 'Change', 'Chart']
+__all__= ['Top40', 'Entry', 'Change', 'Chart', 'CompactChange', 'CompactEntry', 'CompactChart',
+          'ChartExpiryPolicy', 'ChartFrame', 'ChartArchive', 'ArchivedEntry', 'ChartDiff', 'Movement']
 
-from codefurther.top40.top40 import Top40, Entry, Change, Chart
\ No newline at end of file
+from six import PY3
+from codefurther.top40.top40 import Top40, Entry, Change, Chart, CompactChange, CompactEntry, CompactChart, \
+    ChartExpiryPolicy
+from codefurther.top40.diff import ChartDiff, Movement
+from codefurther.top40.frame import ChartFrame
+from codefurther.top40.archive import ChartArchive, ArchivedEntry
+
+# The asyncio client uses Python 3 only syntax
+if PY3:
+    __all__.append('AsyncTop40')
+    from codefurther.top40.async_top40 import AsyncTop40
\ No newline at end of file
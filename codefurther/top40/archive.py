@@ -0,0 +1,300 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2014 Danny Goodall
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""The :mod:`archive` module contains the :py:class:`ChartArchive` class, which keeps every chart that it is given in
+a local sqlite database so that past charts can be searched without going back to the remote API.
+
+A :py:class:`~top40.Top40` instance that is given an archive saves each chart that it reads into it::
+
+    from codefurther.top40 import ChartArchive, Top40
+
+    archive = ChartArchive("charts.sqlite")
+    top40 = Top40(archive=archive)
+    top40.albums_chart
+
+    for week in archive.artist_weeks("Ed Sheeran", "albums", top=10):
+        print(week.date, week.position, week.title)
+
+.. moduleauthor:: Danny Goodall <danny@onebloke.com>
+
+"""
+from collections import namedtuple
+import sqlite3
+import tempfile
+import threading
+
+from codefurther.top40.top40 import Chart, CompactChart
+
+__author__ = 'Danny Goodall'
+
+__all__ = ['ChartArchive', 'ArchivedEntry']
+
+#: A chart entry returned by the :py:class:`ChartArchive` queries, along with the type and date of its chart.
+ArchivedEntry = namedtuple(
+    'ArchivedEntry',
+    ['chart_type', 'date', 'position', 'previousPosition', 'numWeeks', 'artist', 'title']
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS charts (
+    chart_type TEXT NOT NULL,
+    date INTEGER NOT NULL,
+    retrieved INTEGER,
+    current INTEGER,
+    PRIMARY KEY (chart_type, date)
+);
+CREATE TABLE IF NOT EXISTS entries (
+    chart_type TEXT NOT NULL,
+    date INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    previousPosition INTEGER,
+    numWeeks INTEGER,
+    artist TEXT,
+    title TEXT,
+    direction TEXT,
+    amount INTEGER,
+    actual INTEGER,
+    status TEXT,
+    PRIMARY KEY (chart_type, date, position)
+);
+CREATE INDEX IF NOT EXISTS entries_artist ON entries (artist, chart_type, date);
+CREATE INDEX IF NOT EXISTS entries_title ON entries (title, chart_type, date);
+CREATE INDEX IF NOT EXISTS entries_date ON entries (date);
+"""
+
+_ENTRY_COLUMNS = "chart_type, date, position, previousPosition, numWeeks, artist, title"
+
+
+class ChartArchive(object):
+    """Saves charts to a local sqlite database, and answers questions about them.
+
+    Each chart is stored once, keyed on its type (such as "albums" or "singles") and its :py:attr:`~top40.Chart.date`,
+    so saving the same chart again does nothing. The entries are indexed on artist, title and date.
+
+    One archive can be shared between threads.
+
+    Args:
+        path (:py:class:`str`): The file that holds the database. If None, a file in the temporary directory is used.
+            ":memory:" keeps the archive in memory for the life of the instance.
+        compact (:py:class:`bool`): If ``True``, :py:meth:`ChartArchive.chart` returns :py:class:`~top40.CompactChart`
+            instances instead of :py:class:`~top40.Chart` models.
+    Attributes:
+        path (:py:class:`str`): The file that holds the database.
+        compact (:py:class:`bool`): Whether charts are returned as :py:class:`~top40.CompactChart` instances.
+    Returns:
+        ChartArchive (:py:class:`ChartArchive`): The ChartArchive instance.
+    """
+
+    def __init__(self, path=None, compact=False):
+        self.path = path if path is not None else '{}/top40archive.sqlite'.format(tempfile.gettempdir())
+        self.compact = compact
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.executescript(_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Close the database."""
+        with self._lock:
+            self._connection.close()
+
+    def _query(self, sql, parameters=()):
+        """Internal routine to run a query and return all of its rows"""
+        with self._lock:
+            return self._connection.execute(sql, parameters).fetchall()
+
+    def save(self, chart_type, chart):
+        """Save ``chart`` in the archive, unless a chart of the same type and date is already there.
+
+        Args:
+            chart_type (:py:class:`str`): The type of the chart, such as "albums" or "singles".
+            chart (:py:class:`~top40.Chart`): The chart. A :py:class:`~top40.CompactChart` can be saved too.
+        Returns:
+            (:py:class:`bool`): ``True`` if the chart was added to the archive, ``False`` if it was already there.
+        """
+        current = None if chart.current is None else int(chart.current)
+        rows = []
+        for entry in chart.entries:
+            change = entry.change
+            rows.append((
+                chart_type, chart.date, entry.position, entry.previousPosition, entry.numWeeks, entry.artist,
+                entry.title,
+                change.direction if change is not None else None,
+                change.amount if change is not None else None,
+                change.actual if change is not None else None,
+                entry.status
+            ))
+
+        with self._lock, self._connection:
+            cursor = self._connection.execute(
+                "INSERT OR IGNORE INTO charts (chart_type, date, retrieved, current) VALUES (?, ?, ?, ?)",
+                (chart_type, chart.date, chart.retrieved, current)
+            )
+            if cursor.rowcount == 0:
+                return False
+            self._connection.executemany(
+                "INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+        return True
+
+    def dates(self, chart_type):
+        """Return the dates of the charts of ``chart_type`` in the archive, oldest first.
+
+        Args:
+            chart_type (:py:class:`str`): The type of the chart, such as "albums" or "singles".
+        Returns:
+            (:py:class:`list` of :py:class:`int`): The chart dates, as integer timestamps.
+        """
+        rows = self._query("SELECT date FROM charts WHERE chart_type = ? ORDER BY date", (chart_type,))
+        return [date for date, in rows]
+
+    def chart(self, chart_type, date=None):
+        """Return the chart of ``chart_type`` published on ``date``.
+
+        Args:
+            chart_type (:py:class:`str`): The type of the chart, such as "albums" or "singles".
+            date (:py:class:`int`): The date of the chart. If None, the latest chart in the archive is returned.
+        Returns:
+            (:py:class:`~top40.Chart`): The chart, or ``None`` if there isn't one in the archive.
+        """
+        if date is None:
+            rows = self._query(
+                "SELECT date, retrieved, current FROM charts WHERE chart_type = ? ORDER BY date DESC LIMIT 1",
+                (chart_type,)
+            )
+        else:
+            rows = self._query(
+                "SELECT date, retrieved, current FROM charts WHERE chart_type = ? AND date = ?",
+                (chart_type, date)
+            )
+        if not rows:
+            return None
+
+        date, retrieved, current = rows[0]
+        entries = []
+        for row in self._query(
+            "SELECT position, previousPosition, numWeeks, artist, title, direction, amount, actual, status "
+            "FROM entries WHERE chart_type = ? AND date = ? ORDER BY position",
+            (chart_type, date)
+        ):
+            position, previous_position, num_weeks, artist, title, direction, amount, actual, status = row
+            entry = {
+                'position': position,
+                'previousPosition': previous_position,
+                'numWeeks': num_weeks,
+                'artist': artist,
+                'title': title,
+                'change': {'direction': direction, 'amount': amount, 'actual': actual}
+            }
+            if status is not None:
+                entry['status'] = status
+            entries.append(entry)
+
+        data = {'date': date, 'retrieved': retrieved, 'entries': entries}
+        if current is not None:
+            data['current'] = bool(current)
+        return CompactChart.from_json(data) if self.compact else Chart(**data)
+
+    def artist_weeks(self, artist, chart_type=None, top=None, start=None, end=None):
+        """Return every chart entry by ``artist``, oldest first.
+
+        Args:
+            artist (:py:class:`str`): The artist's name, spelt as it is in the chart.
+            chart_type (:py:class:`str`): If not None, only charts of this type are searched.
+            top (:py:class:`int`): If not None, only entries at this position or higher are returned - ``top=10``
+                returns the weeks that the artist was in the top 10.
+            start (:py:class:`int`): If not None, only charts dated at or after this timestamp are searched.
+            end (:py:class:`int`): If not None, only charts dated before this timestamp are searched.
+        Returns:
+            (:py:class:`list` of :py:class:`ArchivedEntry`): The entries.
+        """
+        conditions = ["artist = ?"]
+        parameters = [artist]
+        if top is not None:
+            conditions.append("position <= ?")
+            parameters.append(top)
+        return self._entries(conditions, parameters, chart_type, start, end, "date, chart_type, position")
+
+    def title_weeks(self, title, chart_type=None, start=None, end=None):
+        """Return every chart entry with ``title``, oldest first.
+
+        Args:
+            title (:py:class:`str`): The title, spelt as it is in the chart.
+            chart_type (:py:class:`str`): If not None, only charts of this type are searched.
+            start (:py:class:`int`): If not None, only charts dated at or after this timestamp are searched.
+            end (:py:class:`int`): If not None, only charts dated before this timestamp are searched.
+        Returns:
+            (:py:class:`list` of :py:class:`ArchivedEntry`): The entries.
+        """
+        return self._entries(["title = ?"], [title], chart_type, start, end, "date, chart_type, position")
+
+    def longest_runs(self, chart_type=None, start=None, end=None, limit=10):
+        """Return the entries that have been in the chart for the most weeks, longest run first.
+
+        Each artist and title appears once, at the chart in which it had its highest ``numWeeks``. If ``chart_type`` is
+        None, a song that was in both the singles and the albums charts still appears once. If it had its highest
+        ``numWeeks`` in more than one chart, the earliest of them is used.
+
+        Args:
+            chart_type (:py:class:`str`): If not None, only charts of this type are searched.
+            start (:py:class:`int`): If not None, only charts dated at or after this timestamp are searched.
+            end (:py:class:`int`): If not None, only charts dated before this timestamp are searched.
+            limit (:py:class:`int`): The number of entries to return.
+        Returns:
+            (:py:class:`list` of :py:class:`ArchivedEntry`): The entries.
+        """
+        conditions, parameters = self._filters([], [], chart_type, start, end)
+        where = "".join(" AND " + condition for condition in conditions)
+        # Each song's row is picked by the subquery, whose unqualified columns are those of its own "best" table, so the
+        # same conditions filter both the outer rows and the rows that they are compared with
+        rows = self._query(
+            "SELECT " + _ENTRY_COLUMNS + " FROM entries WHERE rowid = ("
+            "SELECT best.rowid FROM entries AS best WHERE best.artist IS entries.artist AND best.title IS entries.title" +
+            where + " ORDER BY best.numWeeks DESC, best.date, best.chart_type LIMIT 1)" + where +
+            " ORDER BY numWeeks DESC, date LIMIT ?",
+            parameters + parameters + [limit]
+        )
+        return [ArchivedEntry(*row) for row in rows]
+
+    @staticmethod
+    def _filters(conditions, parameters, chart_type, start, end):
+        """Internal routine to add the chart type and date range conditions to a query"""
+        if chart_type is not None:
+            conditions.append("chart_type = ?")
+            parameters.append(chart_type)
+        if start is not None:
+            conditions.append("date >= ?")
+            parameters.append(start)
+        if end is not None:
+            conditions.append("date < ?")
+            parameters.append(end)
+        return conditions, parameters
+
+    def _entries(self, conditions, parameters, chart_type, start, end, order):
+        """Internal routine to return the entries that match ``conditions``"""
+        conditions, parameters = self._filters(conditions, parameters, chart_type, start, end)
+        rows = self._query(
+            "SELECT " + _ENTRY_COLUMNS + " FROM entries WHERE " + " AND ".join(conditions) + " ORDER BY " + order,
+            parameters
+        )
+        return [ArchivedEntry(*row) for row in rows]
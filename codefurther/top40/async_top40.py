@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2014 Danny Goodall
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""The ``async_top40`` module contains :py:class:`AsyncTop40`, an asyncio version of :py:class:`~top40.Top40`.
+
+The properties of :py:class:`~top40.Top40` become coroutine methods, so they are called and awaited::
+
+    from codefurther.top40 import AsyncTop40
+
+    async def show_albums():
+        async with AsyncTop40() as top40:
+            for album in await top40.albums():
+                print(album.position, album.title, "BY", album.artist)
+
+The charts that are returned are the same :py:class:`~top40.Chart` and :py:class:`~top40.Entry` models, and the same
+:py:mod:`~codefurther.errors` exceptions are raised.
+
+.. moduleauthor:: Danny Goodall <danny@onebloke.com>
+
+"""
+from urllib.parse import urljoin
+
+from codefurther.async_transport import AsyncTransport
+from codefurther.top40.top40 import Chart, Top40
+
+__author__ = 'Danny Goodall'
+
+
+class AsyncTop40(object):
+    """Provides the programmer with coroutines that return the Top 40 chart data.
+
+    Each chart is read from the remote API once, and then kept in memory until :py:meth:`AsyncTop40.reset_cache` is
+    called.
+
+    Args:
+        base_url (str): The base url of the remote API before the specific service details are appended.
+        transport (:py:class:`~async_transport.AsyncTransport`): The transport used to reach the remote API. If None,
+            the instance creates its own, and closes it when :py:meth:`AsyncTop40.close` is called.
+    Attributes:
+        base_url (:py:class:`str`): The base url used to access the remote api
+        transport (:py:class:`~async_transport.AsyncTransport`): The transport used to reach the remote API.
+    Returns:
+        AsyncTop40 (:py:class:`AsyncTop40`): The AsyncTop40 instance.
+    """
+
+    def __init__(self, base_url="http://ben-major.co.uk/labs/top40/api/", transport=None):
+        self.base_url = base_url
+        self._owns_transport = transport is None
+        self.transport = transport if transport is not None else AsyncTransport()
+        self.reset_cache()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self):
+        """Close the transport, if it was created by this instance."""
+        if self._owns_transport:
+            await self.transport.close()
+
+    def reset_cache(self):
+        """Remove any cached singles or albums charts, so that the next read goes to the remote API."""
+        self._albums_chart = None
+        self._singles_chart = None
+
+    async def _get_data(self, service_url, params=None):
+        """Internal coroutine to retrieve data from the external service.
+
+        Args:
+            service_url (str): The remote url to connect to.
+            params (dict): Additional parameters will be passed as key=value pairs to the URL as query variables
+                ?key=value.
+        Returns:
+            response (JSON): A JSON document converted to Python equivalent classes.
+        Raises:
+            CodeFurtherHTTPError (:py:class:`~errors.CodeFurtherHTTPError`): If a status code that is not 200 is returned
+            CodeFurtherConnectionError (:py:class:`~errors.CodeFurtherConnectionError`): If a connection could not be established to the remote server
+            CodeFurtherReadTimeoutError (:py:class:`~errors.CodeFurtherReadTimeoutError`): If the remote server took too long to respond
+        """
+        full_url = urljoin(self.base_url, service_url.lstrip('/'))
+        return await self.transport.get_json(
+            full_url,
+            params=params or {},
+            error_format=Top40.error_format,
+            service_url=service_url
+        )
+
+    async def albums_chart(self):
+        """Return the :py:class:`~top40.Chart` object for the current Top40 albums
+
+        Returns:
+            :py:class:`~top40.Chart`: The albums' chart object.
+        """
+        if self._albums_chart is None:
+            albums = await self._get_data("/albums")
+            self._albums_chart = Chart(**albums)
+        return self._albums_chart
+
+    async def albums(self):
+        """Return a :py:class:`list` of album :py:class:`~top40.Entry` types.
+
+        Returns:
+            :py:class:`list` : A :py:class:`list` of :class:`~top40.Entry` instances.
+        """
+        albums_chart = await self.albums_chart()
+        return albums_chart.entries
+
+    async def singles_chart(self):
+        """Return the :py:class:`~top40.Chart` object for the current Top40 singles
+
+        Returns:
+            :py:class:`~top40.Chart`: The singles' chart object.
+        """
+        if self._singles_chart is None:
+            singles = await self._get_data("/singles")
+            self._singles_chart = Chart(**singles)
+        return self._singles_chart
+
+    async def singles(self):
+        """Return a :py:class:`list` of single :py:class:`~top40.Entry` types.
+
+        Returns:
+            :py:class:`list` : A :py:class:`list` of :class:`~top40.Entry` instances.
+        """
+        singles_chart = await self.singles_chart()
+        return singles_chart.entries
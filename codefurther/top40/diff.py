@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2014 Danny Goodall
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""The :mod:`diff` module compares two charts, and is used by :py:meth:`~top40.Chart.diff`.
+
+Each :py:class:`~top40.Entry` carries a :py:class:`~top40.Change` against the previous week's chart, but any two
+charts - two weeks from a :py:class:`~archive.ChartArchive`, say, or two reads of the remote API - can be compared
+with :py:func:`diff_charts`::
+
+    changes = this_week.diff(last_week)
+
+    for movement in changes.climbers:
+        print(movement.entry.title, "is up", movement.change, "places")
+    for entry in changes.exits:
+        print(entry.title, "has left the chart")
+
+The entries of the charts are matched on their artist and title, using a dictionary of the older chart, so the
+comparison takes time in proportion to the number of entries.
+
+.. moduleauthor:: Danny Goodall <danny@onebloke.com>
+
+"""
+from collections import namedtuple
+
+__author__ = 'Danny Goodall'
+
+__all__ = ['ChartDiff', 'Movement', 'diff_charts']
+
+#: An entry that is in both charts. ``change`` is the number of places it has gone up - negative if it went down.
+Movement = namedtuple('Movement', ['entry', 'previous', 'change'])
+
+#: The result of comparing two charts. ``entries`` and ``exits`` are lists of entries, the others lists of
+#: :py:class:`Movement`.
+ChartDiff = namedtuple('ChartDiff', ['entries', 'exits', 'climbers', 'fallers', 'non_movers'])
+
+
+def _key(entry):
+    return entry.artist, entry.title
+
+
+def diff_charts(chart, previous_chart):
+    """Return the differences between ``previous_chart`` and the later ``chart``.
+
+    Args:
+        chart (:py:class:`~top40.Chart`): The later chart. A :py:class:`~top40.CompactChart` can be used too.
+        previous_chart (:py:class:`~top40.Chart`): The earlier chart.
+    Returns:
+        (:py:class:`ChartDiff`): The entries new to ``chart``, in chart order; the entries of ``previous_chart`` that
+            have left, in their old chart order; the climbers, biggest climb first; the fallers, biggest fall first;
+            and the non-movers, in chart order.
+    """
+    previous_entries = {}
+    for entry in previous_chart.entries:
+        previous_entries.setdefault(_key(entry), entry)
+
+    entries = []
+    climbers = []
+    fallers = []
+    non_movers = []
+    seen = set()
+    for entry in chart.entries:
+        key = _key(entry)
+        previous = previous_entries.get(key)
+        if previous is None or key in seen:
+            entries.append(entry)
+            continue
+        seen.add(key)
+
+        movement = Movement(entry, previous, previous.position - entry.position)
+        if movement.change > 0:
+            climbers.append(movement)
+        elif movement.change < 0:
+            fallers.append(movement)
+        else:
+            non_movers.append(movement)
+
+    exits = [entry for entry in previous_chart.entries if _key(entry) not in seen]
+
+    # sorted() is stable, so equal moves stay in chart order
+    climbers = sorted(climbers, key=lambda movement: -movement.change)
+    fallers = sorted(fallers, key=lambda movement: movement.change)
+
+    return ChartDiff(entries, exits, climbers, fallers, non_movers)
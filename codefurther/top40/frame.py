@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2014 Danny Goodall
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""The :mod:`frame` module contains the :py:class:`ChartFrame` class, a column by column view of the entries of a
+chart that is returned by :py:meth:`~top40.Chart.to_arrays`.
+
+Each numeric attribute of the entries becomes one NumPy array, so questions about the whole chart can be answered
+without a Python loop::
+
+    frame = top40.albums_chart.to_arrays()
+
+    print(frame.title[frame.new_entries()])
+    for entry in frame.select(frame.climbers(5)):
+        print(entry.title, "is up", entry.change.actual)
+
+It needs the optional `NumPy <http://www.numpy.org/>`_ package, which can be installed with::
+
+    pip install codefurther[numpy]
+
+.. moduleauthor:: Danny Goodall <danny@onebloke.com>
+
+"""
+from six.moves import intern
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+__author__ = 'Danny Goodall'
+
+__all__ = ['ChartFrame']
+
+
+class ChartFrame(object):
+    """Holds the entries of a chart as columns, one array per attribute.
+
+    Row ``i`` of every column describes ``entries[i]``, so the rows are in chart order. The ``artist`` and ``title``
+    strings are interned: each is stored once in a sorted array of names, and the rows hold integer codes into it.
+
+    Args:
+        entries (:py:class:`list` of :py:class:`~top40.Entry`): The chart entries. Compact entries can be used too.
+    Attributes:
+        entries (:py:class:`list`): The chart entries, in row order.
+        position (:py:class:`numpy.ndarray`): The position of each entry.
+        previousPosition (:py:class:`numpy.ndarray`): The position of each entry in the previous week's chart, or 0 for
+            a new entry.
+        numWeeks (:py:class:`numpy.ndarray`): The number of weeks each entry has been in the chart.
+        change (:py:class:`numpy.ndarray`): The ``change.actual`` of each entry - positive for a climb.
+        artist_names (:py:class:`numpy.ndarray`): The distinct artist names, sorted.
+        artist_codes (:py:class:`numpy.ndarray`): The index into ``artist_names`` of each entry's artist.
+        title_names (:py:class:`numpy.ndarray`): The distinct titles, sorted.
+        title_codes (:py:class:`numpy.ndarray`): The index into ``title_names`` of each entry's title.
+    Returns:
+        ChartFrame (:py:class:`ChartFrame`): The ChartFrame instance.
+    Raises:
+        ImportError: If the numpy package is not installed.
+    """
+
+    def __init__(self, entries):
+        if numpy is None:
+            raise ImportError("ChartFrame needs the numpy package. Install it with 'pip install codefurther[numpy]'.")
+
+        self.entries = list(entries)
+        count = len(self.entries)
+
+        def column(values):
+            return numpy.fromiter(values, dtype=numpy.int64, count=count)
+
+        self.position = column(entry.position or 0 for entry in self.entries)
+        self.previousPosition = column(entry.previousPosition or 0 for entry in self.entries)
+        self.numWeeks = column(entry.numWeeks or 0 for entry in self.entries)
+        self.change = column(
+            (entry.change.actual or 0) if entry.change is not None else 0 for entry in self.entries
+        )
+        self.artist_names, self.artist_codes = self._intern(entry.artist for entry in self.entries)
+        self.title_names, self.title_codes = self._intern(entry.title for entry in self.entries)
+
+    @staticmethod
+    def _intern(values):
+        """Internal routine to turn a column of strings into an array of distinct strings and an array of codes"""
+        values = [intern(value or "") for value in values]
+        names, codes = numpy.unique(numpy.array(values, dtype=object), return_inverse=True)
+        return names, codes.reshape(-1)
+
+    def __len__(self):
+        return len(self.entries)
+
+    @property
+    def artist(self):
+        """A ``property`` that returns the artist of each entry.
+
+        Returns:
+            (:py:class:`numpy.ndarray`): The artist names, in row order.
+        """
+        return self.artist_names[self.artist_codes]
+
+    @property
+    def title(self):
+        """A ``property`` that returns the title of each entry.
+
+        Returns:
+            (:py:class:`numpy.ndarray`): The titles, in row order.
+        """
+        return self.title_names[self.title_codes]
+
+    def new_entries(self):
+        """Return a mask that is ``True`` for the entries that weren't in the previous week's chart.
+
+        Returns:
+            (:py:class:`numpy.ndarray`): A boolean array with one value per row.
+        """
+        return self.previousPosition == 0
+
+    def _movers(self, moved, count):
+        """Internal routine to return the rows in ``moved``, biggest move first, keeping chart order for ties"""
+        rows = numpy.flatnonzero(moved & ~self.new_entries())
+        rows = rows[numpy.argsort(-numpy.abs(self.change[rows]), kind='mergesort')]
+        return rows if count is None else rows[:count]
+
+    def climbers(self, count=None):
+        """Return the rows of the entries that have gone up the chart, biggest climb first.
+
+        Args:
+            count (:py:class:`int`): If not None, only the first ``count`` rows are returned.
+        Returns:
+            (:py:class:`numpy.ndarray`): An array of row numbers.
+        """
+        return self._movers(self.change > 0, count)
+
+    def fallers(self, count=None):
+        """Return the rows of the entries that have gone down the chart, biggest fall first.
+
+        Args:
+            count (:py:class:`int`): If not None, only the first ``count`` rows are returned.
+        Returns:
+            (:py:class:`numpy.ndarray`): An array of row numbers.
+        """
+        return self._movers(self.change < 0, count)
+
+    def by_artist(self, artist):
+        """Return a mask that is ``True`` for the entries by ``artist``.
+
+        Args:
+            artist (:py:class:`str`): The artist's name, spelt as it is in the chart.
+        Returns:
+            (:py:class:`numpy.ndarray`): A boolean array with one value per row.
+        """
+        code = numpy.searchsorted(self.artist_names, artist)
+        if code == len(self.artist_names) or self.artist_names[code] != artist:
+            return numpy.zeros(len(self), dtype=bool)
+        return self.artist_codes == code
+
+    def weeks_histogram(self):
+        """Return how many entries have been in the chart for each number of weeks.
+
+        Returns:
+            (:py:class:`numpy.ndarray`): An array whose value at index ``n`` is the number of entries that have been in
+                the chart for ``n`` weeks.
+        """
+        return numpy.bincount(self.numWeeks)
+
+    def select(self, rows):
+        """Return the entries for ``rows``.
+
+        Args:
+            rows (:py:class:`numpy.ndarray`): Either an array of row numbers, like the one returned by
+                :py:meth:`ChartFrame.climbers`, or a boolean mask, like the one returned by
+                :py:meth:`ChartFrame.new_entries`.
+        Returns:
+            (:py:class:`list`): The entries, in the order given by ``rows``.
+        """
+        rows = numpy.asarray(rows)
+        if rows.dtype == bool:
+            rows = numpy.flatnonzero(rows)
+        return [self.entries[row] for row in rows]
@@ -56,7 +56,13 @@ And this, don't forget this::
     '{"owner": {"login": "jaimegildesagredo", "name": "Jaime Gil de Sagredo"}, "name": "Booby"}'
 """
 from __future__ import print_function
+import calendar
+from datetime import datetime, timezone
+import logging
+import sqlite3
 import tempfile
+import threading
+import time
 
 from future.standard_library import hooks
 
@@ -69,8 +75,14 @@ import requests
 import requests.exceptions
 import requests_cache
 from booby import Model, fields
+from codefurther.top40.diff import diff_charts
+from codefurther.top40.frame import ChartFrame
+from codefurther.transport import default_transport
+from codefurther.utils import SingleFlight
 from codefurther.errors import CodeFurtherConnectionError, CodeFurtherError, CodeFurtherHTTPError, CodeFurtherReadTimeoutError
 
+log = logging.getLogger(__name__)
+
 
 class Change(Model):
     """The Change model that describes the change of this entry since last week's chart.
@@ -176,6 +188,316 @@ class Chart(Model):
     entries = fields.Collection(Entry)
     current = fields.Boolean(required=False)
 
+    def to_arrays(self):
+        """Return a :py:class:`~frame.ChartFrame` that holds the entries of this chart as NumPy column arrays.
+
+        Returns:
+            :py:class:`~frame.ChartFrame`: The columns of this chart.
+        Raises:
+            ImportError: If the numpy package is not installed.
+        """
+        return ChartFrame(self.entries)
+
+    def diff(self, previous_chart):
+        """Return the differences between ``previous_chart`` and this chart.
+
+        Args:
+            previous_chart (:py:class:`Chart`): An earlier chart to compare this one with.
+        Returns:
+            :py:class:`~diff.ChartDiff`: The new entries, exits, climbers, fallers and non-movers.
+        """
+        return diff_charts(self, previous_chart)
+
+
+class _Compact(object):
+    """Internal base class for the compact chart types, giving them the dict conversion, equality and repr that the
+    booby models have"""
+    __slots__ = ()
+
+    def to_dict(self):
+        """Return the fields of this instance as a :py:class:`dict` in the same shape as the remote API's JSON.
+
+        Returns:
+            (:py:class:`dict`): The fields of this instance, with embedded instances also converted to dicts.
+        """
+        return dict((name, getattr(self, name)) for name in self.__slots__)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and all(
+            getattr(self, name) == getattr(other, name) for name in self.__slots__
+        )
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return '<{}.{}({})>'.format(
+            type(self).__module__,
+            type(self).__name__,
+            ', '.join('{}={!r}'.format(name, getattr(self, name)) for name in self.__slots__)
+        )
+
+
+class CompactChange(_Compact):
+    """A lightweight, read-mostly equivalent of :py:class:`Change` that is built without any booby field machinery.
+
+    Args:
+        direction (:py:class:`str`): The direction of the change "up" or "down".
+        amount (:py:class:`int`): The amount of change in chart position expressed as a positive integer.
+        actual (:py:class:`int`): The amount of the change in chart position expressed as positive or negative (or 0).
+    Returns:
+        :py:class:`CompactChange`: The CompactChange instance.
+    """
+    __slots__ = ('direction', 'amount', 'actual')
+
+    def __init__(self, direction=None, amount=None, actual=None):
+        self.direction = direction
+        self.amount = amount
+        self.actual = actual
+
+    @classmethod
+    def from_json(cls, data):
+        """Return a :py:class:`CompactChange` built from the decoded JSON ``dict`` of a change.
+
+        Args:
+            data (:py:class:`dict`): The change, as returned by the remote API.
+        Returns:
+            :py:class:`CompactChange`: The CompactChange instance.
+        """
+        get = data.get
+        return cls(get('direction'), get('amount'), get('actual'))
+
+    @classmethod
+    def from_model(cls, change):
+        """Return a :py:class:`CompactChange` with the same values as the :py:class:`Change` model ``change``."""
+        return cls(change.direction, change.amount, change.actual)
+
+    def to_model(self):
+        """Return a :py:class:`Change` model with the same values as this instance."""
+        return Change(direction=self.direction, amount=self.amount, actual=self.actual)
+
+
+class CompactEntry(_Compact):
+    """A lightweight, read-mostly equivalent of :py:class:`Entry` that is built without any booby field machinery.
+
+    Args:
+        position (:py:class:`int`): The position of this entry in the chart.
+        previousPosition (:py:class:`int`): The position of this entry in the previous week's chart.
+        numWeeks (:py:class:`int`): The number of weeks this entry has been in the chart.
+        artist (:py:class:`str`): The name of the artist for this entry.
+        title (:py:class:`str`): The title of this entry.
+        change (:py:class:`CompactChange`): The change in position.
+        status (:py:class:`str`): **Optional**. The text status from the BBC chart.
+    Returns:
+        :py:class:`CompactEntry`: The CompactEntry instance.
+    """
+    __slots__ = ('position', 'previousPosition', 'numWeeks', 'artist', 'title', 'change', 'status')
+
+    def __init__(self, position=None, previousPosition=None, numWeeks=None, artist=None, title=None, change=None,
+                 status=None):
+        self.position = position
+        self.previousPosition = previousPosition
+        self.numWeeks = numWeeks
+        self.artist = artist
+        self.title = title
+        self.change = change
+        self.status = status
+
+    @classmethod
+    def from_json(cls, data):
+        """Return a :py:class:`CompactEntry` built from the decoded JSON ``dict`` of a chart entry.
+
+        Args:
+            data (:py:class:`dict`): The entry, as returned by the remote API.
+        Returns:
+            :py:class:`CompactEntry`: The CompactEntry instance.
+        """
+        get = data.get
+        change = get('change')
+        return cls(
+            get('position'),
+            get('previousPosition'),
+            get('numWeeks'),
+            get('artist'),
+            get('title'),
+            CompactChange.from_json(change) if change is not None else None,
+            get('status')
+        )
+
+    @classmethod
+    def from_model(cls, entry):
+        """Return a :py:class:`CompactEntry` with the same values as the :py:class:`Entry` model ``entry``."""
+        return cls.from_json(dict(entry))
+
+    def to_dict(self):
+        result = super(CompactEntry, self).to_dict()
+        if self.change is not None:
+            result['change'] = self.change.to_dict()
+        return result
+
+    def to_model(self):
+        """Return an :py:class:`Entry` model with the same values as this instance."""
+        return Entry(**self.to_dict())
+
+
+class CompactChart(_Compact):
+    """A lightweight, read-mostly equivalent of :py:class:`Chart` that is built without any booby field machinery.
+
+    Building a :py:class:`Chart` validates every field of every :py:class:`Entry` and :py:class:`Change` that it
+    embeds. A :py:class:`CompactChart` is built by :py:meth:`CompactChart.from_json` straight from the decoded JSON,
+    and has the same attribute names, so it can be used wherever a :py:class:`Chart` is read::
+
+        chart = CompactChart.from_json(response.json())
+        print(chart.entries[0].artist, chart.entries[0].change.amount)
+
+    :py:class:`Top40` returns compact charts if it is created with ``compact=True``. :py:meth:`CompactChart.to_model`
+    and :py:meth:`CompactChart.from_model` convert to and from the :py:class:`Chart` model.
+
+    Args:
+        date (:py:class:`int`): The date of this chart as an integer timestamp containing the total number of seconds.
+        retrieved (:py:class:`int`): The date that this chart was retrieved from the API server as an integer
+            timestamp.
+        entries (:py:class:`list` of :py:class:`CompactEntry`): The entries in the chart, highest position first.
+        current (:py:class:`bool`): **Optional**. ``False`` if the last scheduled read from the BBC's server failed.
+    Returns:
+        :py:class:`CompactChart`: The CompactChart instance.
+    """
+    __slots__ = ('date', 'retrieved', 'entries', 'current')
+
+    def __init__(self, date=None, retrieved=None, entries=None, current=None):
+        self.date = date
+        self.retrieved = retrieved
+        self.entries = entries if entries is not None else []
+        self.current = current
+
+    @classmethod
+    def from_json(cls, data):
+        """Return a :py:class:`CompactChart` built from the decoded JSON document of a chart.
+
+        Args:
+            data (:py:class:`dict`): The chart, as returned by the remote API.
+        Returns:
+            :py:class:`CompactChart`: The CompactChart instance.
+        """
+        from_json = CompactEntry.from_json
+        return cls(
+            data.get('date'),
+            data.get('retrieved'),
+            [from_json(entry) for entry in data.get('entries') or ()],
+            data.get('current')
+        )
+
+    @classmethod
+    def from_model(cls, chart):
+        """Return a :py:class:`CompactChart` with the same values as the :py:class:`Chart` model ``chart``.
+
+        Args:
+            chart (:py:class:`Chart`): The chart model.
+        Returns:
+            :py:class:`CompactChart`: The CompactChart instance.
+        """
+        return cls.from_json(dict(chart))
+
+    def to_dict(self):
+        result = super(CompactChart, self).to_dict()
+        result['entries'] = [entry.to_dict() for entry in self.entries]
+        return result
+
+    def to_model(self):
+        """Return a :py:class:`Chart` model with the same values as this instance.
+
+        Returns:
+            :py:class:`Chart`: The chart model.
+        """
+        return Chart(**self.to_dict())
+
+    def to_arrays(self):
+        """Return a :py:class:`~frame.ChartFrame` of the entries of this chart, as :py:meth:`Chart.to_arrays` does."""
+        return ChartFrame(self.entries)
+
+    def diff(self, previous_chart):
+        """Return the differences between ``previous_chart`` and this chart, as :py:meth:`Chart.diff` does."""
+        return diff_charts(self, previous_chart)
+
+
+class ChartExpiryPolicy(object):
+    """Decides how long a chart can be cached for, based on when the next chart is expected to be published.
+
+    The UK charts only change once a week, so rather than re-reading a chart after a fixed number of seconds,
+    a chart is kept until ``publication_interval`` (plus ``publication_delay``) seconds after its
+    :py:attr:`Chart.date`. From then on the chart is re-read every ``retry_interval`` seconds until one with a newer
+    date is returned. A chart whose :py:attr:`Chart.current` flag is ``False`` is already known to be out of date, so
+    it is only kept for ``retry_interval`` seconds::
+
+        top40 = Top40(expiry_policy=ChartExpiryPolicy(retry_interval=600))
+
+    Args:
+        publication_interval (:py:class:`int`): The number of seconds between one chart and the next.
+        publication_delay (:py:class:`int`): The number of seconds after the end of the interval that the new chart
+            is expected to be available from the remote API.
+        retry_interval (:py:class:`int`): The number of seconds to keep a chart that is overdue for replacement.
+    Attributes:
+        publication_interval (:py:class:`int`): The number of seconds between one chart and the next.
+        publication_delay (:py:class:`int`): The number of seconds after the end of the interval that the new chart
+            is expected to be available.
+        retry_interval (:py:class:`int`): The number of seconds to keep a chart that is overdue for replacement.
+    Returns:
+        ChartExpiryPolicy (:py:class:`ChartExpiryPolicy`): The ChartExpiryPolicy instance.
+    """
+
+    def __init__(self, publication_interval=7 * 24 * 60 * 60, publication_delay=0, retry_interval=15 * 60):
+        self.publication_interval = publication_interval
+        self.publication_delay = publication_delay
+        self.retry_interval = retry_interval
+
+    def next_publication(self, chart):
+        """Return the time that the chart following ``chart`` is expected to be available.
+
+        Args:
+            chart (:py:class:`Chart`): The chart that is currently cached.
+        Returns:
+            (:py:class:`int`): The expected time of the next chart, as an integer timestamp.
+        """
+        return chart.date + self.publication_interval + self.publication_delay
+
+    def expires_at(self, chart, now=None):
+        """Return the time at which ``chart`` should be read again from the remote API.
+
+        Args:
+            chart (:py:class:`Chart`): The chart that has just been read.
+            now (:py:class:`float`): The current time as a timestamp. Defaults to :py:func:`time.time`.
+        Returns:
+            (:py:class:`float`): The time the chart expires, as a timestamp.
+        """
+        now = time.time() if now is None else now
+
+        if chart.current is False:
+            return now + self.retry_interval
+
+        next_publication = self.next_publication(chart)
+        if now < next_publication:
+            return next_publication
+
+        # The next chart is overdue, so keep checking for it
+        return now + self.retry_interval
+
+
+class _CachedChart(object):
+    """Internal record of a chart held in memory by :py:class:`Top40`, with when it was read and when it expires"""
+    __slots__ = ('chart', 'retrieved_at', 'expires_at')
+
+    def __init__(self, chart, retrieved_at, expires_at=None):
+        self.chart = chart
+        self.retrieved_at = retrieved_at
+        self.expires_at = expires_at
+
+    def expired(self, now=None):
+        if self.expires_at is None:
+            return False
+        return (time.time() if now is None else now) >= self.expires_at
+
 
 class Top40(object):
     """ Provides the programmer with properties that return the Top 40 chart data.
@@ -190,16 +512,47 @@ class Top40(object):
     sqlite DB for the duration, in seconds, or cache_duration. A config for requests cache can also
     be passed in cache_config too, or if None, the default setting is used.
 
+    The persistent cache belongs to this instance alone - it is a ``requests_cache.CachedSession`` rather than a
+    cache installed into ``requests`` for the whole program - so several :py:class:`Top40` instances, each with its
+    own backend and duration, can be used side by side.
+
+    If stale_while_revalidate is ``True``, a chart that has expired is still returned straight away, and a
+    fresh copy is read from the remote API on a background thread. Only one background read of each chart is made at a
+    time, however many callers ask for it. If the background read fails, the old chart carries on being returned and
+    the read is tried again the next time the chart is asked for. The :py:attr:`Top40.albums_chart_age` and
+    :py:attr:`Top40.singles_chart_age` properties show how old the returned charts are.
+
+    A :py:class:`Top40` instance is thread safe, so one instance can be shared by all of the threads of a web server.
+    When several threads ask for a chart that isn't cached, only one of them reads it from the remote API and the
+    others wait for, and are given, that same chart. :py:meth:`Top40.reset_cache` can be called at any time; a read
+    that was already under way when the cache was reset returns its chart to its caller, but doesn't put it into the
+    new cache.
+
     Args:
         base_url (str): The base url of the remote API before the specific service details are appended.
             For example, the base url might be "a.site.com/api/", and the service "/albums/", when appended to the
             base url, creates the total url required to access the album data.
         cache_duration (:py:class:`int`): If None, then the persistent cache will be disabled. Otherwise
             the cache duration specified will be used.
-        cache_config (:py:class:`dict`): If None the default config will be used to pass to the
-            ``install_cache`` method of requests_cache, otherwise the config in this parameter will be used.
+        cache_config (:py:class:`dict`): If None the default config will be used to pass to
+            ``requests_cache.CachedSession``, otherwise the config in this parameter will be used.
             Any 'expire_after' key in the cache config will be replaced and the duration set to
             cache_duration.
+        cache_backend (:py:class:`str`): The requests_cache backend used for the persistent cache, if cache_config
+            doesn't name one - "sqlite", "filesystem" or "memory".
+        transport (:py:class:`~transport.Transport`): The transport whose pooled connections are used to reach the
+            remote API. If None, the transport shared by all instances is used.
+        expiry_policy (:py:class:`ChartExpiryPolicy`): If None, a chart is kept in memory until
+            :py:meth:`Top40.reset_cache` is called, and in the persistent cache for cache_duration seconds. Otherwise
+            the policy decides when each chart expires, both in memory and in the persistent cache.
+        stale_while_revalidate (:py:class:`bool`): If ``True``, expired charts are returned whilst they are refreshed
+            in the background. Without an expiry_policy, charts held in memory then expire after cache_duration
+            seconds.
+        compact (:py:class:`bool`): If ``True``, charts are returned as :py:class:`CompactChart` instances, which are
+            much quicker to build than :py:class:`Chart` models.
+        archive (:py:class:`~archive.ChartArchive`): If not None, every chart that is read from the remote API is saved
+            in this archive, under the chart type "albums" or "singles". A chart that can't be saved is logged as a
+            warning and still returned.
     Attributes:
         error_format (str): The format string to be used when creating error messages.
         base_url (:py:class:`str`): The base url used to access the remote api
@@ -207,6 +560,11 @@ class Top40(object):
             a fresh read of the external API will replace them.
         cache_config (:py:class:`dict`): A dictionary that describes the config that will be passed to the
             ``request_cache`` instance - allowing different backends and other options to be set.
+        transport (:py:class:`~transport.Transport`): The transport used to reach the remote API.
+        expiry_policy (:py:class:`ChartExpiryPolicy`): The policy that decides when charts expire, if any.
+        stale_while_revalidate (:py:class:`bool`): Whether expired charts are returned whilst they are refreshed.
+        compact (:py:class:`bool`): Whether charts are returned as :py:class:`CompactChart` instances.
+        archive (:py:class:`~archive.ChartArchive`): The archive that charts are saved in, if any.
     Returns:
         Top40 (:py:class:`Top40`): The Top40 instance.
     """
@@ -214,11 +572,42 @@ class Top40(object):
 
     def __init__(self, base_url="http://ben-major.co.uk/labs/top40/api/",
                  cache_duration=3600,
-                 cache_config=None):
+                 cache_config=None,
+                 transport=None,
+                 cache_backend="sqlite",
+                 expiry_policy=None,
+                 stale_while_revalidate=False,
+                 compact=False,
+                 archive=None):
 
         # Store the base url that we will append our service url enpoints to
         self.base_url = base_url
 
+        # Connections to the remote API come from the transport's pool
+        self.transport = transport if transport is not None else default_transport()
+        self._session = None
+
+        # The charts we have read, keyed on their service url
+        self._charts = {}
+        self.expiry_policy = expiry_policy
+        self.compact = compact
+        self.archive = archive
+
+        # The background refreshes that are running, keyed on service url. The generation changes whenever the cache
+        # is reset, so that a refresh started before the reset doesn't store its chart afterwards
+        self.stale_while_revalidate = stale_while_revalidate
+        self._refreshing = {}
+        self._refresh_lock = threading.Lock()
+        self._generation = 0
+
+        # The lock guards the session, the cached charts and the generation. Each chart also has its own lock, so that
+        # only one thread at a time reads that chart from the remote API
+        self._lock = threading.RLock()
+        self._chart_locks = {}
+
+        # Concurrent reads of the same url share one request to the remote API
+        self._single_flight = SingleFlight()
+
         # If cache_duration is not None, then we will use a persistent request_cache
         self.cache_duration = cache_duration
 
@@ -231,6 +620,7 @@ class Top40(object):
             }
         else:
             self.cache_config = cache_config
+        self.cache_config.setdefault('backend', cache_backend)
 
         # The cache_duration tells us how long responses will be cached in
         # persistent storage (in seconds)
@@ -247,28 +637,32 @@ class Top40(object):
 
         If a cache is in place, then the results will also be cached across python runtime executions.
 
+        Only this instance is affected - other :py:class:`Top40` and :py:class:`~lyrics.Lyrics` instances keep their
+        own caches.
+
         Params:
-            cache_duration (:py:class:`int`): If ``None`` we will uninstall the requests cache and the next
+            cache_duration (:py:class:`int`): If ``None`` we will stop using the persistent cache and the next
                 read from the API will cause a remote call to be executed. Otherwise it specifies the number of
                 seconds before the persistent cache will expire.
         """
 
-        if cache_duration is None:
-            # We are disabling the existing persistent_cache
-            requests_cache.uninstall_cache()
-        else:
-            # We are setting a persistent cache so insert the duration into our cache config
-            self.cache_config['expire_after'] = cache_duration
+        with self._lock:
+            if cache_duration is None:
+                # We are disabling the persistent cache, so use a plain session
+                self._session = self.transport.create_session()
+            else:
+                # We are setting a persistent cache so insert the duration into our cache config
+                self.cache_config['expire_after'] = cache_duration
 
-            # and then install the cache with this configuration
-            requests_cache.install_cache(**self.cache_config)
+                # and then create a cached session with this configuration
+                self._session = self.transport.create_session(requests_cache.CachedSession, **self.cache_config)
 
-        # Remember the new duration
-        self.cache_duration = cache_duration
+            # Remember the new duration
+            self.cache_duration = cache_duration
 
-        # Rest the in-memory caches to force a read from remote site
-        self._albums_chart = None
-        self._singles_chart = None
+            # Rest the in-memory caches to force a read from remote site
+            self._charts = {}
+            self._generation += 1
 
     def _get_data(self, service_url, params=None):
         """Internal routine to retrieve data from the external service.
@@ -288,6 +682,27 @@ class Top40(object):
             Top40ConnectionError (:py:class:`~errors.Top40ConnectionError`): If a connection could not be established to the remote server
             Top40ReadTimeoutError (:py:class:`~errors.Top40ReadTimeoutError`): If the remote server took too long to respond
         """
+        # Treat the response text as JSON and return the Python equivalent
+        return self._get_response(service_url, params).json()
+
+    def _get_response(self, service_url, params=None):
+        """Internal routine to retrieve the response from the external service.
+
+        The URL component that is passed is added to the base URL that was specified when the object was instantiated.
+        Additional params passed will be passed to the API as key=value pairs, and the return data converted from JSON
+        to a Python :class:`dict` .
+
+        Args:
+            service_url (str): The remote url to connect to.
+            params (dict): Additional parameters will be passed as key=value pairs to the URL as query variables
+                ?key=value.
+        Returns:
+            response (:py:class:`requests.Response`): The response from the remote server.
+        Raises:
+            Top40HTTPError (:py:class:`~errors.Top40HTTPError`): If a status code that is not 200 is returned
+            Top40ConnectionError (:py:class:`~errors.Top40ConnectionError`): If a connection could not be established to the remote server
+            Top40ReadTimeoutError (:py:class:`~errors.Top40ReadTimeoutError`): If the remote server took too long to respond
+        """
         # TODO - Change the Munch references to dict
 
         if not params:
@@ -295,8 +710,16 @@ class Top40(object):
 
         # Build the full url from the base url + the url for this service
         full_url = urljoin( self.base_url, service_url.lstrip('/'))
+
+        # If the same url is already being read by another thread, wait for its response rather than reading it again
+        key = (full_url, tuple(sorted(params.items())))
+        return self._single_flight.do(key, self._send_request, service_url, full_url, params)
+
+    def _send_request(self, service_url, full_url, params):
+        """Internal routine to send the request for :py:meth:`Top40._get_response` and check the response.
+        """
         try:
-            response = requests.get(full_url, params=params)
+            response = self.transport.get(full_url, params=params, session=self._session)
         except requests.exceptions.HTTPError as e:
             message = Top40.error_format.format(
                 service_url,
@@ -318,15 +741,108 @@ class Top40(object):
             )
             raise CodeFurtherHTTPError(message, response.status_code)
 
-        # Treat the response text as JSON and return the Python equivalent
-        return response.json()
+        return response
 
-    def _get_albums_chart(self):
-        """Internal routine to pull the albums chart information into the cache
+    def _get_chart(self, service_url, generation=None):
+        """Internal routine to pull the chart information from ``service_url`` into the cache
         """
-        albums = self._get_data("/albums")
-        self._albums_chart = Chart(**albums)
+        with self._lock:
+            generation = self._generation if generation is None else generation
+            session = self._session
+
+        response = self._get_response(service_url)
+        chart = CompactChart.from_json(response.json()) if self.compact else Chart(**response.json())
+
+        # If the response came from the persistent cache, then the chart is as old as the cached response
+        created_at = getattr(response, 'created_at', None)
+        retrieved_at = calendar.timegm(created_at.utctimetuple()) if created_at is not None else time.time()
+
+        expires_at = None
+        if self.expiry_policy is not None:
+            expires_at = self.expiry_policy.expires_at(chart)
+        elif self.stale_while_revalidate and self.cache_duration is not None:
+            expires_at = retrieved_at + self.cache_duration
+
+        # The archive only keeps one copy of each chart, so it doesn't matter if this one was read before. A chart that
+        # can't be archived - because the database is locked, say, or two entries share a position - is still returned
+        if self.archive is not None:
+            try:
+                self.archive.save(service_url.strip('/'), chart)
+            except sqlite3.Error as e:
+                log.warning("The %s chart of %s could not be archived: %s", service_url.strip('/'), chart.date, e)
+
+        with self._lock:
+            # If the cache was reset whilst we were reading, then this chart belongs to the old cache
+            if generation != self._generation:
+                return chart
+
+            # A fresh response was saved in the persistent cache with the flat cache_duration, so save it again with
+            # the expiry time that the policy has given it
+            if self.expiry_policy is not None and not getattr(response, 'from_cache', True):
+                session.cache.save_response(
+                    response,
+                    getattr(response, 'cache_key', None),
+                    # requests_cache compares expiry times with datetime.utcnow(), so it needs a naive UTC time
+                    expires=datetime.fromtimestamp(expires_at, timezone.utc).replace(tzinfo=None)
+                )
 
+            self._charts[service_url] = _CachedChart(chart, retrieved_at, expires_at)
+        return chart
+
+    def _refresh_chart(self, service_url, generation):
+        """Internal routine run on a background thread to replace an expired chart
+        """
+        try:
+            self._get_chart(service_url, generation)
+        except Exception:
+            # The stale chart carries on being served, and the next read of it will start another refresh
+            pass
+        finally:
+            with self._refresh_lock:
+                self._refreshing.pop(service_url, None)
+
+    def _start_refresh(self, service_url):
+        """Internal routine to start a background refresh of a chart, unless one is already running
+        """
+        with self._refresh_lock:
+            if service_url in self._refreshing:
+                return
+            thread = threading.Thread(target=self._refresh_chart, args=(service_url, self._generation))
+            thread.daemon = True
+            self._refreshing[service_url] = thread
+        thread.start()
+
+    def _chart_lock(self, service_url):
+        """Internal routine to return the lock that is held whilst the chart for ``service_url`` is read
+        """
+        with self._lock:
+            return self._chart_locks.setdefault(service_url, threading.Lock())
+
+    def _chart(self, service_url):
+        """Internal routine to return the chart for ``service_url`` from the cache, reading it if needed
+        """
+        cached = self._charts.get(service_url)
+        if cached is not None and not cached.expired():
+            return cached.chart
+
+        if cached is not None and self.stale_while_revalidate:
+            self._start_refresh(service_url)
+            return cached.chart
+
+        with self._chart_lock(service_url):
+            # Another thread may have read the chart whilst we were waiting for the lock
+            cached = self._charts.get(service_url)
+            if cached is not None and not cached.expired():
+                return cached.chart
+            return self._get_chart(service_url)
+
+    def _chart_age(self, service_url):
+        """Internal routine to return the number of seconds since the cached chart was read from the remote API
+        """
+        cached = self._charts.get(service_url)
+        if cached is None:
+            return None
+        return time.time() - cached.retrieved_at
 
     @property
     def albums_chart(self):
@@ -340,9 +856,17 @@ class Top40(object):
             Top40ConnectionError (:py:class:`~errors.Top40ConnectionError`): If a connection could not be established to the remote server
             Top40ReadTimeoutError (:py:class:`~errors.Top40ReadTimeoutError`): If the remote server took too long to respond
         """
-        if self._albums_chart is None:
-            self._get_albums_chart()
-        return self._albums_chart
+        return self._chart("/albums")
+
+    @property
+    def albums_chart_age(self):
+        """A ``property`` that returns how old the cached albums chart is.
+
+        Returns:
+            :py:class:`float`: The number of seconds since the albums chart was read from the remote API, or ``None``
+                if it hasn't been read yet.
+        """
+        return self._chart_age("/albums")
 
     @property
     def albums(self):
@@ -359,12 +883,6 @@ class Top40(object):
         albums_chart = self.albums_chart
         return albums_chart.entries
 
-    def _get_singles_chart(self):
-        """Internal routine to pull the singles chart information into the cache
-        """
-        singles = self._get_data("/singles")
-        self._singles_chart = Chart(**singles)
-
     @property
     def singles_chart(self):
         """A ``property`` that returns the :py:class:`Chart` object for the current Top40 singles
@@ -377,9 +895,17 @@ class Top40(object):
             Top40ConnectionError (:py:class:`~errors.Top40ConnectionError`): If a connection could not be established to the remote server
             Top40ReadTimeoutError (:py:class:`~errors.Top40ReadTimeoutError`): If the remote server took too long to respond
         """
-        if self._singles_chart is None:
-            self._get_singles_chart()
-        return self._singles_chart
+        return self._chart("/singles")
+
+    @property
+    def singles_chart_age(self):
+        """A ``property`` that returns how old the cached singles chart is.
+
+        Returns:
+            :py:class:`float`: The number of seconds since the singles chart was read from the remote API, or ``None``
+                if it hasn't been read yet.
+        """
+        return self._chart_age("/singles")
 
     @property
     def singles(self):
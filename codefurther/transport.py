@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2014 Danny Goodall
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""The :mod:`transport` module contains the :py:class:`Transport` class that owns the pooled HTTP connections used by
+the :py:class:`~top40.Top40`, :py:class:`~lyrics.Lyrics` and :py:class:`~directions.GetDirections` classes.
+
+Unless told otherwise, every instance of those classes shares the one transport returned by
+:py:func:`default_transport`, so repeated reads from the same remote server reuse an already open connection rather
+than paying for a new TCP (and TLS) handshake each time. A transport with different settings can be created and passed
+in instead::
+
+    from codefurther.transport import Transport
+    from codefurther.top40 import Top40
+    from codefurther.lyrics import Lyrics
+
+    transport = Transport(pool_maxsize=20, timeout=(2, 10))
+
+    top40 = Top40(transport=transport)
+    lyrics_machine = Lyrics(transport=transport)
+
+.. moduleauthor:: Danny Goodall <danny@onebloke.com>
+
+"""
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+__author__ = 'Danny Goodall'
+
+__all__ = ['Transport', 'default_transport']
+
+
+class Transport(object):
+    """Owns a pool of keep-alive HTTP connections and the default :py:class:`requests.Session` that uses them.
+
+    The connection pool lives in a single :py:class:`requests.adapters.HTTPAdapter`. The adapter keeps one pool of
+    connections for each remote host, so ``pool_maxsize`` is the number of connections that will be kept open to any
+    one host, and ``pool_connections`` is the number of different hosts that will have a pool kept for them.
+
+    Args:
+        pool_connections (:py:class:`int`): The number of per-host connection pools to keep.
+        pool_maxsize (:py:class:`int`): The maximum number of connections to keep open to each host.
+        pool_block (:py:class:`bool`): If ``True`` then ``pool_maxsize`` becomes a hard limit, and a request will wait
+            for a free connection rather than opening an extra one that is thrown away afterwards.
+        max_retries (:py:class:`int`): The number of times a failed connection attempt will be retried.
+        timeout (:py:class:`float` or :py:class:`tuple`): The default timeout in seconds for each request. A
+            ``(connect, read)`` tuple sets the two timeouts separately. ``None`` waits forever.
+        keep_alive (:py:class:`bool`): If ``False`` the server is asked to close each connection after use.
+    Attributes:
+        timeout (:py:class:`float` or :py:class:`tuple`): The default timeout applied to each request.
+        keep_alive (:py:class:`bool`): Whether connections are kept open between requests.
+        adapter (:py:class:`requests.adapters.HTTPAdapter`): The adapter that holds the connection pools.
+    Returns:
+        Transport (:py:class:`Transport`): The Transport instance.
+    """
+
+    def __init__(self, pool_connections=10, pool_maxsize=10, pool_block=False, max_retries=0, timeout=(5, 30),
+                 keep_alive=True):
+        self.timeout = timeout
+        self.keep_alive = keep_alive
+        self.adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=max_retries,
+            pool_block=pool_block
+        )
+        self._session = None
+        self._lock = threading.Lock()
+
+    def create_session(self, session_class=None, **kwargs):
+        """Create a new session that sends its requests through this transport's connection pools.
+
+        Sessions created this way can have their own settings (a cache for example) whilst still sharing the open
+        connections of every other session created by the same transport.
+
+        Args:
+            session_class (:py:class:`type`): The class of session to create. Defaults to :py:class:`requests.Session`.
+            kwargs: Keyword arguments passed on to ``session_class``.
+        Returns:
+            session (:py:class:`requests.Session`): The new session.
+        """
+        # Look requests.Session up at call time rather than binding it as a default argument value
+        session_class = session_class if session_class is not None else requests.Session
+        session = session_class(**kwargs)
+        session.mount('http://', self.adapter)
+        session.mount('https://', self.adapter)
+        if not self.keep_alive:
+            session.headers['Connection'] = 'close'
+        return session
+
+    @property
+    def session(self):
+        """A ``property`` that returns the default session for this transport, creating it on first use.
+
+        Returns:
+            session (:py:class:`requests.Session`): The default session.
+        """
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = self.create_session()
+        return self._session
+
+    def get(self, url, params=None, session=None, **kwargs):
+        """Send a GET request through the transport.
+
+        Args:
+            url (:py:class:`str`): The url to read.
+            params (:py:class:`dict`): Parameters to be passed as query variables ?key=value.
+            session (:py:class:`requests.Session`): The session to use. Defaults to :py:attr:`Transport.session`.
+            kwargs: Any other keyword arguments accepted by :py:meth:`requests.Session.get`.
+        Returns:
+            response (:py:class:`requests.Response`): The response from the remote server.
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        session = session if session is not None else self.session
+        return session.get(url, params=params, **kwargs)
+
+    def close(self):
+        """Close every connection held in the transport's pools."""
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+        self.adapter.close()
+
+
+_default_transport = None
+_default_transport_lock = threading.Lock()
+
+
+def default_transport():
+    """Return the :py:class:`Transport` shared by all instances that weren't given one of their own.
+
+    Returns:
+        transport (:py:class:`Transport`): The shared transport instance.
+    """
+    global _default_transport
+    if _default_transport is None:
+        with _default_transport_lock:
+            if _default_transport is None:
+                _default_transport = Transport()
+    return _default_transport
@@ -16,13 +16,30 @@
 
 """The :mod:`utils` module contains utility functions and classes used by the other modules in the suite.
 
+:py:func:`recurse_structure` can turn the dicts of a document into ``Munch`` types, which needs the optional
+`munch <https://pypi.python.org/pypi/munch>`_ package, installed with::
+
+    pip install codefurther[munch]
+
 """
+import json
 import os
+import re
+import threading
 
 from future.utils import raise_from
 from codefurther.errors import CodeFurtherConversionError
-from munch import Munch
-from six import iteritems
+from six import iteritems, string_types
+
+try:
+    from collections.abc import Mapping, Sequence
+except ImportError:
+    from collections import Mapping, Sequence
+
+try:
+    from munch import Munch
+except ImportError:
+    Munch = None
 
 
 def isolate_path_filename(uri):
@@ -72,7 +89,229 @@ def request_send_file(request, uri, headers):
     return (200 if 'status' not in headers else headers['status'], headers, file_contents)
 
 
-def recurse_structure(thing, use_munch=True, convert=None):
+class _Call(object):
+    """Internal record of one call made by :py:class:`SingleFlight`, shared with the callers waiting for it"""
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """Collapses concurrent calls that share a key into a single call.
+
+    If :py:meth:`SingleFlight.do` is called for a key whilst an earlier call for the same key is still running, the
+    later caller doesn't make the call itself. Instead it waits for the earlier call to finish, and then receives
+    the same result - or has the same exception raised. Once a call has finished, the next call for its key is made
+    afresh; nothing is cached.
+
+    This is used to make sure that several threads asking for the same url at the same moment only cause one request
+    to the remote server::
+
+        single_flight = SingleFlight()
+        response = single_flight.do(url, requests.get, url)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, function, *args, **kwargs):
+        """Call ``function(*args, **kwargs)``, unless a call for ``key`` is already running.
+
+        Args:
+            key (hashable): The key that identifies calls that would return the same result.
+            function (callable): The function to call.
+            args: Positional arguments for ``function``.
+            kwargs: Keyword arguments for ``function``.
+        Returns:
+            The result of the call (Any type).
+        Raises:
+            Any exception raised by the call.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = function(*args, **kwargs)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.result
+
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+class _JSONStream(object):
+    """Internal reader of a JSON document that arrives in chunks, which only keeps the unread text in memory"""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.pos = 0
+        self.exhausted = False
+
+    def _more(self):
+        """Throw away the text that has been read, and add the next chunk. Returns ``False`` at the end"""
+        self.buffer = self.buffer[self.pos:]
+        self.pos = 0
+        for chunk in self._chunks:
+            if chunk:
+                self.buffer += chunk
+                return True
+        self.exhausted = True
+        return False
+
+    def peek(self):
+        """Skip whitespace and return the next character, without reading it"""
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._more():
+                raise ValueError("The JSON document ended unexpectedly.")
+
+    def expect(self, characters):
+        """Read the next character, which must be one of ``characters``, and return it"""
+        character = self.peek()
+        if character not in characters:
+            raise ValueError("Expected one of {!r} in the JSON document, but found {!r}.".format(
+                characters,
+                character
+            ))
+        self.pos += 1
+        return character
+
+    def value(self):
+        """Read the next complete JSON value and return it decoded"""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buffer, self.pos)
+            except ValueError:
+                # The value may not have arrived in full yet
+                if not self._more():
+                    raise
+                continue
+
+            # A number that is cut short by the end of the buffer may carry on in the next chunk
+            if not self.exhausted and self.buffer[self.pos] in '-0123456789' and (
+                end == len(self.buffer) or self.buffer[end] in '.eE+-'
+            ):
+                self._more()
+                continue
+
+            self.pos = end
+            return value
+
+
+def iter_json_array(chunks, key):
+    """Yield the items of the array held under ``key`` in a JSON object, as the text of the object arrives.
+
+    Each item is yielded as soon as all of its text has been read from ``chunks``, rather than once the whole document
+    has arrived, and the text of the items that have been yielded isn't kept. So the lines of a song can be
+    shown whilst the rest of it is still being downloaded::
+
+        response = requests.get(url, stream=True)
+        for line in iter_json_array(response.iter_content(1024, decode_unicode=True), "lyrics"):
+            print(line)
+
+    Args:
+        chunks (iterable): The text of the JSON document, as :py:class:`str` chunks of any size.
+        key (:py:class:`str`): The key of the array in the top level object.
+    Yields:
+        The decoded items of the array (Any type).
+    Raises:
+        ValueError: If the text isn't a valid JSON object, or the value of ``key`` isn't an array.
+        KeyError: If the object doesn't contain ``key``.
+    """
+    stream = _JSONStream(chunks)
+
+    stream.expect('{')
+    if stream.peek() == '}':
+        raise KeyError(key)
+
+    while True:
+        name = stream.value()
+        stream.expect(':')
+
+        if name == key:
+            stream.expect('[')
+            if stream.peek() == ']':
+                return
+            while True:
+                yield stream.value()
+                if stream.expect(',]') == ']':
+                    return
+
+        # Skip the values of the other keys
+        stream.value()
+        if stream.expect(',}') == '}':
+            raise KeyError(key)
+
+
+def _conversion_error(key, value, function):
+    """Internal routine to return the CodeFurtherConversionError raised when ``function`` can't convert ``value``"""
+    return CodeFurtherConversionError(
+        "A TypeError occurred trying to convert a dictionary value. "
+        "Key: '{}', Value: {}, Converting to: {}".format(
+            str(key),
+            str(value),
+            str(function)
+        )
+    )
+
+
+def _convert_value(convert, key, value):
+    """Internal routine to convert ``value`` with ``convert[key]``, raising CodeFurtherConversionError on a TypeError"""
+    try:
+        return convert[key](value)
+    except TypeError as e:
+        raise_from(_conversion_error(key, value, convert[key]), e)
+
+
+_CONTAINERS = (list, dict)
+
+# Munch() and Munch.update() copy one item at a time in Python, so empty Munch are made without calling __init__ and
+# filled with dict.update, which copies in C
+_new_munch = dict.__new__
+
+
+def _require_munch():
+    """Internal routine to raise an ImportError if the munch package isn't installed"""
+    if Munch is None:
+        raise ImportError("Munch types need the munch package. Install it with 'pip install codefurther[munch]', or "
+                          "use json_view() for attribute access without it.")
+
+
+def _copy_dict(thing, use_munch, in_place):
+    """Internal routine to return the dict that replaces ``thing`` in the result of :py:func:`recurse_structure`"""
+    if use_munch:
+        munch = _new_munch(Munch)
+        dict.update(munch, thing)
+        return munch
+    return thing if in_place else dict(thing)
+
+
+def recurse_structure(thing, use_munch=True, convert=None, in_place=False):
     """Recursively convert any dicts in a thing to Munch types.
 
     The any iterables in ``thing`` will be walked along, and any :py:class:`dict` types will be converted to ``Munch``
@@ -93,51 +332,408 @@ def recurse_structure(thing, use_munch=True, convert=None):
 
     If an exception is raised during the conversion, a Top40ConversionError is raised.
 
+    The ``thing`` is walked with a stack rather than by recursion, so however deeply it is nested, Python's recursion
+    limit isn't reached. If the document is only going to be read, :py:func:`json_view` gives the same attribute access
+    without copying it.
+
     Args:
         thing (Any type): The thing to be recursively parsed and/or converted.
         use_munch (:py:class:`bool`): Should dicts be replaced with Munch types?
         convert (:py:class:`dict` or :py:class:`None`): A dictionary of key and type pairs to be converted.
+        in_place (:py:class:`bool`): If ``True`` the lists and dicts in ``thing`` are changed, rather than copied, which
+            is quicker for a document that has just been decoded and won't be used again. Dicts are still replaced if
+            ``use_munch`` is ``True``, as a dict can't be turned into a Munch. A list or dict that appears in more than
+            one place in ``thing`` would be converted more than once, so don't use this for such things.
 
     Returns:
         The converted thing (Any tupe)
 
     Raises:
         Top40ConversionError: if a conversion from the ``convert`` :py:class:`dict` fails.
+        ImportError: if ``use_munch`` is ``True`` and the munch package is not installed.
     """
+    if use_munch:
+        _require_munch()
 
-    if convert is None:
-        convert = {}
-
-    # What are we dealing with?
     if isinstance(thing, list):
-        new_thing = []
-        for x in thing:
-            new_thing.append(
-                recurse_structure(x, use_munch=use_munch, convert=convert)
-            )
-        return new_thing
+        result = thing if in_place else list(thing)
     elif isinstance(thing, dict):
-        new_thing = {} if not use_munch else Munch()
-        for k, v in iteritems(thing):
-            # Do we need to convert this thing?
-            if k in convert:
-                try:
-                    v = convert[k](v)
-                except TypeError as e:
-                    raise_from(
-                        CodeFurtherConversionError(
-                            "A TypeError occurred trying to convert a dictionary value. "
-                            "Key: '{}', Value: {}, Converting to: {}".format(
-                                str(k),
-                                str(v),
-                                str(convert[k])
-                            )
-                        ),
-                        e
-                    )
-
-            new_thing[k] = recurse_structure(v, use_munch=use_munch, convert=convert)
-        return new_thing
+        result = _copy_dict(thing, use_munch, in_place)
     else:
         return thing
 
+    # Every container in the stack is already the one that will be returned - it has been copied (or kept, if in_place)
+    # and put in its parent - but the containers and values inside it haven't been converted yet
+    stack = [result]
+    pop = stack.pop
+    push = stack.append
+    while stack:
+        container = pop()
+        if isinstance(container, list):
+            for index, value in enumerate(container):
+                if not isinstance(value, _CONTAINERS):
+                    continue
+                if isinstance(value, list):
+                    if not in_place:
+                        value = container[index] = list(value)
+                elif use_munch:
+                    munch = _new_munch(Munch)
+                    dict.update(munch, value)
+                    value = container[index] = munch
+                elif not in_place:
+                    value = container[index] = dict(value)
+                push(value)
+        else:
+            for key, value in iteritems(container):
+                # Do we need to convert this thing?
+                if convert and key in convert:
+                    value = container[key] = _convert_value(convert, key, value)
+                if not isinstance(value, _CONTAINERS):
+                    continue
+                if isinstance(value, list):
+                    if not in_place:
+                        value = container[key] = list(value)
+                elif use_munch:
+                    munch = _new_munch(Munch)
+                    dict.update(munch, value)
+                    value = container[key] = munch
+                elif not in_place:
+                    value = container[key] = dict(value)
+                push(value)
+
+    return result
+
+
+
+_PATH_SEGMENT = re.compile(r'^([^\[\]]*)((?:\[\])*)$')
+
+
+class _PlanNode(object):
+    """Internal record of one place in a :py:class:`ConversionPlan` - what to do with a value that is found there"""
+    __slots__ = ('keys', 'items', 'convert', 'conversions')
+
+    def __init__(self):
+        self.keys = {}
+        self.items = None
+        self.convert = None
+        # The (key, function) pairs of the keys of this node that are converted, worked out once the plan is compiled
+        self.conversions = ()
+
+
+class ConversionPlan(object):
+    """A conversion that has been compiled from a ``convert`` :py:class:`dict` and the paths of the values to convert.
+
+    :py:func:`recurse_structure` looks up every key of every :py:class:`dict` in its ``convert`` :py:class:`dict`. When
+    the same shape of document is converted again and again - a chart, each time it is refreshed - the places that
+    need converting are always the same, so a plan names them once, and then only visits those places::
+
+        plan = ConversionPlan(
+            {"position": int, "actual": int},
+            ["entries[].position", "entries[].change.actual"]
+        )
+        chart = plan(json.loads(text))
+
+    A path is a list of keys separated by ``.``, and ``[]`` after a key means every item of the list held there; a path
+    that starts with ``[]`` is for a document that is a list. The last key of each path is looked up in ``convert``.
+    A path that isn't in a document is skipped, as a key that isn't in a document is by :py:func:`recurse_structure`.
+
+    The document is copied in one pass, with its dicts replaced by ``Munch`` if ``use_munch`` is ``True``, as
+    :py:func:`recurse_structure` copies it, so the cost of converting a document is little more than the cost of
+    copying it.
+
+    Args:
+        convert (:py:class:`dict`): A dictionary of key and type pairs to be converted.
+        paths (iterable): The paths of the values to convert.
+        use_munch (:py:class:`bool`): Should dicts be replaced with Munch types?
+    Attributes:
+        convert (:py:class:`dict`): The key and type pairs to be converted.
+        paths (:py:class:`tuple`): The paths of the values to convert.
+        use_munch (:py:class:`bool`): Are dicts replaced with Munch types?
+    Returns:
+        ConversionPlan (:py:class:`ConversionPlan`): The ConversionPlan instance.
+    Raises:
+        ValueError: If a path is badly formed, or its last key isn't in ``convert``.
+        ImportError: If ``use_munch`` is ``True`` and the munch package is not installed.
+    """
+
+    def __init__(self, convert, paths, use_munch=True):
+        if use_munch:
+            _require_munch()
+
+        self.convert = dict(convert)
+        self.paths = tuple(paths)
+        self.use_munch = use_munch
+        self._root = _PlanNode()
+        for path in self.paths:
+            self._compile(path)
+
+        nodes = [self._root]
+        while nodes:
+            node = nodes.pop()
+            node.conversions = tuple((key, child.convert) for key, child in iteritems(node.keys) if child.convert)
+            # A key that is only converted needs no node of its own when the document is walked
+            node.keys = dict((key, child) for key, child in iteritems(node.keys) if child.keys or child.items)
+            nodes.extend(node.keys.values())
+            if node.items is not None:
+                nodes.append(node.items)
+
+    def _compile(self, path):
+        """Internal method to add the nodes for ``path`` to the plan"""
+        node = self._root
+        segments = path.split('.')
+        for position, segment in enumerate(segments):
+            match = _PATH_SEGMENT.match(segment)
+            # Only the first segment can be nothing but [], for a document that is a list
+            if match is None or not match.group(1) and (position or not match.group(2)):
+                raise ValueError("The conversion path '{}' is badly formed.".format(path))
+            key, lists = match.groups()
+            if key:
+                node = node.keys.setdefault(key, _PlanNode())
+            for _ in range(len(lists) // 2):
+                if node.items is None:
+                    node.items = _PlanNode()
+                node = node.items
+
+        if lists or key not in self.convert:
+            raise ValueError("The conversion path '{}' doesn't end with a key from the convert dict.".format(path))
+        node.convert = self.convert[key]
+
+    def __call__(self, thing, in_place=False):
+        """Copy and convert a document.
+
+        Args:
+            thing (Any type): The document to be converted.
+            in_place (:py:class:`bool`): If ``True`` the lists and dicts in ``thing`` are changed rather than copied,
+                as in :py:func:`recurse_structure`.
+        Returns:
+            The converted document (Any type).
+        Raises:
+            CodeFurtherConversionError: if a conversion fails.
+        """
+        if not isinstance(thing, _CONTAINERS):
+            return thing
+        use_munch = self.use_munch
+        result = thing if in_place and isinstance(thing, list) else (
+            list(thing) if isinstance(thing, list) else _copy_dict(thing, use_munch, in_place)
+        )
+
+        # Each entry is a container that has been copied, but whose contents haven't, and the node of the plan for it -
+        # or None, where the plan has nothing to convert
+        stack = [(result, self._root)]
+        pop = stack.pop
+        push = stack.append
+        while stack:
+            container, node = pop()
+            if isinstance(container, list):
+                items = node.items if node is not None else None
+                for index, value in enumerate(container):
+                    if not isinstance(value, _CONTAINERS):
+                        continue
+                    if isinstance(value, list):
+                        if not in_place:
+                            value = container[index] = list(value)
+                    elif use_munch:
+                        munch = _new_munch(Munch)
+                        dict.update(munch, value)
+                        value = container[index] = munch
+                    elif not in_place:
+                        value = container[index] = dict(value)
+                    push((value, items))
+            else:
+                keys = None
+                if node is not None:
+                    for key, function in node.conversions:
+                        if key in container:
+                            value = container[key]
+                            try:
+                                container[key] = function(value)
+                            except TypeError as e:
+                                raise_from(_conversion_error(key, value, function), e)
+                    keys = node.keys
+                for key, value in iteritems(container):
+                    if not isinstance(value, _CONTAINERS):
+                        continue
+                    if isinstance(value, list):
+                        if not in_place:
+                            value = container[key] = list(value)
+                    elif use_munch:
+                        munch = _new_munch(Munch)
+                        dict.update(munch, value)
+                        value = container[key] = munch
+                    elif not in_place:
+                        value = container[key] = dict(value)
+                    push((value, keys.get(key) if keys else None))
+
+        return result
+
+
+def _unwrap(thing):
+    """Internal routine to return the dict or list behind a view, or ``thing`` itself if it isn't a view"""
+    return thing._data if isinstance(thing, (JSONView, JSONListView)) else thing
+
+
+def json_view(thing):
+    """Return a read only view of a decoded JSON document, whose dicts can be read by attribute as well as by key.
+
+    Unlike :py:func:`recurse_structure`, nothing is copied. A dict or list inside the document is wrapped in a view
+    the first time it is read, and the same view is returned each time after that::
+
+        chart = json_view(response.json())
+        print(chart.entries[0].change.actual)
+
+    The views read the document that they wrap, so they should only be used while it isn't being changed. To change
+    the document, use :py:func:`recurse_structure` to copy it into ``Munch`` types.
+
+    Args:
+        thing (Any type): The decoded document.
+    Returns:
+        A :py:class:`JSONView` if ``thing`` is a :py:class:`dict`, a :py:class:`JSONListView` if it is a
+        :py:class:`list`, otherwise ``thing`` itself.
+    """
+    if isinstance(thing, dict):
+        return JSONView(thing)
+    if isinstance(thing, list):
+        return JSONListView(thing)
+    return thing
+
+
+class JSONView(Mapping):
+    """A read only view of a JSON object that can be read by attribute - ``view.change.actual`` - or by key.
+
+    Made by :py:func:`json_view`. A key that is also the name of a method of a mapping, such as ``items``, can only be
+    read by key.
+
+    Args:
+        data (:py:class:`dict`): The JSON object.
+    Returns:
+        JSONView (:py:class:`JSONView`): The JSONView instance.
+    """
+    __slots__ = ('_data', '_views')
+
+    def __init__(self, data):
+        object.__setattr__(self, '_data', data)
+        object.__setattr__(self, '_views', None)
+
+    def __getitem__(self, key):
+        value = self._data[key]
+        if not isinstance(value, _CONTAINERS):
+            return value
+
+        views = self._views
+        if views is None:
+            views = {}
+            object.__setattr__(self, '_views', views)
+        view = views.get(key)
+        if view is None or view._data is not value:
+            view = views[key] = json_view(value)
+        return view
+
+    def __getattr__(self, name):
+        # Only called before __init__ has run, when copying say, for the view's own attributes
+        if name in JSONView.__slots__:
+            raise AttributeError(name)
+        try:
+            value = self._data[name]
+        except KeyError:
+            raise AttributeError(name)
+        return self[name] if isinstance(value, _CONTAINERS) else value
+
+    def __setattr__(self, name, value):
+        raise AttributeError("A JSONView can't be changed. Use recurse_structure() to make a Munch that can be.")
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __eq__(self, other):
+        return self._data == _unwrap(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "JSONView({!r})".format(self._data)
+
+    def __dir__(self):
+        return sorted(set(dir(type(self))) | set(key for key in self._data if isinstance(key, string_types)))
+
+    def __reduce__(self):
+        return JSONView, (self._data,)
+
+    def unwrap(self):
+        """Return the JSON object that this view reads.
+
+        Returns:
+            (:py:class:`dict`): The JSON object.
+        """
+        return self._data
+
+
+class JSONListView(Sequence):
+    """A read only view of a JSON array, whose objects and arrays are returned as views. Made by :py:func:`json_view`.
+
+    Args:
+        data (:py:class:`list`): The JSON array.
+    Returns:
+        JSONListView (:py:class:`JSONListView`): The JSONListView instance.
+    """
+    __slots__ = ('_data', '_views')
+
+    def __init__(self, data):
+        self._data = data
+        self._views = None
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return JSONListView(self._data[index])
+
+        value = self._data[index]
+        if not isinstance(value, _CONTAINERS):
+            return value
+
+        views = self._views
+        if views is None or len(views) != len(self._data):
+            views = self._views = [None] * len(self._data)
+        view = views[index]
+        if view is None or view._data is not value:
+            view = views[index] = json_view(value)
+        return view
+
+    def __iter__(self):
+        for index, value in enumerate(self._data):
+            yield self[index] if isinstance(value, _CONTAINERS) else value
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, value):
+        return _unwrap(value) in self._data
+
+    def __eq__(self, other):
+        return self._data == _unwrap(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "JSONListView({!r})".format(self._data)
+
+    def __reduce__(self):
+        return JSONListView, (self._data,)
+
+    def unwrap(self):
+        """Return the JSON array that this view reads.
+
+        Returns:
+            (:py:class:`list`): The JSON array.
+        """
+        return self._data
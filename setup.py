@@ -44,19 +44,27 @@ setup(
         'Intended Audience :: Developers',
         'Natural Language :: English',
         'Operating System :: OS Independent',
-        'Programming Language :: Python :: 2.7',
-        'Programming Language :: Python :: 3.3',
-        'Programming Language :: Python :: 3.4',
+        'Programming Language :: Python :: 3',
+        'Programming Language :: Python :: 3 :: Only',
+        'Programming Language :: Python :: 3.7',
+        'Programming Language :: Python :: 3.8',
+        'Programming Language :: Python :: 3.9',
         'Topic :: Software Development :: Libraries :: Python Modules'
     ],
+    python_requires='>=3.7',
     install_requires=[
         'arrow==0.4.4',
         'booby>=0.7.0',
         'six==1.8.0',
         'future==0.14.2',
         'python-gmaps == 0.2.1',
-        'requests-cache==0.4.8',
+        'requests-cache==0.9.8',
         'markupsafe==0.23'
     ],
+    extras_require={
+        'async': ['aiohttp>=3.0'],
+        'numpy': ['numpy'],
+        'munch': ['munch'],
+    },
     dependency_links=[]
 )
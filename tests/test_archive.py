@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2014 Danny Goodall
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import json
+import unittest
+from codefurther.helpers import StubServer
+
+__author__ = 'User'
+
+from expects import *
+from codefurther import top40
+
+WEEK = 7 * 24 * 60 * 60
+
+
+class TestChartArchive(unittest.TestCase):
+
+    def setUp(self):
+        with open("tests/resources/albums.json") as albums_file:
+            self.albums_json = json.load(albums_file)
+        self.archive = top40.ChartArchive(":memory:")
+
+    def tearDown(self):
+        self.archive.close()
+
+    def next_week(self, data):
+        """Return the chart a week after ``data``, with every entry in it for one more week"""
+        data = json.loads(json.dumps(data))
+        data['date'] += WEEK
+        for entry in data['entries']:
+            entry['numWeeks'] += 1
+        return data
+
+    def test_should_fail_if_chart_is_not_saved_once(self):
+        chart = top40.Chart(**self.albums_json)
+
+        expect(self.archive.save("albums", chart)).to(be(True))
+        expect(self.archive.save("albums", chart)).to(be(False))
+        expect(self.archive.save("singles", chart)).to(be(True))
+
+        expect(self.archive.dates("albums")).to(equal([chart.date]))
+
+    def test_should_fail_if_saved_chart_is_not_returned(self):
+        chart = top40.Chart(**self.albums_json)
+        self.archive.save("albums", chart)
+
+        expect(dict(self.archive.chart("albums", chart.date))).to(equal(dict(chart)))
+        expect(self.archive.chart("albums", chart.date + 1)).to(be_none)
+        expect(self.archive.chart("singles")).to(be_none)
+
+        self.archive.compact = True
+        expect(self.archive.chart("albums")).to(equal(top40.CompactChart.from_model(chart)))
+
+    def test_should_fail_if_artist_weeks_are_not_found(self):
+        first_week = self.albums_json
+        second_week = self.next_week(first_week)
+        second_week['entries'][1]['position'], second_week['entries'][30]['position'] = 31, 2
+        self.archive.save("albums", top40.CompactChart.from_json(second_week))
+        self.archive.save("albums", top40.Chart(**first_week))
+
+        weeks = self.archive.artist_weeks("Ed Sheeran", "albums")
+        top_10_weeks = self.archive.artist_weeks("Ed Sheeran", "albums", top=10)
+
+        expect([(week.date, week.position, week.title) for week in weeks]).to(equal([
+            (first_week['date'], 2, "X"), (second_week['date'], 31, "X")
+        ]))
+        expect([week.date for week in top_10_weeks]).to(equal([first_week['date']]))
+        expect(self.archive.artist_weeks("Ed Sheeran", "albums", start=second_week['date'])).to(have_length(1))
+        expect(self.archive.title_weeks("X")).to(have_length(2))
+        expect(self.archive.artist_weeks("Nobody")).to(equal([]))
+
+    def test_should_fail_if_longest_runs_are_not_ordered(self):
+        first_week = self.albums_json
+        second_week = self.next_week(first_week)
+        self.archive.save("albums", top40.Chart(**first_week))
+        self.archive.save("albums", top40.Chart(**second_week))
+
+        runs = self.archive.longest_runs("albums", limit=3)
+        first_week_runs = self.archive.longest_runs("albums", end=second_week['date'], limit=3)
+        longest = sorted(first_week['entries'], key=lambda entry: -entry['numWeeks'])[:3]
+
+        expect([(run.title, run.numWeeks) for run in runs]).to(equal(
+            [(entry['title'], entry['numWeeks'] + 1) for entry in longest]
+        ))
+        expect([run.date for run in runs]).to(equal([second_week['date']] * 3))
+        expect([run.numWeeks for run in first_week_runs]).to(equal([entry['numWeeks'] for entry in longest]))
+
+
+    def test_should_fail_if_songs_in_both_chart_types_are_run_twice(self):
+        first_week = self.albums_json
+        second_week = self.next_week(first_week)
+        self.archive.save("albums", top40.Chart(**first_week))
+        self.archive.save("albums", top40.Chart(**second_week))
+        # The same songs in the singles chart of the first week, with the same run as the second week of albums
+        self.archive.save("singles", top40.Chart(**dict(second_week, date=first_week['date'])))
+
+        runs = self.archive.longest_runs(limit=len(first_week['entries']) * 3)
+
+        expect(len(runs)).to(equal(len(set((run.artist, run.title) for run in runs))))
+        expect(len(runs)).to(equal(len(set((entry['artist'], entry['title']) for entry in first_week['entries']))))
+        expect(set((run.chart_type, run.date) for run in runs)).to(equal(set([("singles", first_week['date'])])))
+
+class TestTop40Archive(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StubServer("/labs/top40/api", "tests/resources").start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_should_fail_if_charts_read_are_not_archived(self):
+        with top40.ChartArchive(":memory:") as archive:
+            top40_reader = top40.Top40(base_url=self.server.url, cache_duration=None, archive=archive)
+
+            albums_chart = top40_reader.albums_chart
+            singles_chart = top40_reader.singles_chart
+
+            expect(archive.dates("albums")).to(equal([albums_chart.date]))
+            expect(archive.dates("singles")).to(equal([singles_chart.date]))
+            expect(archive.chart("singles").entries[0].artist).to(equal(singles_chart.entries[0].artist))
+
+    def test_should_fail_if_archive_errors_break_chart_reads(self):
+        archive = top40.ChartArchive(":memory:")
+        archive.close()
+        top40_reader = top40.Top40(base_url=self.server.url, cache_duration=None, archive=archive)
+
+        with self.assertLogs("codefurther.top40.top40", level="WARNING") as logs:
+            albums_chart = top40_reader.albums_chart
+
+        expect(albums_chart.entries).not_to(be_empty)
+        expect(logs.output[0]).to(contain("could not be archived"))
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2014 Danny Goodall
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import asyncio
+import unittest
+from codefurther.errors import CodeFurtherHTTPError, CodeFurtherConnectionError, CodeFurtherError
+from codefurther.helpers import StubServer
+
+__author__ = 'User'
+
+from expects import *
+from codefurther import lyrics, top40
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+class TestAsyncTop40(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer("/labs/top40/api", "tests/resources").start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_should_fail_if_models_are_not_populated_correctly_albums(self):
+        async def read():
+            async with top40.AsyncTop40(base_url=self.server.url) as async_top40:
+                chart = await async_top40.albums_chart()
+                entries = await async_top40.albums()
+                return chart, entries
+
+        albums_chart, albums_entries = run(read())
+
+        expect(albums_chart).to(be_a(top40.Chart))
+        expect(albums_entries).to(equal(albums_chart.entries))
+        expect(albums_chart.date).to(equal(1416700800))
+        expect(albums_chart.entries[0].artist).to(equal("One Direction"))
+        expect(albums_chart.entries[0].change.actual).to(equal(-1))
+
+    def test_should_fail_if_chart_is_not_kept_in_memory(self):
+        async def read():
+            async with top40.AsyncTop40(base_url=self.server.url) as async_top40:
+                await async_top40.singles()
+                await async_top40.singles()
+                async_top40.reset_cache()
+                return await async_top40.singles()
+
+        singles = run(read())
+
+        expect(singles[0].artist).to(equal("Band Aid 30"))
+        expect(self.server.requests_seen).to(equal(["/labs/top40/api/singles", "/labs/top40/api/singles"]))
+
+    def test_should_fail_if_404_does_not_raise_http_error(self):
+        async def read():
+            async with top40.AsyncTop40(base_url=self.server.url) as async_top40:
+                return await async_top40._get_data("-404-")
+
+        expect(lambda: run(read())).to(raise_error(CodeFurtherHTTPError))
+
+
+class TestAsyncLyrics(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer("/lyricsapi", "tests/resources/lyricsapi").start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def call(self, method, *args):
+        async def read():
+            async with lyrics.AsyncLyrics(base_url=self.server.url) as lyrics_machine:
+                return await getattr(lyrics_machine, method)(*args)
+
+        return run(read())
+
+    def test_should_fail_if_api_response_format_incorrect(self):
+        expect(self.call("song_lyrics", "billy bragg", "days like these")).to(be_a(list))
+        expect(self.call("artist_songs", "billy bragg")).to(be_a(list))
+        expect(self.call("artist_search", "billy bragg")).to(equal("Billy Bragg"))
+        expect(self.call("artist_exists", "billy bragg")).to(be(True))
+
+    def test_should_fail_if_malformed_json_response_not_trapped(self):
+        expect(lambda: self.call("song_lyrics", "billy bragg", "malformed")).to(raise_error(ValueError))
+        expect(lambda: self.call("artist_songs", "malformed")).to(raise_error(ValueError))
+        expect(lambda: self.call("artist_search", "malformed")).to(raise_error(ValueError))
+
+    def test_should_fail_if_null_artist_passed(self):
+        expect(lambda: self.call("song_lyrics", "", "")).to(raise_error(ValueError))
+        expect(lambda: self.call("artist_songs", None)).to(raise_error(ValueError))
+
+    def test_should_fail_if_http_error_not_handled(self):
+        expect(lambda: self.call("artist_songs", "-404-")).to(raise_error(CodeFurtherHTTPError))
+
+    def test_should_fail_if_connection_error_not_received(self):
+        server_url = self.server.url
+        self.server.stop()
+        self.server = StubServer().start()
+
+        async def read():
+            async with lyrics.AsyncLyrics(base_url=server_url) as lyrics_machine:
+                return await lyrics_machine.artist_songs("billy bragg")
+
+        expect(lambda: run(read())).to(raise_error(CodeFurtherConnectionError))
+
+    def test_should_fail_if_other_client_errors_are_not_converted(self):
+        async def read():
+            async with lyrics.AsyncLyrics(base_url="http:///lyricsapi/") as lyrics_machine:
+                return await lyrics_machine.artist_songs("billy bragg")
+
+        try:
+            run(read())
+        except Exception as e:
+            expect(e).to(be_a(CodeFurtherError))
+            expect(e.__cause__).not_to(be_none)
+        else:
+            raise AssertionError("No error was raised for an invalid url")
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2014 Danny Goodall
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import shutil
+import tempfile
+import unittest
+from codefurther.cache import DiskCache, LRUCache, TieredCache
+
+__author__ = 'User'
+
+from expects import *
+
+
+class TestLRUCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = LRUCache(max_size=10)
+
+    def test_should_fail_if_least_recently_used_value_is_not_evicted(self):
+        self.cache.set("a", "A", 4)
+        self.cache.set("b", "B", 4)
+        self.cache.get("a")
+        self.cache.set("c", "C", 4)
+
+        expect(self.cache.get("a")).to(equal("A"))
+        expect(self.cache.get("b")).to(be_none)
+        expect(self.cache.get("c")).to(equal("C"))
+        expect(self.cache.size).to(equal(8))
+        expect(self.cache.evictions).to(equal(1))
+
+    def test_should_fail_if_oversized_value_is_cached(self):
+        self.cache.set("a", "A", 4)
+        self.cache.set("big", "BIG", 11)
+
+        expect(self.cache.get("big")).to(be_none)
+        expect(self.cache.get("a")).to(equal("A"))
+
+    def test_should_fail_if_expired_value_is_returned(self):
+        self.cache.set("a", "A", 4, ttl=10, now=100)
+
+        expect(self.cache.get("a", now=109)).to(equal("A"))
+        expect(self.cache.get("a", now=110)).to(be_none)
+        expect(self.cache.size).to(equal(0))
+
+
+class TestTieredCache(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, "responses.sqlite")
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_should_fail_if_hits_and_misses_are_not_counted(self):
+        cache = TieredCache(max_size=1000)
+
+        expect(cache.get("a")).to(be_none)
+        cache.set("a", {"lyrics": ["line"]}, ttl=60)
+        expect(cache.get("a")).to(equal({"lyrics": ["line"]}))
+
+        stats = cache.stats()
+        expect((stats.hits, stats.memory_hits, stats.disk_hits, stats.misses)).to(equal((1, 1, 0, 1)))
+        expect(stats.size).to(equal(len('{"lyrics": ["line"]}')))
+
+    def test_should_fail_if_returned_values_are_shared_with_the_cache(self):
+        cache = TieredCache(max_size=1000)
+        cache.set("a", {"lyrics": ["line"]}, ttl=60)
+
+        first = cache.get("a")
+        first["lyrics"].append("changed")
+
+        expect(cache.get("a")).to(equal({"lyrics": ["line"]}))
+        expect(cache.get("a")).not_to(be(cache.get("a")))
+
+    def test_should_fail_if_disk_tier_does_not_outlive_memory_tier(self):
+        TieredCache(disk=self.path).set("a", {"songs": ["one"]}, ttl=60)
+
+        cache = TieredCache(disk=DiskCache(self.path))
+
+        expect(cache.get("a")).to(equal({"songs": ["one"]}))
+        expect(cache.get("a")).to(equal({"songs": ["one"]}))
+        expect((cache.stats().disk_hits, cache.stats().memory_hits)).to(equal((1, 1)))
+
+        cache.clear()
+        expect(TieredCache(disk=self.path).get("a")).to(be_none)
+
+    def test_should_fail_if_expired_value_is_read_from_disk(self):
+        cache = TieredCache(max_size=0, disk=self.path)
+        cache.set("a", {"artist": {}}, ttl=-1)
+
+        expect(cache.get("a")).to(be_none)
@@ -22,9 +22,19 @@ from future.standard_library import hooks
 with hooks():
     from urllib.parse import unquote
 
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
 import unittest
 from codefurther.helpers import FileSpoofer
-from codefurther.directions import GetDirections
+from codefurther.directions import GetDirections, RouteCache, RateLimiter, Step, directions_matrix
+from gmaps.errors import RateLimitExceeded
+from markupsafe import Markup
+from codefurther.directions import instructions
 
 from expects import *
 import types
@@ -80,3 +90,265 @@ class TestPatchedDirections(unittest.TestCase):
 
         # We should see at least 1 step
         expect(count).to(be_above(0))
+
+
+class TestStructuredSteps(unittest.TestCase):
+    def setUp(self):
+        self.file_spoofer = FileSpoofer(
+            "https://maps.googleapis.com/maps/api/directions",
+            "tests/resources/directions",
+            extension=".json"
+        )
+
+    def register(self):
+        httpretty.register_uri(
+            httpretty.GET,
+            "https://maps.googleapis.com/maps/api/directions/json",
+            body=self.file_spoofer.request_send_file,
+            content_type='text/json',
+            status=200
+        )
+
+    @httpretty.activate
+    def test_should_fail_if_structured_steps_are_not_measurements(self):
+        self.register()
+        directions = GetDirections("Eastleigh", "Winchester", "Walking")
+
+        steps = directions.structured_steps
+
+        expect(steps[0]).to(be_a(Step))
+        expect(steps[0].distance).to(be_an(int))
+        expect(steps[0].duration).to(be_an(int))
+        expect(steps[0].instruction).not_to(contain("<"))
+        expect(directions.structured_steps).to(be(steps))
+        expect(directions.distance).to(equal(19547))
+        expect(directions.duration).to(equal(14610))
+
+    @httpretty.activate
+    def test_should_fail_if_steps_are_formatted_before_they_are_needed(self):
+        self.register()
+        directions = GetDirections("Eastleigh", "Winchester", "Walking")
+
+        expect(directions.found).to(be(True))
+        expect(directions._steps).to(be_none)
+        expect(directions._structured_steps).to(be_none)
+
+        steps = list(directions.steps)
+
+        expect(steps[0]).to(equal("  1. {} ({} / {})".format(
+            directions.structured_steps[0].instruction,
+            directions.structured_steps[0].distance_text,
+            directions.structured_steps[0].duration_text
+        )))
+        expect(list(directions.steps)).to(equal(steps))
+
+    @httpretty.activate
+    def test_should_fail_if_formatted_steps_are_not_cached(self):
+        self.register()
+        routes = RouteCache()
+        steps = list(GetDirections("Eastleigh", "Winchester", route_cache=routes).steps)
+
+        directions = GetDirections("Eastleigh", "Winchester", route_cache=routes)
+
+        expect(directions._steps).to(equal(steps))
+
+    @httpretty.activate
+    def test_should_fail_if_reading_steps_extends_the_cached_route(self):
+        self.register()
+        routes = RouteCache(ttl=60)
+        key = RouteCache.key("Eastleigh", "Winchester", "walking")
+        directions_matrix(["Eastleigh"], ["Winchester"], route_cache=routes, render_steps=False)
+        expires_at = routes.cache.memory._entries[key].expires_at
+        time.sleep(0.01)
+
+        steps = list(GetDirections("Eastleigh", "Winchester", route_cache=routes).steps)
+        cell = directions_matrix(["Eastleigh"], ["Winchester"], route_cache=routes).cell("Eastleigh", "Winchester")
+
+        expect(steps).not_to(be_empty)
+        expect(cell.steps).to(equal(steps))
+        expect(routes.cache.memory._entries[key].expires_at).to(equal(expires_at))
+        expect(len(httpretty.latest_requests())).to(equal(1))
+
+    def test_should_fail_if_failed_journeys_have_steps(self):
+        directions = GetDirections("Eastleigh", "Winchester", "flying")
+
+        expect(list(directions.steps)).to(be_empty)
+        expect(directions.structured_steps).to(be_empty)
+        expect(directions.distance).to(be_none)
+        expect(directions.duration).to(be_none)
+
+
+def striptags_0_23(html):
+    """Markup(html).striptags() as markupsafe 0.23, the version in requirements.txt, implements it"""
+    return Markup(" ".join(re.sub(r'(<!--.*?-->|<[^>]*>)', '', html).split())).unescape()
+
+
+class TestStripInstruction(unittest.TestCase):
+    def test_should_fail_if_route_instructions_differ_from_markup(self):
+        with io.open("tests/resources/directions/json.json", encoding="utf-8") as route_file:
+            steps = json.load(route_file)['routes'][0]['legs'][0]['steps']
+
+        for step in steps:
+            expect(instructions.strip_instruction(step['html_instructions'])).to(
+                equal(striptags_0_23(step['html_instructions']))
+            )
+
+    def test_should_fail_if_awkward_markup_differs_from_markup(self):
+        for html in ["Main &raquo;\t<em>About</em>", "<!-- note --> Turn <b>left</b>", "a <!-- open <b>b</b>",
+                     "a\n<!--\n-->b", "a\n<!--\n> b -->", "a <b unclosed", "<!-->x", "x<>y", "&amp;lt; &#39;", "",
+                     "plain"]:
+            expect(instructions.strip_instruction(html)).to(equal(striptags_0_23(html)))
+
+    def test_should_fail_if_unclosed_comments_are_not_stripped_like_markupsafe_0_23(self):
+        expect(instructions.strip_instruction("a <!-- x <b>y</b>")).to(equal("a y"))
+
+    def test_should_fail_if_repeated_instructions_are_not_remembered(self):
+        html = "Turn <b>right</b> onto <b>Colebrook St</b>"
+        first = instructions.strip_instruction(html)
+
+        expect(instructions._memo[html]).to(equal("Turn right onto Colebrook St"))
+        expect(instructions.strip_instruction(html)).to(be(first))
+
+
+class TestRouteCache(unittest.TestCase):
+    def setUp(self):
+        self.file_spoofer = FileSpoofer(
+            "https://maps.googleapis.com/maps/api/directions",
+            "tests/resources/directions",
+            extension=".json"
+        )
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, "routes.sqlite")
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def register(self, status="OK"):
+        httpretty.register_uri(
+            httpretty.GET,
+            "https://maps.googleapis.com/maps/api/directions/json",
+            body=self.file_spoofer.request_send_file if status == "OK" else '{{"status": "{}"}}'.format(status),
+            content_type='text/json',
+            status=200
+        )
+
+    def test_should_fail_if_keys_are_not_normalised(self):
+        expect(RouteCache.key("Eastleigh,  UK", " WINCHESTER", "Walking")).to(
+            equal(RouteCache.key("eastleigh, uk", "winchester", "walking"))
+        )
+        expect(RouteCache.key("Eastleigh", "Winchester", "walking")).not_to(
+            equal(RouteCache.key("Eastleigh", "Winchester", "driving"))
+        )
+
+    @httpretty.activate
+    def test_should_fail_if_repeat_journeys_contact_google(self):
+        self.register()
+        routes = RouteCache()
+
+        first = GetDirections("Eastleigh", "Winchester", "Walking", route_cache=routes)
+        second = GetDirections("eastleigh", "WINCHESTER", "walking", route_cache=routes)
+        first.new_journey("Eastleigh ", "Winchester")
+
+        expect(len(httpretty.latest_requests())).to(equal(1))
+        expect(second.found).to(be(True))
+        expect(list(second.steps)).to(equal(list(first.steps)))
+        expect(second.footer).to(equal(first.footer))
+        expect(second.heading).to(contain("(walking) journey from Southampton, Southampton, UK"))
+        expect(second.raw).to(equal(first.raw))
+        expect(second.raw).not_to(be(first.raw))
+        expect(routes.stats().hits).to(equal(2))
+
+    @httpretty.activate
+    def test_should_fail_if_failures_are_cached(self):
+        self.register("OVER_QUERY_LIMIT")
+        routes = RouteCache()
+
+        directions = GetDirections("Eastleigh", "Winchester", route_cache=routes)
+        directions.new_journey("Eastleigh", "Winchester")
+
+        expect(directions.found).to(be(False))
+        expect(len(httpretty.latest_requests())).to(equal(2))
+
+    @httpretty.activate
+    def test_should_fail_if_routes_are_not_kept_on_disk(self):
+        self.register()
+        GetDirections("Eastleigh", "Winchester", route_cache=RouteCache(disk=self.path))
+
+        directions = GetDirections("Eastleigh", "Winchester", route_cache=RouteCache(disk=self.path))
+
+        expect(len(httpretty.latest_requests())).to(equal(1))
+        expect(directions.found).to(be(True))
+        expect(list(directions.steps)).not_to(be_empty)
+
+
+class TestDirectionsMatrix(unittest.TestCase):
+    def setUp(self):
+        self.file_spoofer = FileSpoofer(
+            "https://maps.googleapis.com/maps/api/directions",
+            "tests/resources/directions",
+            extension=".json"
+        )
+        self.route = self.file_spoofer.get_file_contents_as_text("json")
+
+    def register(self, *bodies):
+        httpretty.register_uri(
+            httpretty.GET,
+            "https://maps.googleapis.com/maps/api/directions/json",
+            responses=[httpretty.Response(body=body, content_type='text/json', status=200) for body in bodies]
+        )
+
+    @httpretty.activate
+    def test_should_fail_if_every_cell_is_not_found(self):
+        self.register(self.route)
+
+        matrix = directions_matrix(["Eastleigh", "Romsey"], ["Winchester", "Andover", "Alton"],
+                                   modes=["walking", "driving"], max_workers=3)
+
+        expect(len(matrix)).to(equal(12))
+        expect(len(list(matrix))).to(equal(12))
+        expect(len(httpretty.latest_requests())).to(equal(12))
+        expect(matrix.failures).to(be_empty)
+        cell = matrix.cell("Romsey", "Alton", "driving")
+        expect((cell.origin, cell.destination, cell.mode)).to(equal(("Romsey", "Alton", "driving")))
+        expect((cell.distance, cell.duration)).to(equal((19547, 14610)))
+        expect(cell.steps[0]).to(be_a(string_types))
+        expect(len(matrix.rows("walking"))).to(equal(2))
+
+    @httpretty.activate
+    def test_should_fail_if_rate_limited_cells_are_not_retried(self):
+        self.register('{"status": "OVER_QUERY_LIMIT"}', '{"status": "OVER_QUERY_LIMIT"}', self.route)
+
+        started = time.time()
+        matrix = directions_matrix(["Eastleigh"], ["Winchester"], max_workers=1, backoff=0.05)
+
+        expect(matrix.cell("Eastleigh", "Winchester").found).to(be(True))
+        expect(len(httpretty.latest_requests())).to(equal(3))
+        expect(time.time() - started).to(be_above(0.14))
+
+    @httpretty.activate
+    def test_should_fail_if_failures_are_not_reported_per_cell(self):
+        self.register('{"status": "OVER_QUERY_LIMIT"}', '{"status": "NOT_FOUND"}', self.route)
+
+        matrix = directions_matrix(["Eastleigh"], ["Winchester"], modes=["walking", "flying"], max_workers=1,
+                                   retries=0, backoff=0)
+
+        expect(matrix.cell("Eastleigh", "Winchester", "walking").error).to(be_a(RateLimitExceeded))
+        expect(matrix.cell("Eastleigh", "Winchester", "flying").error).to(be_a(ValueError))
+        expect(len(matrix.failures)).to(equal(2))
+
+    @httpretty.activate
+    def test_should_fail_if_steps_are_formatted_for_totals_only(self):
+        self.register(self.route)
+
+        cell = directions_matrix(["Eastleigh"], ["Winchester"], render_steps=False).cell("Eastleigh", "Winchester")
+
+        expect((cell.found, cell.distance, cell.steps)).to(equal((True, 19547, None)))
+
+    def test_should_fail_if_requests_are_not_paced(self):
+        limiter = RateLimiter(rate=20, burst=2)
+
+        started = time.time()
+        for _ in range(6):
+            limiter.acquire()
+
+        expect(time.time() - started).to(be_above(0.18))
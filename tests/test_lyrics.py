@@ -15,8 +15,14 @@
 # limitations under the License.
 from codefurther.errors import CodeFurtherHTTPError, CodeFurtherConnectionError
 from six import string_types, PY2, PY3
+from collections import namedtuple
+import os
+import shutil
+import tempfile
+import threading
+import time
 import unittest
-from codefurther.helpers import FileSpoofer
+from codefurther.helpers import FileSpoofer, StubServer
 
 __author__ = 'User'
 
@@ -234,6 +240,29 @@ class TestPatchedLyrics(unittest.TestCase):
         expect(callback).to(raise_error(CodeFurtherHTTPError))
 
 
+    @httpretty.activate
+    def test_should_fail_if_instance_cache_is_not_used(self):
+        httpretty.register_uri(
+            httpretty.GET,
+            "http://cflyricsserver.herokuapp.com/lyricsapi/songs/billy bragg",
+            body=self.file_spoofer.request_send_file,
+            content_type='text/json',
+            status=200
+        )
+
+        folder = tempfile.mkdtemp()
+        try:
+            path = os.path.join(folder, "lyrics.sqlite")
+            lyrics.Lyrics(disk_cache=path).artist_songs("billy bragg")
+            lyrics.Lyrics(disk_cache=path).artist_songs("billy bragg")
+            expect(len(httpretty.latest_requests())).to(equal(1))
+
+            #: An instance without the disk cache still goes to the server
+            self.lyrics_machine.artist_songs("billy bragg")
+            expect(len(httpretty.latest_requests())).to(equal(2))
+        finally:
+            shutil.rmtree(folder)
+
     def test_should_fail_if_connection_error_not_received(self):
 
         def callback():
@@ -246,3 +275,396 @@ class TestPatchedLyrics(unittest.TestCase):
         else:
             expect(callback).to(raise_error(CodeFurtherHTTPError))
 
+
+
+class TestLyricsBatch(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer("/lyricsapi", "tests/resources/lyricsapi").start()
+        self.lyrics_machine = lyrics.Lyrics(base_url=self.server.url)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_should_fail_if_results_are_not_returned_in_order_with_errors(self):
+        songs = [
+            ("billy bragg", "days like these"),
+            ("billy bragg", "malformed"),
+            ("billy bragg", "-404-"),
+            ("", "")
+        ]
+
+        results = list(self.lyrics_machine.song_lyrics_many(songs, max_workers=2))
+
+        expect([(result.artist, result.title) for result in results]).to(equal(songs))
+        expect(results[0].lyrics).to(be_a(list))
+        expect(results[0].error).to(be_none)
+        expect(results[1].error).to(be_a(ValueError))
+        expect(results[2].error).to(be_a(CodeFurtherHTTPError))
+        expect(results[3].error).to(be_a(ValueError))
+
+    def test_should_fail_if_songs_are_not_read_concurrently(self):
+        self.server.delay = 0.2
+        songs = [("billy bragg", "days like these")] * 4
+
+        started = time.time()
+        results = list(self.lyrics_machine.song_lyrics_many(songs, max_workers=4, ordered=False))
+
+        expect(len(results)).to(equal(4))
+        expect(all(result.error is None for result in results)).to(be(True))
+        expect(time.time() - started).to(be_below(0.6))
+
+    def test_should_fail_if_concurrent_identical_requests_are_not_coalesced(self):
+        self.server.delay = 0.2
+        results = []
+
+        def read(title):
+            try:
+                results.append(self.lyrics_machine.song_lyrics("billy bragg", title))
+            except CodeFurtherHTTPError as e:
+                results.append(e)
+
+        threads = [threading.Thread(target=read, args=(title,)) for title in ["days like these"] * 4 + ["-404-"] * 4]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        expect(len(self.server.requests_seen)).to(equal(2))
+        expect(len([result for result in results if isinstance(result, list)])).to(equal(4))
+        expect(len([result for result in results if isinstance(result, CodeFurtherHTTPError)])).to(equal(4))
+
+    def test_should_fail_if_max_workers_is_not_checked(self):
+        def callback():
+            return list(self.lyrics_machine.song_lyrics_many([("billy bragg", "days like these")], max_workers=0))
+
+        expect(callback).to(raise_error(ValueError))
+
+
+class TestPrefetchChartLyrics(unittest.TestCase):
+    Entry = namedtuple('Entry', ['artist', 'title'])
+
+    def setUp(self):
+        self.server = StubServer("/lyricsapi", "tests/resources/lyricsapi").start()
+        self.lyrics_machine = lyrics.Lyrics(base_url=self.server.url)
+        self.entries = [
+            self.Entry("Billy Bragg", "Days Like These"),
+            self.Entry("billy bragg", "days like these"),
+            self.Entry("BILLY BRAGG", "-404-"),
+        ]
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_should_fail_if_artists_and_songs_are_not_read_once(self):
+        progress = []
+        report = self.lyrics_machine.prefetch_chart_lyrics(
+            self.entries, max_workers=2, progress=lambda done, total, result: progress.append((done, total))
+        )
+
+        expect(report.artists).to(equal(1))
+        expect(report.songs).to(equal(2))
+        expect(len(self.server.requests_seen)).to(equal(3))
+        expect(progress).to(equal([(1, 3), (2, 3), (3, 3)]))
+        expect(len(report.failures)).to(equal(1))
+        expect(report.failures[0].title).to(equal("-404-"))
+        expect(report.failures[0].error).to(be_a(CodeFurtherHTTPError))
+
+    def test_should_fail_if_prefetched_lyrics_are_not_cached(self):
+        self.lyrics_machine.prefetch_chart_lyrics(self.entries[:1], discographies=False)
+        seen = len(self.server.requests_seen)
+
+        self.lyrics_machine.song_lyrics("Billy Bragg", "Days Like These")
+
+        expect(seen).to(equal(1))
+        expect(len(self.server.requests_seen)).to(equal(1))
+
+    def test_should_fail_if_max_workers_is_not_checked(self):
+        expect(lambda: self.lyrics_machine.prefetch_chart_lyrics(self.entries, max_workers=0)).to(
+            raise_error(ValueError)
+        )
+
+
+class TestLyricsCache(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer("/lyricsapi", "tests/resources/lyricsapi").start()
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.folder)
+
+    def test_should_fail_if_responses_are_not_cached_in_memory(self):
+        lyrics_machine = lyrics.Lyrics(base_url=self.server.url)
+
+        first = lyrics_machine.song_lyrics("billy bragg", "days like these")
+        second = lyrics_machine.song_lyrics("billy bragg", "days like these")
+        lyrics_machine.artist_songs("billy bragg")
+
+        expect(second).to(equal(first))
+        expect(len(self.server.requests_seen)).to(equal(2))
+        stats = lyrics_machine.response_cache.stats()
+        expect((stats.hits, stats.misses)).to(equal((1, 2)))
+
+        lyrics_machine.reset_cache()
+        lyrics_machine.song_lyrics("billy bragg", "days like these")
+        expect(len(self.server.requests_seen)).to(equal(3))
+
+    def test_should_fail_if_cached_results_change_with_the_returned_ones(self):
+        lyrics_machine = lyrics.Lyrics(base_url=self.server.url)
+
+        first = lyrics_machine.song_lyrics("billy bragg", "days like these")
+        expected = list(first)
+        del first[:]
+        songs = lyrics_machine.artist_songs("billy bragg")
+        songs.append("X")
+
+        expect(lyrics_machine.song_lyrics("billy bragg", "days like these")).to(equal(expected))
+        expect(lyrics_machine.artist_songs("billy bragg")).not_to(contain("X"))
+        expect(len(self.server.requests_seen)).to(equal(2))
+
+    def test_should_fail_if_responses_are_not_cached_on_disk(self):
+        path = os.path.join(self.folder, "lyrics.sqlite")
+
+        lyrics.Lyrics(base_url=self.server.url, disk_cache=path).artist_songs("billy bragg")
+        lyrics_machine = lyrics.Lyrics(base_url=self.server.url, disk_cache=path)
+        lyrics_machine.artist_songs("billy bragg")
+
+        expect(len(self.server.requests_seen)).to(equal(1))
+        expect(lyrics_machine.response_cache.stats().disk_hits).to(equal(1))
+
+    def test_should_fail_if_endpoint_ttls_are_not_used(self):
+        lyrics_machine = lyrics.Lyrics(base_url=self.server.url, cache_ttls={'search/': None})
+
+        lyrics_machine.artist_search("billy bragg")
+        lyrics_machine.artist_search("billy bragg")
+
+        expect(len(self.server.requests_seen)).to(equal(2))
+        expect(lyrics_machine.cache_ttls['lyrics/']).to(equal(lyrics.Lyrics.cache_ttls['lyrics/']))
+        expect(lyrics_machine._cache_ttl("songs/billy bragg")).to(equal(24 * 60 * 60))
+
+    def test_should_fail_if_memory_cache_size_is_not_bounded(self):
+        lyrics_machine = lyrics.Lyrics(base_url=self.server.url, memory_cache_size=0)
+
+        lyrics_machine.artist_songs("billy bragg")
+        lyrics_machine.artist_songs("billy bragg")
+
+        expect(len(self.server.requests_seen)).to(equal(2))
+        expect(lyrics_machine.response_cache.stats().size).to(equal(0))
+
+    def test_should_fail_if_not_found_responses_are_not_remembered(self):
+        lyrics_machine = lyrics.Lyrics(base_url=self.server.url)
+
+        for _ in range(3):
+            expect(lambda: lyrics_machine.song_lyrics("billy bragg", "unknown song")).to(
+                raise_error(CodeFurtherHTTPError)
+            )
+            expect(lambda: lyrics_machine.artist_songs("bily brag")).to(raise_error(CodeFurtherHTTPError))
+
+        expect(len(self.server.requests_seen)).to(equal(2))
+
+        try:
+            lyrics_machine.artist_songs("bily brag")
+        except CodeFurtherHTTPError as e:
+            expect(e.error_code).to(equal(404))
+            expect(e.message).to(contain("songs/bily brag"))
+
+        lyrics_machine.reset_cache()
+        expect(lambda: lyrics_machine.artist_songs("bily brag")).to(raise_error(CodeFurtherHTTPError))
+        expect(len(self.server.requests_seen)).to(equal(3))
+
+    def test_should_fail_if_not_found_responses_are_remembered_when_turned_off(self):
+        lyrics_machine = lyrics.Lyrics(base_url=self.server.url, negative_cache_ttl=None)
+
+        for _ in range(2):
+            expect(lambda: lyrics_machine.artist_songs("bily brag")).to(raise_error(CodeFurtherHTTPError))
+
+        expect(len(self.server.requests_seen)).to(equal(2))
+
+    def test_should_fail_if_unknown_artists_are_not_remembered(self):
+        lyrics_machine = lyrics.Lyrics(base_url=self.server.url)
+        searches = []
+
+        def artist_search(artist):
+            searches.append(artist)
+            return "Billy Bragg:Days Like These"
+
+        lyrics_machine.artist_search = artist_search
+
+        expect(lyrics_machine.artist_exists("billy bragg")).to(be(False))
+        expect(lyrics_machine.artist_exists("billy bragg")).to(be(False))
+        expect(searches).to(equal(["billy bragg"]))
+
+
+class TestLyricsStream(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer("/lyricsapi", "tests/resources/lyricsapi").start()
+        self.lyrics_machine = lyrics.Lyrics(base_url=self.server.url)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_should_fail_if_streamed_lines_differ_from_song_lyrics(self):
+        streamed = list(self.lyrics_machine.song_lyrics_iter("billy bragg", "days like these", chunk_size=16))
+
+        expect(streamed).to(equal(lyrics.Lyrics(base_url=self.server.url).song_lyrics("billy bragg", "days like these")))
+
+    def test_should_fail_if_cached_song_is_not_streamed_from_the_cache(self):
+        song = self.lyrics_machine.song_lyrics("billy bragg", "days like these")
+
+        expect(list(self.lyrics_machine.song_lyrics_iter("billy bragg", "days like these"))).to(equal(song))
+        expect(len(self.server.requests_seen)).to(equal(1))
+
+    def test_should_fail_if_errors_are_not_raised(self):
+        expect(lambda: self.lyrics_machine.song_lyrics_iter("", "days like these")).to(raise_error(ValueError))
+        expect(lambda: list(self.lyrics_machine.song_lyrics_iter("billy bragg", "malformed"))).to(
+            raise_error(ValueError)
+        )
+        expect(lambda: list(self.lyrics_machine.song_lyrics_iter("billy bragg", "unknown"))).to(
+            raise_error(CodeFurtherHTTPError)
+        )
+
+
+class TestLyricsIndex(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.index = lyrics.LyricsIndex()
+        self.index.add_song("Billy Bragg", "Days Like These", [
+            "The party that became so powerful",
+            "Because promises win votes",
+            "Because promises win votes, promises win votes"
+        ])
+        self.index.add_song("Billy Bragg", "A New England", ["I don't want to change the world", "Promises, promises"])
+        self.index.add_song("Kirsty MacColl", "A New England", ["I don't want to change the world"])
+        self.index.add_titles("Billy Bragg", ["Levi Stubbs' Tears", "A New England"])
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def check_index(self, index):
+        results = index.search("PROMISES win")
+
+        expect([(result.artist, result.title) for result in results]).to(equal([("Billy Bragg", "Days Like These")]))
+        expect(results[0].line).to(equal("Because promises win votes"))
+        expect(index.search("win promises")).to(equal([]))
+        expect(index.search("nobody knows")).to(equal([]))
+        expect([result.artist for result in index.search("change the world")]).to(
+            equal(["Kirsty MacColl", "Billy Bragg"])
+        )
+        expect(index.artists("b")).to(equal(["Billy Bragg"]))
+        expect(index.artists("")).to(equal(["Billy Bragg", "Kirsty MacColl"]))
+        expect(index.titles("a new", artist="billy bragg")).to(equal([("Billy Bragg", "A New England")]))
+        expect(index.titles("levi")).to(equal([("Billy Bragg", "Levi Stubbs' Tears")]))
+        expect(index.lyrics("billy bragg", "levi stubbs' tears")).to(be_none)
+        expect(index.lyrics("billy bragg", "a new england")).to(equal(["I don't want to change the world",
+                                                                      "Promises, promises"]))
+
+    def test_should_fail_if_in_memory_index_searches_are_wrong(self):
+        expect(self.index.add_song("billy bragg", "days like these", ["other"])).to(be(False))
+        self.check_index(self.index)
+
+    def test_should_fail_if_saved_index_searches_are_wrong(self):
+        path = os.path.join(self.folder, "lyrics.index")
+        self.index.save(path)
+
+        with lyrics.LyricsIndex.load(path) as mapped_index:
+            expect(mapped_index).to(be_a(lyrics.MappedLyricsIndex))
+            expect(len(mapped_index)).to(equal(len(self.index)))
+            self.check_index(mapped_index)
+
+    def test_should_fail_if_names_added_while_listing_are_lost(self):
+        def add():
+            for count in range(500):
+                self.index.add_titles("Artist {:03}".format(count), ["Song {:03}".format(count)])
+
+        adder = threading.Thread(target=add)
+        adder.start()
+        while adder.is_alive():
+            self.index.artists("artist")
+            self.index.titles("song")
+        adder.join()
+
+        expect(len(self.index.artists("artist"))).to(equal(500))
+        expect(len(self.index.titles("song"))).to(equal(500))
+
+    def test_should_fail_if_other_files_are_loaded(self):
+        path = os.path.join(self.folder, "other")
+        with open(path, "w") as other_file:
+            other_file.write("not an index at all")
+
+        expect(lambda: lyrics.LyricsIndex.load(path)).to(raise_error(ValueError))
+
+    def test_should_fail_if_lyrics_read_are_not_indexed(self):
+        server = StubServer("/lyricsapi", "tests/resources/lyricsapi").start()
+        try:
+            index = lyrics.LyricsIndex()
+            lyrics_machine = lyrics.Lyrics(base_url=server.url, index=index)
+            lyrics_machine.song_lyrics("billy bragg", "days like these")
+            lyrics_machine.artist_songs("billy bragg")
+        finally:
+            server.stop()
+
+        expect(index.search("promises win votes")[0].title).to(equal("days like these"))
+        expect(index.titles("a new england")).to(equal([("billy bragg", "A New England")]))
+
+
+class TestArtistMatcher(unittest.TestCase):
+    def setUp(self):
+        self.matcher = lyrics.ArtistMatcher(names=["Billy Bragg", "Ed Sheeran", "Florence & The Machine"])
+        self.server = StubServer("/lyricsapi", "tests/resources/lyricsapi").start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_should_fail_if_misspelt_names_are_not_matched(self):
+        expect(self.matcher.match("bily brag").name).to(equal("Billy Bragg"))
+        expect(self.matcher.match("ed sheran").name).to(equal("Ed Sheeran"))
+        expect(self.matcher.confident_match("florence and the machine")).to(equal("Florence & The Machine"))
+        expect(self.matcher.match("BILLY  BRAGG!")).to(equal(lyrics.ArtistMatch("Billy Bragg", 1.0)))
+
+    def test_should_fail_if_unlike_names_are_confident_matches(self):
+        expect(self.matcher.match("xyz")).to(be_none)
+        expect(self.matcher.confident_match("Billy Ocean")).to(be_none)
+        expect(len(self.matcher)).to(equal(3))
+        expect("billy bragg" in self.matcher).to(be_true)
+
+    def test_should_fail_if_confident_matches_contact_the_server(self):
+        lyrics_machine = lyrics.Lyrics(base_url=self.server.url, artist_matcher=self.matcher)
+
+        expect(lyrics_machine.artist_exists("BILLY BRAGG")).to(be_true)
+        expect(lyrics_machine.canonical_artist("ed sheran")).to(equal("Ed Sheeran"))
+        expect(self.server.requests_seen).to(be_empty)
+
+    def test_should_fail_if_near_miss_names_do_not_contact_the_server(self):
+        matcher = lyrics.ArtistMatcher(names=["The Killers", "Billy Bragg"])
+        lyrics_machine = lyrics.Lyrics(base_url=self.server.url, artist_matcher=matcher)
+
+        expect(matcher.confident_match("The Kills")).to(equal("The Killers"))
+        expect(lambda: lyrics_machine.artist_exists("The Kills")).to(raise_error(CodeFurtherHTTPError))
+        expect(lambda: lyrics_machine.artist_exists("bily brag")).to(raise_error(CodeFurtherHTTPError))
+        expect(lambda: lyrics_machine.artist_exists("Billy Bragg!")).to(raise_error(CodeFurtherHTTPError))
+        expect(len(self.server.requests_seen)).to(equal(3))
+
+    def test_should_fail_if_membership_ignores_punctuation(self):
+        matcher = lyrics.ArtistMatcher(names=["Simon & Garfunkel"])
+
+        expect("simon & garfunkel" in matcher).to(be_true)
+        expect("Simon and Garfunkel" in matcher).to(be_false)
+        expect(matcher.confident_match("Simon and Garfunkel")).to(equal("Simon & Garfunkel"))
+
+    def test_should_fail_if_typed_spellings_are_added_to_the_matcher(self):
+        matcher = lyrics.ArtistMatcher()
+        lyrics_machine = lyrics.Lyrics(base_url=self.server.url, artist_matcher=matcher)
+
+        lyrics_machine.artist_songs("billy bragg")
+
+        expect(len(matcher)).to(equal(0))
+        expect(lyrics_machine.canonical_artist("billy bragg")).to(equal("Billy Bragg"))
+        expect(matcher.confident_match("bily brag")).to(equal("Billy Bragg"))
+
+    def test_should_fail_if_found_artists_are_not_added_to_the_matcher(self):
+        matcher = lyrics.ArtistMatcher()
+        lyrics_machine = lyrics.Lyrics(base_url=self.server.url, artist_matcher=matcher)
+
+        expect(lyrics_machine.artist_exists("billy bragg")).to(be_true)
+        expect(matcher.confident_match("bily brag")).to(equal("Billy Bragg"))
+        expect(lyrics_machine.canonical_artist("bily brag")).to(equal("Billy Bragg"))
@@ -14,19 +14,31 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import datetime
+import json
 import os
+import shutil
+import tempfile
+import threading
+import time
 import unittest
 from codefurther.errors import CodeFurtherHTTPError
+from codefurther.helpers import StubServer
 from codefurther.utils import request_send_file
 
 __author__ = 'User'
 
 from expects import *
 import requests
-import requests_cache
+from requests_cache.backends import FileCache, SQLiteCache
 import httpretty
 from codefurther import top40
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 
 class TestPatchedRequestsCached(unittest.TestCase):
 
@@ -35,10 +47,10 @@ class TestPatchedRequestsCached(unittest.TestCase):
 
         #: Clear the cache, otherwise if a Python 2 test is run after a Python 3 test, then
         #: incorrect pickle format errors can occur
-        requests_cache.clear()
+        self.top40._session.cache.clear()
 
     def tearDown(self):
-        requests_cache.clear()
+        self.top40._session.cache.clear()
 
     @httpretty.activate
     def test_should_fail_if_second_get_is_not_cached(self):
@@ -50,8 +62,8 @@ class TestPatchedRequestsCached(unittest.TestCase):
             status=200
         )
 
-        response = requests.get("http://ben-major.co.uk/labs/top40/api/albums")
-        response = requests.get("http://ben-major.co.uk/labs/top40/api/albums")
+        response = self.top40._session.get("http://ben-major.co.uk/labs/top40/api/albums")
+        response = self.top40._session.get("http://ben-major.co.uk/labs/top40/api/albums")
 
         expect(response).to(have_property("from_cache"))
         expect(response.from_cache).to(be(True))
@@ -66,14 +78,11 @@ class TestPatchedRequestsCached(unittest.TestCase):
             status=200
         )
 
-        #: Clear the cache, so that no cached reads are present
-        requests_cache.clear()
-
         #: Turn the cache off
         self.top40.reset_cache(None)
 
         #: Make a request, but this should not find its way into the cache
-        response = requests.get("http://ben-major.co.uk/labs/top40/api/albums")
+        response = self.top40._session.get("http://ben-major.co.uk/labs/top40/api/albums")
 
         expect(response).to(not_(have_property("from_cache")))
 
@@ -81,17 +90,58 @@ class TestPatchedRequestsCached(unittest.TestCase):
         self.top40.reset_cache(3600)
 
         #: Prime the cache
-        response = requests.get("http://ben-major.co.uk/labs/top40/api/albums")
+        response = self.top40._session.get("http://ben-major.co.uk/labs/top40/api/albums")
 
         #: The first read should not have come from the cache
         expect(response.from_cache).to(be(False))
 
         #: This time it should be from the cache
-        response = requests.get("http://ben-major.co.uk/labs/top40/api/albums")
+        response = self.top40._session.get("http://ben-major.co.uk/labs/top40/api/albums")
 
         expect(response).to(have_property("from_cache"))
         expect(response.from_cache).to(be(True))
 
+    @httpretty.activate
+    def test_should_fail_if_cache_is_shared_with_the_rest_of_the_program(self):
+        httpretty.register_uri(
+            httpretty.GET,
+            "http://ben-major.co.uk/labs/top40/api/albums",
+            body=request_send_file,
+            content_type='text/json',
+            status=200
+        )
+
+        self.top40._get_data('/albums')
+
+        #: Neither requests itself nor another instance should see this instance's cache
+        response = requests.get("http://ben-major.co.uk/labs/top40/api/albums")
+        expect(response).to(not_(have_property("from_cache")))
+
+        other = top40.Top40(cache_duration=60, cache_backend="memory")
+        response = other._session.get("http://ben-major.co.uk/labs/top40/api/albums")
+        expect(response.from_cache).to(be(False))
+
+        #: Turning the other instance's cache off leaves ours in place
+        other.reset_cache(None)
+        response = self.top40._session.get("http://ben-major.co.uk/labs/top40/api/albums")
+        expect(response.from_cache).to(be(True))
+
+    def test_should_fail_if_cache_backend_is_not_selectable(self):
+        cache_folder = tempfile.mkdtemp()
+        filesystem_top40 = top40.Top40(
+            cache_config={'cache_name': cache_folder},
+            cache_backend="filesystem"
+        )
+        memory_top40 = top40.Top40(cache_duration=60, cache_backend="memory")
+
+        expect(filesystem_top40._session.cache).to(be_a(FileCache))
+        expect(memory_top40._session.cache).not_to(be_a(SQLiteCache))
+        expect(memory_top40._session.cache).not_to(be_a(FileCache))
+        expect(self.top40._session.cache).to(be_a(SQLiteCache))
+        expect(memory_top40._session.expire_after).to(equal(60))
+
+        shutil.rmtree(cache_folder)
+
 
 class TestPatchedRequestsNoCache(unittest.TestCase):
 
@@ -224,6 +274,335 @@ class TestPatchedRequestsNoCache(unittest.TestCase):
         expect(singles_chart.entries[0].change.actual).to(equal(-1))
 
 
+class TestChartExpiry(unittest.TestCase):
+
+    def setUp(self):
+        self.chart = top40.Chart(date=1416700800, retrieved=1417260657, entries=[])
+        self.policy = top40.ChartExpiryPolicy(publication_interval=7 * 24 * 60 * 60, retry_interval=600)
+
+    def register_albums(self):
+        httpretty.register_uri(
+            httpretty.GET,
+            "http://ben-major.co.uk/labs/top40/api/albums",
+            body=request_send_file,
+            content_type='text/json'
+        )
+
+    def test_should_fail_if_chart_does_not_expire_at_next_publication(self):
+        next_publication = 1416700800 + 7 * 24 * 60 * 60
+
+        expect(self.policy.next_publication(self.chart)).to(equal(next_publication))
+        expect(self.policy.expires_at(self.chart, now=1416700800 + 60)).to(equal(next_publication))
+
+    def test_should_fail_if_overdue_chart_is_not_retried(self):
+        now = 1416700800 + 8 * 24 * 60 * 60
+
+        expect(self.policy.expires_at(self.chart, now=now)).to(equal(now + 600))
+
+    def test_should_fail_if_chart_that_is_not_current_is_kept(self):
+        self.chart.current = False
+
+        expect(self.policy.expires_at(self.chart, now=1416700800 + 60)).to(equal(1416700800 + 60 + 600))
+
+    @httpretty.activate
+    def test_should_fail_if_chart_is_read_again_before_it_expires(self):
+        self.register_albums()
+        policy = top40.ChartExpiryPolicy(publication_interval=100 * 365 * 24 * 60 * 60)
+        chart_top40 = top40.Top40(cache_duration=None, expiry_policy=policy)
+
+        chart_top40.albums
+        chart_top40.albums
+
+        expect(len(httpretty.latest_requests())).to(equal(1))
+
+    @httpretty.activate
+    def test_should_fail_if_overdue_chart_is_not_read_again(self):
+        self.register_albums()
+        policy = top40.ChartExpiryPolicy(retry_interval=0)
+        chart_top40 = top40.Top40(cache_duration=None, expiry_policy=policy)
+
+        chart_top40.albums
+        chart_top40.albums
+
+        expect(len(httpretty.latest_requests())).to(equal(2))
+
+    @httpretty.activate
+    def test_should_fail_if_persistent_cache_does_not_use_policy_expiry(self):
+        self.register_albums()
+        chart_top40 = top40.Top40(cache_duration=3600, cache_backend="memory", expiry_policy=self.policy)
+
+        before = datetime.datetime.utcnow()
+        chart_top40.albums
+        cached_response = list(chart_top40._session.cache.responses.values())[0]
+
+        #: The test chart is long overdue, so it should only be kept for the retry interval
+        expect(cached_response.expires).to(be_below(before + datetime.timedelta(seconds=660)))
+        expect(cached_response.expires).to(be_above(before + datetime.timedelta(seconds=540)))
+
+
+class TestStaleWhileRevalidate(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StubServer("/labs/top40/api", "tests/resources").start()
+        self.top40 = top40.Top40(
+            base_url=self.server.url,
+            cache_duration=None,
+            expiry_policy=top40.ChartExpiryPolicy(retry_interval=0),
+            stale_while_revalidate=True
+        )
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_should_fail_if_stale_chart_is_not_returned_straight_away(self):
+        first_chart = self.top40.albums_chart
+        self.server.delay = 0.5
+
+        started = time.time()
+        stale_charts = [self.top40.albums_chart for _ in range(5)]
+        elapsed = time.time() - started
+        refresh = self.top40._refreshing["/albums"]
+
+        expect(elapsed).to(be_below(0.3))
+        expect(all(chart is first_chart for chart in stale_charts)).to(be(True))
+
+        refresh.join()
+
+        #: The five stale reads should have been collapsed into one refresh
+        expect(len(self.server.requests_seen)).to(equal(2))
+        expect(self.top40._charts["/albums"].chart).not_to(be(first_chart))
+
+    def test_should_fail_if_failed_refresh_does_not_keep_stale_chart(self):
+        first_chart = self.top40.singles_chart
+        self.top40.base_url = self.server.url + "-404-/"
+
+        self.top40.singles_chart
+        self.top40._refreshing["/singles"].join()
+
+        expect(self.top40.singles_chart).to(be(first_chart))
+
+    def test_should_fail_if_chart_age_is_not_reported(self):
+        expect(self.top40.albums_chart_age).to(be_none)
+
+        self.top40.albums_chart
+
+        expect(self.top40.albums_chart_age).to(be_above_or_equal(0))
+        expect(self.top40.albums_chart_age).to(be_below(5))
+
+
+class TestThreadSafety(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StubServer("/labs/top40/api", "tests/resources", delay=0.05).start()
+        self.top40 = top40.Top40(base_url=self.server.url, cache_duration=None)
+        self.errors = []
+
+    def tearDown(self):
+        self.server.stop()
+
+    def hammer(self, worker, count=20):
+        started = threading.Event()
+
+        def run():
+            started.wait()
+            try:
+                worker()
+            except Exception as e:
+                self.errors.append(e)
+
+        threads = [threading.Thread(target=run) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        started.set()
+        for thread in threads:
+            thread.join()
+
+    def test_should_fail_if_shared_instance_reads_charts_more_than_once(self):
+        albums_charts = []
+        singles_charts = []
+
+        def worker():
+            for _ in range(50):
+                albums_charts.append(self.top40.albums_chart)
+                singles_charts.append(self.top40.singles_chart)
+                expect(self.top40.albums).to(be_a(list))
+                expect(self.top40.singles).to(be_a(list))
+
+        self.hammer(worker)
+
+        expect(self.errors).to(equal([]))
+        expect(sorted(self.server.requests_seen)).to(equal(["/labs/top40/api/albums", "/labs/top40/api/singles"]))
+        expect(all(chart is albums_charts[0] for chart in albums_charts)).to(be(True))
+        expect(all(chart is singles_charts[0] for chart in singles_charts)).to(be(True))
+
+    def test_should_fail_if_cache_reset_races_with_reads(self):
+        def worker():
+            for count in range(20):
+                if count % 5 == 0:
+                    self.top40.reset_cache(None if count % 10 else 60)
+                expect(self.top40.albums_chart).to(be_a(top40.Chart))
+                expect(self.top40.singles).to(be_a(list))
+
+        self.hammer(worker, count=10)
+
+        expect(self.errors).to(equal([]))
+
+
+class TestCompactChart(unittest.TestCase):
+
+    def setUp(self):
+        with open("tests/resources/albums.json") as albums_file:
+            self.albums_json = json.load(albums_file)
+
+    def test_should_fail_if_compact_chart_does_not_match_the_model(self):
+        chart = top40.Chart(**self.albums_json)
+        compact_chart = top40.CompactChart.from_json(self.albums_json)
+
+        expect(compact_chart.date).to(equal(chart.date))
+        expect(compact_chart.retrieved).to(equal(chart.retrieved))
+        expect(len(compact_chart.entries)).to(equal(len(chart.entries)))
+        for entry, compact_entry in zip(chart.entries, compact_chart.entries):
+            expect(compact_entry).to(be_a(top40.CompactEntry))
+            for name in ('position', 'previousPosition', 'numWeeks', 'artist', 'title', 'status'):
+                expect(getattr(compact_entry, name)).to(equal(getattr(entry, name)))
+            expect(compact_entry.change.amount).to(equal(entry.change.amount))
+            expect(compact_entry.change.actual).to(equal(entry.change.actual))
+            expect(compact_entry.change.direction).to(equal(entry.change.direction))
+
+    def test_should_fail_if_conversion_to_and_from_the_model_loses_data(self):
+        compact_chart = top40.CompactChart.from_json(self.albums_json)
+
+        chart = compact_chart.to_model()
+
+        expect(chart).to(be_a(top40.Chart))
+        expect(chart.entries[0]).to(be_a(top40.Entry))
+        expect(chart.entries[0].change).to(be_a(top40.Change))
+        expect(dict(chart)).to(equal(compact_chart.to_dict()))
+        expect(top40.CompactChart.from_model(chart)).to(equal(compact_chart))
+        expect(top40.CompactEntry.from_model(chart.entries[1])).to(equal(compact_chart.entries[1]))
+        expect(top40.CompactChange.from_model(chart.entries[1].change)).to(equal(compact_chart.entries[1].change))
+
+    def test_should_fail_if_compact_entries_accept_new_attributes(self):
+        entry = top40.CompactChart.from_json(self.albums_json).entries[0]
+
+        def set_attribute():
+            entry.colour = "red"
+
+        expect(set_attribute).to(raise_error(AttributeError))
+
+    @httpretty.activate
+    def test_should_fail_if_top40_does_not_return_compact_charts(self):
+        httpretty.register_uri(
+            httpretty.GET,
+            "http://ben-major.co.uk/labs/top40/api/albums",
+            body=request_send_file,
+            content_type='text/json'
+        )
+
+        albums_chart = top40.Top40(cache_duration=None, compact=True).albums_chart
+
+        expect(albums_chart).to(be_a(top40.CompactChart))
+        expect(albums_chart).to(equal(top40.CompactChart.from_json(self.albums_json)))
+
+
+@unittest.skipIf(numpy is None, "numpy is not installed")
+class TestChartFrame(unittest.TestCase):
+
+    def setUp(self):
+        with open("tests/resources/albums.json") as albums_file:
+            self.chart = top40.Chart(**json.load(albums_file))
+        self.frame = self.chart.to_arrays()
+
+    def test_should_fail_if_columns_do_not_match_the_entries(self):
+        entries = self.chart.entries
+
+        expect(len(self.frame)).to(equal(len(entries)))
+        expect(self.frame.position.tolist()).to(equal([entry.position for entry in entries]))
+        expect(self.frame.previousPosition.tolist()).to(equal([entry.previousPosition for entry in entries]))
+        expect(self.frame.numWeeks.tolist()).to(equal([entry.numWeeks for entry in entries]))
+        expect(self.frame.change.tolist()).to(equal([entry.change.actual for entry in entries]))
+        expect(self.frame.artist.tolist()).to(equal([entry.artist for entry in entries]))
+        expect(self.frame.title.tolist()).to(equal([entry.title for entry in entries]))
+        expect(len(self.frame.artist_names)).to(equal(len(set(entry.artist for entry in entries))))
+
+    def test_should_fail_if_compact_chart_columns_differ(self):
+        compact_frame = top40.CompactChart.from_model(self.chart).to_arrays()
+
+        expect(compact_frame.change.tolist()).to(equal(self.frame.change.tolist()))
+        expect(compact_frame.artist_codes.tolist()).to(equal(self.frame.artist_codes.tolist()))
+
+    def test_should_fail_if_movers_are_not_found(self):
+        entries = self.chart.entries
+        new_entries = [entry for entry in entries if entry.previousPosition == 0]
+        climbs = sorted(
+            (entry.change.actual for entry in entries if entry.change.actual > 0 and entry.previousPosition != 0),
+            reverse=True
+        )
+        falls = sorted(
+            entry.change.actual for entry in entries if entry.change.actual < 0 and entry.previousPosition != 0
+        )
+
+        expect(self.frame.select(self.frame.new_entries())).to(equal(new_entries))
+        expect([entry.change.actual for entry in self.frame.select(self.frame.climbers())]).to(equal(climbs))
+        expect([entry.change.actual for entry in self.frame.select(self.frame.fallers(3))]).to(equal(falls[:3]))
+
+    def test_should_fail_if_artist_and_weeks_are_not_counted(self):
+        entries = self.chart.entries
+
+        expect(int(self.frame.by_artist("Ed Sheeran").sum())).to(
+            equal(len([entry for entry in entries if entry.artist == "Ed Sheeran"]))
+        )
+        expect(int(self.frame.by_artist("Nobody").sum())).to(equal(0))
+        histogram = self.frame.weeks_histogram()
+        expect(int(histogram.sum())).to(equal(len(entries)))
+        expect(int(histogram[1])).to(equal(len([entry for entry in entries if entry.numWeeks == 1])))
+
+
+class TestChartDiff(unittest.TestCase):
+
+    def setUp(self):
+        with open("tests/resources/albums.json") as albums_file:
+            self.albums_json = json.load(albums_file)
+
+    def chart(self, *titles):
+        entries = [
+            {"position": position, "artist": "Artist " + title, "title": title, "numWeeks": 1}
+            for position, title in enumerate(titles, 1)
+        ]
+        return top40.Chart(date=0, retrieved=0, entries=entries)
+
+    def test_should_fail_if_movements_are_not_classified(self):
+        last_week = self.chart("A", "B", "C", "D", "E")
+        this_week = self.chart("C", "B", "F", "A", "E")
+
+        changes = this_week.diff(last_week)
+
+        expect([entry.title for entry in changes.entries]).to(equal(["F"]))
+        expect([entry.title for entry in changes.exits]).to(equal(["D"]))
+        expect([(movement.entry.title, movement.change) for movement in changes.climbers]).to(equal([("C", 2)]))
+        expect([(movement.entry.title, movement.change) for movement in changes.fallers]).to(equal([("A", -3)]))
+        expect([movement.entry.title for movement in changes.non_movers]).to(equal(["B", "E"]))
+        expect(changes.fallers[0].previous.position).to(equal(1))
+
+    def test_should_fail_if_charts_with_the_same_title_by_different_artists_are_matched(self):
+        last_week = top40.Chart(date=0, retrieved=0, entries=[{"position": 1, "artist": "One", "title": "Hello"}])
+        this_week = top40.Chart(date=0, retrieved=0, entries=[{"position": 1, "artist": "Two", "title": "Hello"}])
+
+        changes = this_week.diff(last_week)
+
+        expect(changes.entries).to(have_length(1))
+        expect(changes.exits).to(have_length(1))
+
+    def test_should_fail_if_compact_and_model_charts_differ(self):
+        chart = top40.Chart(**self.albums_json)
+        compact_chart = top40.CompactChart.from_json(self.albums_json)
+
+        changes = compact_chart.diff(chart)
+
+        expect(changes.entries + changes.exits + changes.climbers + changes.fallers).to(equal([]))
+        expect([movement.entry for movement in changes.non_movers]).to(equal(compact_chart.entries))
+
+
 class TestUnpatchedTop40GetData(unittest.TestCase):
 
     def setUp(self):
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2014 Danny Goodall
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import unittest
+from codefurther.helpers import FileSpoofer
+from codefurther.transport import Transport, default_transport
+from codefurther.utils import request_send_file
+
+__author__ = 'User'
+
+from expects import *
+import httpretty
+from codefurther import lyrics, top40
+
+
+class TestTransport(unittest.TestCase):
+
+    def test_should_fail_if_default_transport_is_not_shared(self):
+        expect(default_transport()).to(be(default_transport()))
+        expect(top40.Top40(cache_duration=None).transport).to(be(default_transport()))
+        expect(lyrics.Lyrics().transport).to(be(default_transport()))
+
+    def test_should_fail_if_sessions_do_not_share_the_pooled_adapter(self):
+        transport = Transport(pool_connections=2, pool_maxsize=5)
+
+        first = transport.create_session()
+        second = transport.create_session()
+
+        expect(first.get_adapter("http://ben-major.co.uk/")).to(be(transport.adapter))
+        expect(second.get_adapter("https://maps.googleapis.com/")).to(be(transport.adapter))
+        expect(transport.adapter._pool_maxsize).to(equal(5))
+
+    def test_should_fail_if_keep_alive_is_not_turned_off(self):
+        transport = Transport(keep_alive=False)
+
+        expect(transport.session.headers['Connection']).to(equal('close'))
+
+    @httpretty.activate
+    def test_should_fail_if_injected_transport_is_not_used(self):
+        transport = Transport()
+        urls = []
+        original_get = transport.get
+
+        def recording_get(url, params=None, session=None, **kwargs):
+            urls.append(url)
+            return original_get(url, params=params, session=session, **kwargs)
+
+        transport.get = recording_get
+
+        httpretty.register_uri(
+            httpretty.GET,
+            "http://ben-major.co.uk/labs/top40/api/albums",
+            body=request_send_file,
+            content_type='text/json'
+        )
+        httpretty.register_uri(
+            httpretty.GET,
+            "http://cflyricsserver.herokuapp.com/lyricsapi/songs/billy bragg",
+            body=FileSpoofer().request_send_file,
+            content_type='text/json'
+        )
+
+        top40.Top40(cache_duration=None, transport=transport).albums
+        lyrics.Lyrics(transport=transport).artist_songs("billy bragg")
+
+        expect(urls).to(equal([
+            "http://ben-major.co.uk/labs/top40/api/albums",
+            "http://cflyricsserver.herokuapp.com/lyricsapi/songs/billy bragg"
+        ]))
@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2014 Danny Goodall
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import threading
+import time
+import unittest
+import json
+import sys
+from codefurther.errors import CodeFurtherConversionError
+from codefurther.utils import ConversionPlan, JSONListView, JSONView, SingleFlight, iter_json_array, json_view, \
+    recurse_structure
+from munch import Munch
+
+__author__ = 'User'
+
+from expects import *
+
+
+class TestSingleFlight(unittest.TestCase):
+    def setUp(self):
+        self.single_flight = SingleFlight()
+        self.calls = []
+
+    def run_threads(self, function, count=5):
+        results = []
+        started = threading.Event()
+
+        def worker():
+            started.wait()
+            try:
+                results.append(self.single_flight.do("key", function))
+            except Exception as e:
+                results.append(e)
+
+        threads = [threading.Thread(target=worker) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        started.set()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_should_fail_if_concurrent_calls_are_not_collapsed(self):
+        def slow_call():
+            self.calls.append(1)
+            time.sleep(0.2)
+            return {"answer": 42}
+
+        results = self.run_threads(slow_call)
+
+        expect(len(self.calls)).to(equal(1))
+        expect(len(results)).to(equal(5))
+        expect(all(result is results[0] for result in results)).to(be(True))
+
+    def test_should_fail_if_exception_is_not_shared(self):
+        def failing_call():
+            self.calls.append(1)
+            time.sleep(0.2)
+            raise ValueError("Nope")
+
+        results = self.run_threads(failing_call)
+
+        expect(len(self.calls)).to(equal(1))
+        expect(all(isinstance(result, ValueError) for result in results)).to(be(True))
+
+    def test_should_fail_if_finished_calls_are_remembered(self):
+        expect(self.single_flight.do("key", lambda: 1)).to(equal(1))
+        expect(self.single_flight.do("key", lambda: 2)).to(equal(2))
+
+
+class TestIterJsonArray(unittest.TestCase):
+    def setUp(self):
+        self.document = json.dumps({
+            "skip": [1, {"nested": "]"}],
+            "lyrics": ["first line", "a \"quoted\" line", "", -12.5e2, 7, True, None, u"caf\u00e9"],
+            "after": 1
+        })
+
+    def chunks(self, size):
+        return [self.document[start:start + size] for start in range(0, len(self.document), size)]
+
+    def test_should_fail_if_items_differ_for_any_chunk_size(self):
+        expected = json.loads(self.document)["lyrics"]
+
+        for size in (1, 2, 3, 5, 8, len(self.document)):
+            expect(list(iter_json_array(self.chunks(size), "lyrics"))).to(equal(expected))
+
+    def test_should_fail_if_items_are_not_yielded_before_the_document_ends(self):
+        read = []
+
+        def chunks():
+            for chunk in self.chunks(4):
+                read.append(chunk)
+                yield chunk
+
+        items = iter_json_array(chunks(), "lyrics")
+
+        expect(next(items)).to(equal("first line"))
+        expect(len(read)).to(be_below(len(self.chunks(4))))
+
+    def test_should_fail_if_bad_documents_are_not_reported(self):
+        expect(lambda: list(iter_json_array(['{"songs": []}'], "lyrics"))).to(raise_error(KeyError))
+        expect(lambda: list(iter_json_array(['{"lyrics": ["one", '], "lyrics"))).to(raise_error(ValueError))
+        expect(lambda: list(iter_json_array(['["lyrics"]'], "lyrics"))).to(raise_error(ValueError))
+        expect(list(iter_json_array(['{"lyrics": []}'], "lyrics"))).to(equal([]))
+
+
+class TestRecurseStructure(unittest.TestCase):
+    def setUp(self):
+        self.document = {"entries": [{"position": "1", "change": {"actual": "-1"}}, [{"numWeeks": "2"}]], "date": 1}
+        self.convert = {"position": int, "actual": int, "numWeeks": int}
+
+    def test_should_fail_if_dicts_are_not_munched_and_converted(self):
+        result = recurse_structure(self.document, convert=self.convert)
+
+        expect(result).to(be_a(Munch))
+        expect(result.entries[0].change.actual).to(equal(-1))
+        expect(result.entries[0].position).to(equal(1))
+        expect(result.entries[1][0]).to(be_a(Munch))
+        expect(result.entries[1][0].numWeeks).to(equal(2))
+        expect(self.document["entries"][0]["position"]).to(equal("1"))
+
+    def test_should_fail_if_copies_share_containers_with_the_original(self):
+        result = recurse_structure(self.document, use_munch=False)
+
+        expect(type(result)).to(be(dict))
+        expect(result).to(equal(self.document))
+        expect(result["entries"]).not_to(be(self.document["entries"]))
+        expect(result["entries"][1][0]).not_to(be(self.document["entries"][1][0]))
+
+    def test_should_fail_if_in_place_conversion_copies(self):
+        entries = self.document["entries"]
+
+        result = recurse_structure(self.document, use_munch=False, convert=self.convert, in_place=True)
+
+        expect(result).to(be(self.document))
+        expect(result["entries"]).to(be(entries))
+        expect(entries[0]["change"]["actual"]).to(equal(-1))
+
+    def test_should_fail_if_deep_nesting_reaches_the_recursion_limit(self):
+        document = leaf = {}
+        for _ in range(sys.getrecursionlimit() * 2):
+            leaf["child"] = [{}]
+            leaf = leaf["child"][0]
+
+        result = recurse_structure(document)
+
+        depth = 0
+        while "child" in result:
+            result = result.child[0]
+            depth += 1
+        expect(depth).to(equal(sys.getrecursionlimit() * 2))
+
+    def test_should_fail_if_bad_conversions_are_not_reported(self):
+        expect(lambda: recurse_structure({"a": [{"position": None}]}, convert=self.convert)).to(
+            raise_error(CodeFurtherConversionError)
+        )
+
+
+class TestConversionPlan(unittest.TestCase):
+    def setUp(self):
+        with open("tests/resources/singles.json") as chart_file:
+            self.chart = json.load(chart_file)
+        self.convert = {"position": str, "actual": str, "numWeeks": str}
+        self.plan = ConversionPlan(self.convert, ["entries[].position", "entries[].change.actual", "entries[].numWeeks"])
+
+    def test_should_fail_if_plan_differs_from_recurse_structure(self):
+        expect(self.plan(self.chart)).to(equal(recurse_structure(self.chart, convert=self.convert)))
+        expect(self.plan(self.chart).entries[0].change).to(be_a(Munch))
+        expect(self.plan(self.chart).entries[0].change.actual).to(equal("-1"))
+        expect(self.chart["entries"][0]["position"]).to(equal(1))
+
+    def test_should_fail_if_keys_off_the_paths_are_converted(self):
+        document = {"position": "1", "entries": [{"position": "2", "other": {"position": "3"}}]}
+
+        result = ConversionPlan({"position": int}, ["entries[].position"], use_munch=False)(document)
+
+        expect(result).to(equal({"position": "1", "entries": [{"position": 2, "other": {"position": "3"}}]}))
+        expect(type(result)).to(be(dict))
+
+    def test_should_fail_if_list_documents_and_missing_keys_are_not_handled(self):
+        plan = ConversionPlan({"a": int}, ["[].a"])
+
+        expect(plan([{"a": "1"}, {"b": "2"}, 3])).to(equal([{"a": 1}, {"b": "2"}, 3]))
+        expect(plan({"a": "1"})).to(equal({"a": "1"}))
+
+    def test_should_fail_if_in_place_plan_copies(self):
+        entries = self.chart["entries"]
+
+        result = ConversionPlan(self.convert, ["entries[].position"], use_munch=False)(self.chart, in_place=True)
+
+        expect(result["entries"]).to(be(entries))
+        expect(entries[0]["position"]).to(equal("1"))
+
+    def test_should_fail_if_bad_paths_are_accepted(self):
+        for path in ["", "entries..position", "entries[]x", "entries[]", "entries[].missing", "[].[].position"]:
+            expect(lambda: ConversionPlan(self.convert, [path])).to(raise_error(ValueError))
+
+    def test_should_fail_if_bad_conversions_are_not_reported(self):
+        plan = ConversionPlan({"position": int}, ["entries[].position"])
+
+        expect(lambda: plan({"entries": [{"position": None}]})).to(raise_error(CodeFurtherConversionError))
+
+    def test_should_fail_if_failed_conversions_are_called_again(self):
+        calls = []
+
+        def flaky(value):
+            calls.append(value)
+            if len(calls) == 1:
+                raise TypeError("first call fails")
+            return int(value)
+
+        plan = ConversionPlan({"position": flaky}, ["entries[].position"])
+
+        expect(lambda: plan({"entries": [{"position": "1"}]})).to(
+            raise_error(CodeFurtherConversionError, contain("Key: 'position'"))
+        )
+        expect(calls).to(equal(["1"]))
+
+
+class TestJSONView(unittest.TestCase):
+    def setUp(self):
+        with open("tests/resources/singles.json") as chart_file:
+            self.chart = json.load(chart_file)
+        self.view = json_view(self.chart)
+
+    def test_should_fail_if_values_cannot_be_read_by_attribute(self):
+        expect(self.view).to(be_a(JSONView))
+        expect(self.view.entries).to(be_a(JSONListView))
+        expect(self.view.entries[0].change.actual).to(equal(self.chart["entries"][0]["change"]["actual"]))
+        expect(self.view["entries"][-1]["position"]).to(equal(40))
+        expect(self.view.entries[1:3][0].title).to(equal(self.chart["entries"][1]["title"]))
+        expect(lambda: self.view.missing).to(raise_error(AttributeError))
+        expect(json_view(3)).to(equal(3))
+
+    def test_should_fail_if_the_document_is_copied(self):
+        expect(self.view.unwrap()).to(be(self.chart))
+        expect(self.view.entries[0].unwrap()).to(be(self.chart["entries"][0]))
+        expect(self.view.entries[0]).to(be(self.view.entries[0]))
+        expect(self.view.entries.unwrap()).to(be(self.chart["entries"]))
+
+    def test_should_fail_if_views_do_not_compare_like_their_data(self):
+        expect(self.view).to(equal(self.chart))
+        expect(self.view.entries[0] == self.chart["entries"][0]).to(be_true)
+        expect(self.chart["entries"][0] in self.view.entries).to(be_true)
+        expect(len(self.view.entries)).to(equal(len(self.chart["entries"])))
+        expect([entry.position for entry in self.view.entries]).to(equal(list(range(1, 41))))
+        expect(dict(self.view.entries[0].change)).to(equal(self.chart["entries"][0]["change"]))
+
+    def test_should_fail_if_views_can_be_changed(self):
+        def change_attribute():
+            self.view.date = 0
+
+        def change_item():
+            self.view["date"] = 0
+
+        expect(change_attribute).to(raise_error(AttributeError))
+        expect(change_item).to(raise_error(TypeError))
+        expect(self.chart["date"]).not_to(equal(0))